@@ -3,6 +3,7 @@ import datetime
 import re
 import pickle
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 
 
@@ -53,6 +54,8 @@ class PachydermRepoManager:
     FILE_TYPE = "type"
     OUTPUT_COMMIT_FIELD = "commit"
     OUTPUT_COMMIT_ID = "id"
+    # number of repos/branches created in parallel during provisioning
+    DEFAULT_PROVISION_WORKERS = 8
 
     def __init__(self):
         # self.logger = XprLogger()
@@ -117,6 +120,16 @@ class PachydermRepoManager:
         repo_info = self.pachyderm_client.get_repo()
         return self.filter_repo_output(repo_info)
 
+    def get_repo_names(self):
+        """
+        returns names of all available repos with a single listing
+
+        :return:
+            set of repo names
+        """
+        return {repo_item.repo.name
+                for repo_item in self.pachyderm_client.get_repo()}
+
     def check_repo_existence(self, repo_name):
         """
         checks if the repo exists or not
@@ -124,24 +137,134 @@ class PachydermRepoManager:
         :return:
             bool: True or False
         """
-        exist_status = False
-        repo_list = self.get_repos()
-        for repo in repo_list:
-            if repo[self.REPO_OUTPUT_NAME] == repo_name:
-                exist_status = True
-                break
-        return exist_status
+        return repo_name in self.get_repo_names()
 
     def check_branch_existence(self, repo_name, branch_name):
         """
-        checks if the repo exists or not
+        checks if the branch exists in the repo or not
 
         :return:
             bool: True or False
         """
-        exist_status = False
-        branch_list = self.get_branches(repo_name)
-        return branch_name in branch_list
+        return branch_name in set(self.get_branches(repo_name))
+
+    def create_repos(self, repo_list, max_workers=None):
+        """
+        creates the repos which are not present on pachyderm cluster
+
+        existing repos are found with a single listing and only the missing
+        ones are created, in parallel
+
+        :param repo_list:
+            list of repo info dicts with keys repo_name, description
+        :param max_workers:
+            (Optional) number of repos created in parallel
+        :return:
+            list of names of the repos created
+        """
+        for repo_json in repo_list:
+            if self.REPO_NAME not in repo_json:
+                raise RepoNotProvidedException("Repo name is required")
+            if not self.name_validity_check(repo_json[self.REPO_NAME]):
+                raise PachydermFieldsNameException(
+                    f"Invalid format for {repo_json[self.REPO_NAME]}"
+                )
+
+        existing_repos = self.get_repo_names()
+        missing_repos = {}
+        for repo_json in repo_list:
+            repo_name = repo_json[self.REPO_NAME]
+            if repo_name not in existing_repos and \
+                    repo_name not in missing_repos:
+                missing_repos[repo_name] = repo_json.get(self.DESCRIPTION, "")
+
+        self.run_in_parallel(
+            self.pachyderm_client.create_new_repo,
+            list(missing_repos.items()), max_workers
+        )
+        return list(missing_repos)
+
+    def create_branches(self, branch_list, max_workers=None):
+        """
+        creates the branches which are not present on pachyderm cluster
+
+        repos are listed once and the branches of each repo once, after
+        which only the missing branches are created, in parallel
+
+        :param branch_list:
+            list of branch info dicts with keys repo_name, branch_name
+        :param max_workers:
+            (Optional) number of branches created in parallel
+        :return:
+            list of (repo_name, branch_name) tuples of the branches created
+        """
+        for branch_info in branch_list:
+            if self.REPO_NAME not in branch_info or \
+                    self.BRANCH_NAME not in branch_info:
+                raise BranchInfoException("Repo name & branch name is required")
+            for field in (self.REPO_NAME, self.BRANCH_NAME):
+                if not self.name_validity_check(branch_info[field]):
+                    raise PachydermFieldsNameException(
+                        f"Invalid format for {branch_info[field]}"
+                    )
+
+        existing_repos = self.get_repo_names()
+        repo_names = list({branch_info[self.REPO_NAME]: None
+                           for branch_info in branch_list})
+        for repo_name in repo_names:
+            if repo_name not in existing_repos:
+                raise BranchInfoException(
+                    f"Unable to find a repo `{repo_name}`"
+                )
+
+        branch_listings = self.run_in_parallel(
+            self.pachyderm_client.get_branch,
+            [(repo_name,) for repo_name in repo_names], max_workers
+        )
+        existing_branches = {
+            (repo_name, branch_name)
+            for repo_name, branch_info in zip(repo_names, branch_listings)
+            for branch_name in self.filter_branch_output(branch_info)
+        }
+        missing_branches = list({
+            (branch_info[self.REPO_NAME], branch_info[self.BRANCH_NAME]): None
+            for branch_info in branch_list
+        })
+        missing_branches = [branch for branch in missing_branches
+                            if branch not in existing_branches]
+
+        self.run_in_parallel(
+            self.pachyderm_client.create_new_branch,
+            missing_branches, max_workers
+        )
+        return missing_branches
+
+    def run_in_parallel(self, method, args_list, max_workers=None):
+        """
+        calls `method` once for every args tuple in a thread pool
+
+        every call is completed before the first failure is raised
+
+        :param method:
+            method to be called
+        :param args_list:
+            list of argument tuples
+        :param max_workers:
+            (Optional) number of parallel calls
+        :return:
+            list of results in the order of `args_list`
+        """
+        if not args_list:
+            return []
+        max_workers = min(max_workers or self.DEFAULT_PROVISION_WORKERS,
+                          len(args_list))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(method, *args) for args in args_list]
+        errors = [future.exception() for future in futures
+                  if future.exception() is not None]
+        if errors:
+            raise errors[0]
+        return [future.result() for future in futures]
 
     def delete_repo(self, repo_name):
         """
@@ -0,0 +1,144 @@
+import threading
+
+import pytest
+from python_pachyderm.client.pfs import pfs_pb2
+
+from data_versioning.pachyderm_repo_manager_1 import PachydermRepoManager
+from exception_handling.custom_exception import BranchInfoException, \
+    PachydermFieldsNameException, RepoNotProvidedException
+
+
+class FakePachydermClient:
+    """
+    records the repos and branches created on an in-memory cluster
+    """
+    def __init__(self, repos):
+        """
+
+        :param repos:
+            dict of repo name to list of its branch names
+        """
+        self.repos = {repo_name: list(branch_names)
+                      for (repo_name, branch_names) in repos.items()}
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def record(self, *request):
+        with self.lock:
+            self.requests.append(request)
+
+    def get_repo(self):
+        self.record("get_repo")
+        return [pfs_pb2.RepoInfo(repo=pfs_pb2.Repo(name=repo_name))
+                for repo_name in self.repos]
+
+    def get_branch(self, repo_name):
+        self.record("get_branch", repo_name)
+        return [pfs_pb2.BranchInfo(name=branch_name)
+                for branch_name in self.repos[repo_name]]
+
+    def create_new_repo(self, repo_name, description):
+        self.record("create_new_repo", repo_name, description)
+        with self.lock:
+            self.repos[repo_name] = []
+
+    def create_new_branch(self, repo_name, branch_name):
+        self.record("create_new_branch", repo_name, branch_name)
+        with self.lock:
+            self.repos[repo_name].append(branch_name)
+
+
+def create_manager(monkeypatch, repos):
+    fake_client = FakePachydermClient(repos)
+    monkeypatch.setattr(PachydermRepoManager, "connect_to_pachyderm",
+                        lambda self: fake_client)
+    return PachydermRepoManager(), fake_client
+
+
+def test_get_repo_names(monkeypatch):
+    manager, fake_client = create_manager(monkeypatch,
+                                          {"sales": [], "stores": []})
+    assert manager.get_repo_names() == {"sales", "stores"}
+    assert manager.check_repo_existence("sales")
+    assert not manager.check_repo_existence("orders")
+    assert fake_client.requests.count(("get_repo",)) == 3
+
+
+def test_create_repos_creates_only_missing_ones(monkeypatch):
+    manager, fake_client = create_manager(monkeypatch, {"sales": []})
+    created = manager.create_repos([
+        {"repo_name": "sales"},
+        {"repo_name": "stores", "description": "store master data"},
+        {"repo_name": "orders"},
+        {"repo_name": "stores"},
+    ])
+    assert created == ["stores", "orders"]
+    assert sorted(request for request in fake_client.requests
+                  if request[0] == "create_new_repo") == \
+        [("create_new_repo", "orders", ""),
+         ("create_new_repo", "stores", "store master data")]
+    assert fake_client.requests.count(("get_repo",)) == 1
+    assert manager.create_repos([{"repo_name": "orders"}]) == []
+
+
+def test_create_repos_validates_before_creating(monkeypatch):
+    manager, fake_client = create_manager(monkeypatch, {})
+    with pytest.raises(PachydermFieldsNameException):
+        manager.create_repos([{"repo_name": "sales"},
+                              {"repo_name": "stores/2024"}])
+    with pytest.raises(RepoNotProvidedException):
+        manager.create_repos([{"description": "no name"}])
+    assert fake_client.requests == []
+
+
+def test_create_branches_lists_each_repo_once(monkeypatch):
+    manager, fake_client = create_manager(
+        monkeypatch, {"sales": ["master"], "stores": []})
+    created = manager.create_branches([
+        {"repo_name": "sales", "branch_name": "master"},
+        {"repo_name": "sales", "branch_name": "staging"},
+        {"repo_name": "stores", "branch_name": "master"},
+        {"repo_name": "stores", "branch_name": "master"},
+    ])
+    assert created == [("sales", "staging"), ("stores", "master")]
+    assert sorted(request for request in fake_client.requests
+                  if request[0] == "get_branch") == \
+        [("get_branch", "sales"), ("get_branch", "stores")]
+    assert fake_client.repos == {"sales": ["master", "staging"],
+                                 "stores": ["master"]}
+
+
+def test_create_branches_validates_before_creating(monkeypatch):
+    manager, fake_client = create_manager(monkeypatch, {"sales": []})
+    with pytest.raises(PachydermFieldsNameException):
+        manager.create_branches([{"repo_name": "sales/2024",
+                                  "branch_name": "master"}])
+    with pytest.raises(PachydermFieldsNameException):
+        manager.create_branches([{"repo_name": "sales",
+                                  "branch_name": "master/2024"}])
+    with pytest.raises(BranchInfoException):
+        manager.create_branches([{"repo_name": "sales"}])
+    assert fake_client.requests == []
+
+    with pytest.raises(BranchInfoException, match="stores"):
+        manager.create_branches([{"repo_name": "stores",
+                                  "branch_name": "master"}])
+    assert fake_client.requests == [("get_repo",)]
+
+
+def test_run_in_parallel_completes_all_calls_before_raising(monkeypatch):
+    manager, _ = create_manager(monkeypatch, {})
+    calls = []
+
+    def create(name):
+        calls.append(name)
+        if name == "b":
+            raise ValueError(name)
+        return name.upper()
+
+    assert manager.run_in_parallel(create, [("a",), ("c",)], 2) == ["A", "C"]
+    calls.clear()
+    with pytest.raises(ValueError, match="b"):
+        manager.run_in_parallel(create, [("a",), ("b",), ("c",)], 1)
+    assert calls == ["a", "b", "c"]
+    assert manager.run_in_parallel(create, []) == []
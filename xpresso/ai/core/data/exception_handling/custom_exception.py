@@ -118,4 +118,16 @@ class SerializationFailedException(Exception):
         # __str__ is to print() the value
 
     def __str__(self):
-        return repr(self.value)
\ No newline at end of file
+        return repr(self.value)
+
+
+class DatasetIntegrityException(Exception):
+
+    # Constructor or Initializer
+    def __init__(self, value):
+        self.value = value
+
+        # __str__ is to print() the value
+
+    def __str__(self):
+        return repr(self.value)
@@ -0,0 +1,814 @@
+import asyncio
+import io
+import os
+
+import grpc
+from python_pachyderm.client.pfs import pfs_pb2 as proto
+from python_pachyderm.client.pfs import pfs_pb2_grpc
+from python_pachyderm.util import commit_from, get_address, get_metadata
+
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    PachydermOperationException, DatasetIntegrityException
+from xpresso.ai.core.data.pachyderm_repo_management.channel_pool import ChannelRegistry
+from xpresso.ai.core.data.pachyderm_repo_management.dataset_manifest import \
+    ContentDigest, DatasetManifest
+from xpresso.ai.core.data.pachyderm_repo_management.pachyderm_client import PachydermClient
+from xpresso.ai.core.data.pachyderm_repo_management.pachyderm_pipeline_client import \
+    PachydermPipelineClient
+from xpresso.ai.core.data.pachyderm_repo_management.transfer_codec import TransferCodec
+from xpresso.ai.core.data.pachyderm_repo_management.transfer_stats import TransferStats
+
+
+class AsyncPachydermClient:
+    """
+    asyncio version of PachydermClient built on grpc.aio
+
+    Methods mirror PachydermClient. Uploads and downloads are streamed
+    chunk by chunk and files are transferred concurrently with
+    `asyncio.gather`, bounded by a semaphore. Transient failures are
+    retried with the backoff of PachydermClient. The client must be created
+    and used inside a running event loop
+    """
+    DEFAULT_PUSH_WORKERS = PachydermClient.DEFAULT_PUSH_WORKERS
+    DEFAULT_PUSH_RETRIES = PachydermClient.DEFAULT_PUSH_RETRIES
+    DEFAULT_PULL_WORKERS = PachydermClient.DEFAULT_PULL_WORKERS
+    DEFAULT_PULL_RETRIES = PachydermClient.DEFAULT_PULL_RETRIES
+    RETRY_BACKOFF_SECONDS = PachydermClient.RETRY_BACKOFF_SECONDS
+    RETRYABLE_STATUS_CODES = PachydermClient.RETRYABLE_STATUS_CODES
+    DEFAULT_CHUNK_SIZE = PachydermClient.DEFAULT_CHUNK_SIZE
+    PARTIAL_FILE_SUFFIX = PachydermClient.PARTIAL_FILE_SUFFIX
+    MANIFEST_ANCESTOR_DEPTH = PachydermClient.MANIFEST_ANCESTOR_DEPTH
+
+    def __init__(self, host, port, auth_token=None, chunk_size=None,
+                 root_certs=None, codec=None):
+        """
+
+        :param host:
+        :param port:
+        :param auth_token:
+        :param chunk_size:
+            (Optional) number of bytes sent in a single upload request
+        :param root_certs:
+            (Optional) PEM encoded root certificates for a secure channel
+        :param codec:
+            (Optional) name of the TransferCodec used to compress uploaded
+            files. Files are stored encoded, hence pipelines can not read
+            them
+        """
+        self.host = host
+        self.port = port
+        self.auth_token = auth_token
+        self.chunk_size = chunk_size or self.DEFAULT_CHUNK_SIZE
+        self.codec = TransferCodec.get(codec) if codec else None
+        self.codec_name = codec
+        self.metadata = get_metadata(auth_token)
+        self.channel = self.connect(host, port, root_certs)
+        self.stub = pfs_pb2_grpc.APIStub(self.channel)
+        # PachydermPipelineClient, connected when first needed
+        self.pipeline_client = None
+
+    @staticmethod
+    def connect(host, port, root_certs=None):
+        """
+        opens a grpc.aio channel with the same options as the shared sync
+        channels
+
+        :param host:
+        :param port:
+        :param root_certs:
+        :return:
+        """
+        address = get_address(host, port)
+        if root_certs:
+            credentials = grpc.ssl_channel_credentials(
+                root_certificates=root_certs)
+            return grpc.aio.secure_channel(
+                address, credentials, options=ChannelRegistry.CHANNEL_OPTIONS)
+        return grpc.aio.insecure_channel(
+            address, options=ChannelRegistry.CHANNEL_OPTIONS)
+
+    async def close(self):
+        """
+        closes the channel of the client
+        """
+        await self.channel.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def call(self, method, request):
+        """
+        runs a unary call and converts its failure to
+        PachydermOperationException
+        """
+        try:
+            return await method(request, metadata=self.metadata)
+        except grpc.aio.AioRpcError as err:
+            raise PachydermOperationException(err.details())
+
+    async def create_new_repo(self, repo_name, description=None, update=None):
+        """
+        :param repo_name:
+            name of the repo
+        :param description:
+            description on the repo(Optional)
+        :param update:
+            update flag to overwrite if repo already exists
+        """
+        request = proto.CreateRepoRequest(repo=proto.Repo(name=repo_name),
+                                          description=description,
+                                          update=update)
+        await self.call(self.stub.CreateRepo, request)
+
+    async def get_repo(self):
+        """
+        returns the list of all the repos on pachyderm cluster
+        """
+        response = await self.call(self.stub.ListRepo, proto.ListRepoRequest())
+        return response.repo_info
+
+    async def delete_repo(self, repo_name):
+        """
+        deletes a repo
+
+        :param repo_name:
+            name of the repo to be deleted
+        """
+        request = proto.DeleteRepoRequest(repo=proto.Repo(name=repo_name))
+        await self.call(self.stub.DeleteRepo, request)
+
+    async def create_new_branch(self, repo_name, branch_name):
+        """
+        create a new branch in specified repo
+
+        :param repo_name:
+            name of the repo
+        :param branch_name:
+            name of the branch
+        """
+        request = proto.CreateBranchRequest(
+            branch=proto.Branch(repo=proto.Repo(name=repo_name), name=branch_name))
+        await self.call(self.stub.CreateBranch, request)
+
+    async def get_branch(self, repo_name):
+        """
+        returns list of branches in a repo
+
+        :param repo_name:
+            name of the repo
+        """
+        request = proto.ListBranchRequest(repo=proto.Repo(name=repo_name))
+        response = await self.call(self.stub.ListBranch, request)
+        return [branch for branch in response.branch_info
+                if branch.name != DatasetManifest.MANIFEST_BRANCH]
+
+    async def inspect_branch(self, repo_name, branch_name):
+        """
+        provides information on a branch
+
+        :param repo_name:
+            name of the repo where branch resides
+        :param branch_name:
+            name of the branch
+        :return:
+            branch information object
+        """
+        request = proto.InspectBranchRequest(
+            branch=proto.Branch(repo=proto.Repo(name=repo_name), name=branch_name))
+        return await self.call(self.stub.InspectBranch, request)
+
+    async def delete_branch(self, repo_name, branch_name):
+        """
+        deletes a branch from the specified repo
+
+        :param repo_name:
+            name of the repo branch is in
+        :param branch_name:
+            name of the branch that needs to be deleted
+        """
+        request = proto.DeleteBranchRequest(
+            branch=proto.Branch(repo=proto.Repo(name=repo_name), name=branch_name))
+        await self.call(self.stub.DeleteBranch, request)
+
+    async def inspect_commit(self, repo_name, commit_id, block_state=None):
+        """
+        provides information on a commit
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            commit id
+        :param block_state:
+        :return:
+            returns CommitInfo Object
+        """
+        request = proto.InspectCommitRequest(
+            commit=commit_from((repo_name, commit_id)), block_state=block_state)
+        return await self.call(self.stub.InspectCommit, request)
+
+    async def list_commit(self, repo_name, upper_commit=None,
+                          lower_commit=None, count=None):
+        """
+        lists commits in a repo
+
+        :param repo_name:
+            name of the repo
+        :param upper_commit:
+            id of the last commit that needs to be shown. Name of a branch
+            lists the commits in the history of its head
+        :param lower_commit:
+            id of the commit from which list starts
+        :param count:
+            number of commits to be shown
+        :return:
+            async generator of CommitInfo objects
+        """
+        request = proto.ListCommitRequest(repo=proto.Repo(name=repo_name),
+                                          number=count)
+        if upper_commit:
+            request.to.CopyFrom(commit_from((repo_name, upper_commit)))
+        if lower_commit:
+            getattr(request, "from").CopyFrom(
+                commit_from((repo_name, lower_commit)))
+        try:
+            async for commit_info in self.stub.ListCommitStream(
+                    request, metadata=self.metadata):
+                yield commit_info
+        except grpc.aio.AioRpcError as err:
+            raise PachydermOperationException(err.details())
+
+    async def delete_commit(self, repo_name, commit_id):
+        """
+        deletes a commit and its contents
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit that needs to be deleted
+        """
+        request = proto.DeleteCommitRequest(
+            commit=commit_from((repo_name, commit_id)))
+        await self.call(self.stub.DeleteCommit, request)
+
+    async def list_dataset(self, repo_name, commit_id, path="/"):
+        """
+        lazily lists the dataset in a branch or provided commit using a
+        single server side walk
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param path:
+            path to the dataset file/folder
+        :return:
+            async generator of file info dicts
+        """
+        walk_root = DatasetManifest.normalize_path(path).rstrip("/") or "/"
+        request = proto.WalkFileRequest(
+            file=proto.File(commit=commit_from((repo_name, commit_id)), path=path))
+        try:
+            async for file_item in self.stub.WalkFile(request,
+                                                      metadata=self.metadata):
+                if DatasetManifest.is_metadata_path(file_item.file.path):
+                    continue
+                if file_item.file_type == 2 and \
+                        (file_item.file.path.rstrip("/") or "/") == walk_root:
+                    continue
+                yield PachydermClient.fetch_dataset_info(file_item)
+        except grpc.aio.AioRpcError as err:
+            raise PachydermOperationException(err.details())
+
+    async def get_manifest(self, repo_name, commit_id):
+        """
+        fetches the dataset manifest of a commit
+
+        A commit without a manifest of its own uses the one of its closest
+        ancestor, up to MANIFEST_ANCESTOR_DEPTH commits back
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit or name of the branch
+        :return:
+            DatasetManifest object, empty if no manifest is found
+        """
+        try:
+            commit_info = await self.inspect_commit(repo_name, commit_id)
+        except PachydermOperationException as err:
+            if "not found" in str(err):
+                # branch has no commits yet
+                return DatasetManifest()
+            raise
+        content = await self.read_manifest(repo_name, commit_info.commit.id)
+        if content is None:
+            content = await self.read_file(
+                repo_name, commit_info.commit.id,
+                DatasetManifest.LEGACY_MANIFEST_PATH)
+        depth = 0
+        while content is None and commit_info.parent_commit.id and \
+                depth < self.MANIFEST_ANCESTOR_DEPTH:
+            depth += 1
+            commit_info = await self.inspect_commit(
+                repo_name, commit_info.parent_commit.id)
+            content = await self.read_manifest(repo_name,
+                                               commit_info.commit.id)
+        return DatasetManifest.from_bytes(content)
+
+    async def read_manifest(self, repo_name, commit_id):
+        """
+        reads the manifest saved for a commit in the MANIFEST_BRANCH
+
+        :return:
+            manifest content as bytes, None if the commit has no manifest
+        """
+        return await self.read_file(
+            repo_name, DatasetManifest.MANIFEST_BRANCH,
+            DatasetManifest.get_manifest_path(commit_id))
+
+    async def read_file(self, repo_name, commit_id, path):
+        """
+        reads a small file of a commit into memory
+
+        :return:
+            content as bytes, None if the file or commit does not exist
+        """
+        content = bytearray()
+        try:
+            async for chunk in self.iter_file(repo_name, commit_id, path):
+                content += chunk
+        except grpc.aio.AioRpcError as err:
+            if err.code() == grpc.StatusCode.NOT_FOUND or \
+                    "not found" in (err.details() or ""):
+                return None
+            raise PachydermOperationException(err.details())
+        return bytes(content)
+
+    async def put_manifest(self, repo_name, commit_id, manifest):
+        """
+        replaces the dataset manifest of a commit, in a commit of its own
+        in the MANIFEST_BRANCH
+        """
+        await self.put_file_content(
+            repo_name, DatasetManifest.MANIFEST_BRANCH,
+            DatasetManifest.get_manifest_path(commit_id), manifest.to_bytes())
+
+    async def push_dataset(self, repo_name, branch_name, file_path_list,
+                           push_description=None, max_workers=None,
+                           retries=None):
+        """
+        pushes a dataset into pachyderm cluster
+
+        starts a new commit and streams all the files into it concurrently.
+        The commit is finished only if every file is uploaded, otherwise it
+        is deleted
+
+        :param repo_name:
+            name of the repo
+        :param branch_name:
+            name of the branch
+        :param file_path_list:
+            list of (local_path, pachyderm_path) tuples of all the files
+        :param push_description:
+            description for this push
+        :param max_workers:
+            (Optional) number of files uploaded concurrently
+        :param retries:
+            (Optional) number of retries for a failed file upload
+        :return:
+            id of the new commit
+        """
+        if retries is None:
+            retries = self.DEFAULT_PUSH_RETRIES
+        manifest = await self.get_manifest(repo_name, branch_name)
+        new_commit_id = await self.start_commit(repo_name, branch_name,
+                                                push_description,
+                                                self.codec_name)
+
+        semaphore = asyncio.Semaphore(max_workers or self.DEFAULT_PUSH_WORKERS)
+
+        async def bounded_upload(local_path, pachyderm_path):
+            async with semaphore:
+                return await self.upload_file(repo_name, new_commit_id,
+                                              local_path, pachyderm_path,
+                                              retries)
+
+        upload_tasks = [
+            asyncio.ensure_future(bounded_upload(local_path, pachyderm_path))
+            for (local_path, pachyderm_path) in file_path_list
+        ]
+        try:
+            uploaded_files = await asyncio.gather(*upload_tasks)
+            for (pachyderm_path, sha256, size_bytes, mtime,
+                 stored_size_bytes) in uploaded_files:
+                manifest.add(pachyderm_path, sha256, size_bytes, mtime,
+                             self.codec_name, stored_size_bytes)
+            await self.finish_commit(repo_name, new_commit_id, manifest)
+            return new_commit_id
+        except BaseException:
+            # gather does not stop the other uploads on failure, they are
+            # cancelled and awaited so none writes into the deleted commit
+            for upload_task in upload_tasks:
+                upload_task.cancel()
+            await asyncio.gather(*upload_tasks, return_exceptions=True)
+            # removes the above commit
+            await self.delete_commit(repo_name, new_commit_id)
+            raise
+
+    async def start_commit(self, repo_name, branch_name, description=None,
+                           codec=None):
+        """
+        opens a new commit on a branch
+
+        The codec of the files is recorded in the description of the
+        commit and refused if a pipeline reads the repo, as in
+        PachydermClient.start_commit
+
+        :return:
+            id of the open commit
+        """
+        if codec:
+            if self.pipeline_client is None:
+                self.pipeline_client = PachydermPipelineClient(
+                    self.host, self.port, self.auth_token)
+            # listing pipelines is a blocking call of the sync client
+            pipelines = await asyncio.get_running_loop().run_in_executor(
+                None, self.pipeline_client.get_reading_pipelines, repo_name)
+            if pipelines:
+                raise PachydermOperationException(
+                    f"files encoded with {codec} can not be pushed to "
+                    f"{repo_name}; it is read by pipelines "
+                    f"{', '.join(pipelines)}")
+            description = PachydermClient.tag_codec(description, codec)
+        request = proto.StartCommitRequest(
+            parent=proto.Commit(repo=proto.Repo(name=repo_name)),
+            branch=branch_name, description=description)
+        new_commit = await self.call(self.stub.StartCommit, request)
+        return new_commit.id
+
+    async def finish_commit(self, repo_name, commit_id, manifest):
+        """
+        saves the manifest of an open commit and finishes it
+        """
+        await self.put_manifest(repo_name, commit_id, manifest)
+        await self.call(self.stub.FinishCommit, proto.FinishCommitRequest(
+            commit=commit_from((repo_name, commit_id))))
+
+    async def upload_file(self, repo_name, commit_id, local_path,
+                          pachyderm_path, retries=0):
+        """
+        streams a local file into an open commit, overwriting the existing
+        file at `pachyderm_path`
+
+        :param retries:
+            number of retries in case of a transient failure
+        :return:
+            (pachyderm_path, sha256, size_bytes, mtime, stored_size_bytes)
+            of the uploaded content
+        """
+        loop = asyncio.get_running_loop()
+        file_request = proto.File(commit=commit_from((repo_name, commit_id)),
+                                  path=pachyderm_path)
+
+        async def iter_requests(dataset):
+            # reads and encoding run in the executor, off the event loop
+            stored_chunks = TransferCodec.iter_stored_chunks(
+                iter(lambda: dataset.read(self.chunk_size), b""), self.codec,
+                digest)
+            chunk = await loop.run_in_executor(None, next, stored_chunks)
+            yield proto.PutFileRequest(
+                file=file_request, value=chunk,
+                overwrite_index=proto.OverwriteIndex(index=0))
+            while True:
+                chunk = await loop.run_in_executor(None, next, stored_chunks,
+                                                   None)
+                if chunk is None:
+                    return
+                yield proto.PutFileRequest(value=chunk)
+
+        attempt = 0
+        while True:
+            try:
+                # every attempt overwrites the file from its start
+                digest = ContentDigest()
+                mtime = os.stat(local_path).st_mtime
+                with open(local_path, "rb") as dataset:
+                    await self.stub.PutFile(iter_requests(dataset),
+                                            metadata=self.metadata)
+                return pachyderm_path, digest.hexdigest(), \
+                    digest.size_bytes, mtime, digest.stored_size_bytes
+            except grpc.aio.AioRpcError as err:
+                if attempt >= retries or \
+                        err.code() not in self.RETRYABLE_STATUS_CODES:
+                    raise PachydermOperationException(
+                        f"Failed to upload {local_path}: {err.details()}")
+                attempt += 1
+                await asyncio.sleep(self.RETRY_BACKOFF_SECONDS * attempt)
+            except OSError as err:
+                raise PachydermOperationException(
+                    f"Failed to read {local_path}: {err}")
+
+    async def put_file_content(self, repo_name, commit_id, path, content):
+        """
+        writes in-memory bytes to a file of an open commit, overwriting it.
+        Writing to a branch without an open commit creates a new commit
+        """
+        file_request = proto.File(commit=commit_from((repo_name, commit_id)),
+                                  path=path)
+
+        async def iter_requests():
+            yield proto.PutFileRequest(
+                file=file_request, value=content[:self.chunk_size],
+                overwrite_index=proto.OverwriteIndex(index=0))
+            for offset in range(self.chunk_size, len(content), self.chunk_size):
+                yield proto.PutFileRequest(
+                    value=content[offset:offset + self.chunk_size])
+
+        try:
+            await self.stub.PutFile(iter_requests(), metadata=self.metadata)
+        except grpc.aio.AioRpcError as err:
+            raise PachydermOperationException(err.details())
+
+    async def iter_file(self, repo_name, commit_id, path, offset_bytes=None,
+                        size_bytes=None):
+        """
+        yields the content of a file at a commit as chunks
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param path:
+            path of the file in the pachyderm cluster
+        :param offset_bytes:
+            (Optional) number of bytes to skip from the start of file
+        :param size_bytes:
+            (Optional) number of bytes to read
+        :return:
+            async generator of bytes
+        """
+        request = proto.GetFileRequest(
+            file=proto.File(commit=commit_from((repo_name, commit_id)), path=path),
+            offset_bytes=offset_bytes, size_bytes=size_bytes)
+        async for response in self.stub.GetFile(request, metadata=self.metadata):
+            yield response.value
+
+    async def pull_dataset(self, repo_name, commit_id, path):
+        """
+        Pulls dataset/file at the specified path of the commit
+
+        :param repo_name:
+            name of the repo where the dataset is saved
+        :param commit_id:
+            id of the commit when the dataset is pushed
+        :param path:
+            path of the file in the pachyderm cluster
+        :return:
+            returns the content of the file as bytes, decoded if it is
+            stored with a TransferCodec
+        """
+        content = bytearray()
+        try:
+            async for chunk in self.iter_file(repo_name, commit_id, path):
+                content += chunk
+        except grpc.aio.AioRpcError as err:
+            raise PachydermOperationException(err.details())
+        manifest = await self.get_manifest(repo_name, commit_id)
+        # the manifest entry is trusted only if it matches the stored size
+        entry = manifest.get_verified(path, len(content))
+        codec = entry.get(DatasetManifest.CODEC) if entry else None
+        content_file = io.BytesIO(bytes(content))
+        codec = codec or TransferCodec.detect(content_file)
+        if codec:
+            return b"".join(TransferCodec.get(codec).iter_decoded(
+                content_file))
+        return bytes(content)
+
+    async def download_files(self, repo_name, commit_id, file_path_list,
+                             manifest=None, max_workers=None, retries=None):
+        """
+        downloads files of a commit concurrently
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param file_path_list:
+            list of (pachyderm_path, local_path, size_bytes) tuples where
+            size_bytes is the size reported by pachyderm
+        :param manifest:
+            (Optional) DatasetManifest used to verify the content. Entries
+            not matching `size_bytes` are ignored as stale
+        :param max_workers:
+            (Optional) number of files downloaded concurrently
+        :param retries:
+            (Optional) number of retries for a failed file download
+        :return:
+            TransferStats of the download
+        """
+        if retries is None:
+            retries = self.DEFAULT_PULL_RETRIES
+        if manifest is None:
+            manifest = DatasetManifest()
+        semaphore = asyncio.Semaphore(max_workers or self.DEFAULT_PULL_WORKERS)
+        stats = TransferStats()
+
+        async def bounded_pull(pachyderm_path, local_path, size_bytes):
+            entry = manifest.get_verified(pachyderm_path, size_bytes) or {}
+            async with semaphore:
+                await self.pull_file(repo_name, commit_id, pachyderm_path,
+                                     local_path,
+                                     entry.get(DatasetManifest.SHA256), stats,
+                                     entry.get(DatasetManifest.CODEC),
+                                     retries, size_bytes)
+
+        pull_tasks = [
+            asyncio.ensure_future(bounded_pull(pachyderm_path, local_path,
+                                               size_bytes))
+            for (pachyderm_path, local_path, size_bytes) in file_path_list
+        ]
+        try:
+            await asyncio.gather(*pull_tasks)
+        except BaseException:
+            # gather does not stop the other pulls on failure, they are
+            # cancelled and awaited so none keeps writing in the background
+            for pull_task in pull_tasks:
+                pull_task.cancel()
+            await asyncio.gather(*pull_tasks, return_exceptions=True)
+            raise
+        stats.stop()
+        return stats
+
+    async def pull_file(self, repo_name, commit_id, path, local_path,
+                        expected_hash=None, stats=None, codec=None,
+                        retries=0, size_bytes=None):
+        """
+        streams a file of a commit into a partial file next to `local_path`
+        which is renamed once the download is complete and verified
+
+        Content already present in the partial file is kept and only the
+        rest of the file is requested, hence an interrupted download resumes
+        from where it stopped, as does a retried one
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param path:
+            path of the file on pachyderm cluster
+        :param local_path:
+            path at which file is saved on local system
+        :param expected_hash:
+            (Optional) sha256 of the file recorded during push
+        :param stats:
+            (Optional) TransferStats updated during the download
+        :param codec:
+            (Optional) name of the TransferCodec the file is stored with
+        :param retries:
+            number of retries in case of a transient failure
+        :param size_bytes:
+            (Optional) size of the file on pachyderm cluster
+        """
+        loop = asyncio.get_running_loop()
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        partial_path = local_path + self.PARTIAL_FILE_SUFFIX
+        download_path = partial_path
+        if codec:
+            download_path = partial_path + PachydermClient.ENCODED_FILE_SUFFIX
+        if size_bytes and os.path.exists(download_path) and \
+                os.path.getsize(download_path) > size_bytes:
+            # partial file does not belong to this file
+            os.remove(download_path)
+        digest = await loop.run_in_executor(None, self.hash_partial_file,
+                                            download_path)
+        with open(download_path, "ab") as out_file:
+            await self.stream_file(repo_name, commit_id, path, size_bytes,
+                                   out_file, digest, stats, retries)
+        if not codec:
+            # encoded content is recognised by its header even when the
+            # manifest entry was not usable
+            codec = TransferCodec.detect_file(download_path)
+            if codec:
+                encoded_path = partial_path + \
+                    PachydermClient.ENCODED_FILE_SUFFIX
+                os.replace(download_path, encoded_path)
+                download_path = encoded_path
+        if codec:
+            digest = await loop.run_in_executor(
+                None, TransferCodec.get(codec).decode_file, download_path,
+                partial_path)
+
+        if expected_hash and digest.hexdigest() != expected_hash:
+            os.remove(partial_path)
+            raise DatasetIntegrityException(f"content hash mismatch for {path}")
+        os.replace(partial_path, local_path)
+        if stats:
+            stats.add_file()
+
+    def hash_partial_file(self, partial_path):
+        """
+        returns a ContentDigest of the content downloaded before into
+        `partial_path`
+        """
+        digest = ContentDigest()
+        if os.path.exists(partial_path):
+            with open(partial_path, "rb") as in_file:
+                for chunk in iter(lambda: in_file.read(self.chunk_size), b""):
+                    digest.update(chunk)
+        return digest
+
+    async def stream_file(self, repo_name, commit_id, path, size_bytes,
+                          out_file, digest, stats=None, retries=0):
+        """
+        appends the part of a file not received yet to `out_file`, retrying
+        transient failures from where they stopped
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param path:
+            path of the file on pachyderm cluster
+        :param size_bytes:
+            size of the file, read until its end if None
+        :param out_file:
+            file opened for appending, its position is the number of bytes
+            received
+        :param digest:
+            ContentDigest updated with every chunk received
+        :param stats:
+            (Optional) TransferStats updated during the download
+        :param retries:
+            number of retries in case of a transient failure
+        """
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            received_bytes = out_file.tell()
+            if size_bytes and received_bytes >= size_bytes:
+                return
+            remaining_bytes = size_bytes - received_bytes if size_bytes else None
+            try:
+                async for chunk in self.iter_file(
+                        repo_name, commit_id, path,
+                        offset_bytes=received_bytes or None,
+                        size_bytes=remaining_bytes):
+                    digest.update(chunk)
+                    await loop.run_in_executor(None, out_file.write, chunk)
+                    if stats:
+                        stats.add_bytes(len(chunk))
+                return
+            except grpc.aio.AioRpcError as err:
+                if attempt >= retries or \
+                        err.code() not in self.RETRYABLE_STATUS_CODES:
+                    raise PachydermOperationException(
+                        f"Failed to download {path}: {err.details()}")
+                attempt += 1
+                await asyncio.sleep(self.RETRY_BACKOFF_SECONDS * attempt)
+
+    async def delete_dataset(self, repo_name, commit_id, file_path):
+        """
+        deletes a dataset from the cluster
+
+        The manifest entries of the deleted files are removed in the same
+        commit. When a branch name is given, the deletion is done in a new
+        commit on that branch
+
+        :param repo_name:
+            name of the repo dataset is in
+        :param commit_id:
+            id of an open commit or name of a branch
+        :param file_path:
+            path of the dataset on the pachyderm cluster
+        """
+        if not file_path or file_path == "/":
+            await self.delete_commit(repo_name, commit_id)
+            return
+        manifest = await self.get_manifest(repo_name, commit_id)
+        for path in manifest.paths_under(file_path):
+            manifest.remove(path)
+        commit_info = await self.inspect_commit(repo_name, commit_id)
+        if commit_info.commit.id == commit_id:
+            # an open commit is written into directly
+            await self.delete_file(repo_name, commit_id, file_path)
+            await self.put_manifest(repo_name, commit_id, manifest)
+            return
+        new_commit_id = await self.start_commit(repo_name, commit_id)
+        try:
+            await self.delete_file(repo_name, new_commit_id, file_path)
+            await self.finish_commit(repo_name, new_commit_id, manifest)
+        except BaseException:
+            await self.delete_commit(repo_name, new_commit_id)
+            raise
+
+    async def delete_file(self, repo_name, commit_id, file_path):
+        """
+        deletes a file or directory from an open commit
+        """
+        request = proto.DeleteFileRequest(
+            file=proto.File(commit=commit_from((repo_name, commit_id)),
+                            path=file_path))
+        await self.call(self.stub.DeleteFile, request)
@@ -0,0 +1,128 @@
+"""
+Benchmarks wire bytes against CPU time of the transfer codecs using a
+local fake PFS stub with a simulated WAN link
+
+    python -m xpresso.ai.core.data.pachyderm_repo_management.benchmarks.codec_benchmark
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    InvalidConfigException
+from xpresso.ai.core.data.pachyderm_repo_management.tests.fake_pfs_client import \
+    FakePachydermClient, FakePfsClient
+from xpresso.ai.core.data.pachyderm_repo_management.transfer_codec import CODECS, TransferCodec
+
+
+def create_sample_csv_files(dataset_dir, file_count, row_count):
+    """
+    creates `file_count` csv files shaped like our sales datasets
+
+    :return:
+        list of (local_path, pachyderm_path) tuples
+    """
+    randomizer = random.Random(0)
+    file_list = []
+    for index in range(file_count):
+        file_name = f"part-{index:05d}.csv"
+        local_path = os.path.join(dataset_dir, file_name)
+        with open(local_path, "w") as part_file:
+            part_file.write("date,store_id,sku,quantity,price\n")
+            for row in range(row_count):
+                part_file.write(
+                    f"2024-{row % 12 + 1:02d}-{row % 28 + 1:02d},"
+                    f"store_{randomizer.randint(1, 200)},"
+                    f"SKU{randomizer.randint(1, 5000):06d},"
+                    f"{randomizer.randint(1, 20)},"
+                    f"{randomizer.randint(100, 99999) / 100:.2f}\n")
+        file_list.append((local_path, f"dataset/benchmark/{file_name}"))
+    return file_list
+
+
+def run_transfer(file_list, codec, latency, bandwidth, pull_dir):
+    """
+    pushes and pulls `file_list` through a fresh fake cluster
+
+    :return:
+        dict with wire bytes and wall and CPU seconds of push and pull
+    """
+    fake_pfs_client = FakePfsClient(latency, bandwidth)
+    client = FakePachydermClient(fake_pfs_client)
+    client.set_codec(codec)
+
+    start_time, start_cpu = time.perf_counter(), time.process_time()
+    commit_id = client.push_dataset("benchmark_repo", "master", file_list,
+                                    "codec benchmark")
+    push_seconds = time.perf_counter() - start_time
+    push_cpu_seconds = time.process_time() - start_cpu
+    wire_bytes = fake_pfs_client.wire_bytes
+
+    manifest = client.get_manifest("benchmark_repo", commit_id)
+    # sizes as a FileInfo would report them, i.e. of the stored bytes
+    stored_files = fake_pfs_client.commits[("benchmark_repo", commit_id)]
+    download_list = [
+        (f"/{pachyderm_path}",
+         os.path.join(pull_dir, os.path.basename(pachyderm_path)),
+         len(stored_files[f"/{pachyderm_path}"]))
+        for (_, pachyderm_path) in file_list
+    ]
+    start_time, start_cpu = time.perf_counter(), time.process_time()
+    client.download_files("benchmark_repo", commit_id, download_list,
+                          manifest)
+    return {
+        "wire_bytes": wire_bytes,
+        "push_seconds": push_seconds,
+        "push_cpu_seconds": push_cpu_seconds,
+        "pull_seconds": time.perf_counter() - start_time,
+        "pull_cpu_seconds": time.process_time() - start_cpu
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="simulated round trip per request in seconds")
+    parser.add_argument("--bandwidth", type=float, default=10 * 1024 * 1024,
+                        help="simulated bytes per second per stream")
+    parser.add_argument("--codecs", nargs="+",
+                        default=["none"] + sorted(CODECS))
+    args = parser.parse_args()
+
+    dataset_dir = tempfile.mkdtemp(prefix="codec_benchmark_")
+    try:
+        file_list = create_sample_csv_files(dataset_dir, args.files,
+                                            args.rows)
+        total_bytes = sum(os.path.getsize(local_path)
+                          for (local_path, _) in file_list)
+        print(f"{args.files} files, {total_bytes / 2 ** 20:.1f} MiB, "
+              f"{args.bandwidth / 2 ** 20:.1f} MiB/s link")
+        for codec in args.codecs:
+            codec = None if codec == "none" else codec
+            try:
+                if codec:
+                    TransferCodec.get(codec)
+            except InvalidConfigException as err:
+                print(f"{codec:<6s} skipped: {err}")
+                continue
+            pull_dir = tempfile.mkdtemp(dir=dataset_dir)
+            result = run_transfer(file_list, codec, args.latency,
+                                  args.bandwidth, pull_dir)
+            print(f"{codec or 'none':<6s} "
+                  f"wire {result['wire_bytes'] / 2 ** 20:8.2f} MiB "
+                  f"ratio x{total_bytes / result['wire_bytes']:5.2f} "
+                  f"push {result['push_seconds']:6.2f}s "
+                  f"(cpu {result['push_cpu_seconds']:5.2f}s) "
+                  f"pull {result['pull_seconds']:6.2f}s "
+                  f"(cpu {result['pull_cpu_seconds']:5.2f}s)")
+    finally:
+        shutil.rmtree(dataset_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmarks PachydermClient.push_dataset against a local fake PFS stub
+
+    python -m xpresso.ai.core.data.pachyderm_repo_management.benchmarks.push_benchmark
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from xpresso.ai.core.data.pachyderm_repo_management.tests.fake_pfs_client import \
+    FakePachydermClient, FakePfsClient
+
+
+def create_sample_files(dataset_dir, file_count, file_size):
+    """
+    creates `file_count` part files of `file_size` bytes each
+
+    :return:
+        list of (local_path, pachyderm_path) tuples
+    """
+    file_list = []
+    for index in range(file_count):
+        file_name = f"part-{index:05d}.csv"
+        local_path = os.path.join(dataset_dir, file_name)
+        with open(local_path, "wb") as part_file:
+            part_file.write(os.urandom(file_size))
+        file_list.append((local_path, f"dataset/benchmark/{file_name}"))
+    return file_list
+
+
+def run_push(file_list, max_workers, latency, bandwidth):
+    """
+    pushes `file_list` to a fresh fake cluster and returns elapsed seconds
+    """
+    client = FakePachydermClient(FakePfsClient(latency, bandwidth))
+    start_time = time.perf_counter()
+    client.push_dataset("benchmark_repo", "master", file_list,
+                        "benchmark push", max_workers=max_workers)
+    return time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--file-size", type=int, default=64 * 1024)
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="simulated round trip per request in seconds")
+    parser.add_argument("--bandwidth", type=float, default=50 * 1024 * 1024,
+                        help="simulated bytes per second per stream")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    dataset_dir = tempfile.mkdtemp(prefix="push_benchmark_")
+    try:
+        file_list = create_sample_files(dataset_dir, args.files,
+                                        args.file_size)
+        total_bytes = args.files * args.file_size
+        print(f"{args.files} files, {total_bytes / 2 ** 20:.1f} MiB, "
+              f"{args.latency * 1000:.0f}ms latency")
+        baseline = None
+        for max_workers in args.workers:
+            elapsed = run_push(file_list, max_workers, args.latency,
+                               args.bandwidth)
+            baseline = baseline or elapsed
+            print(f"workers={max_workers:<3d} {elapsed:8.2f}s "
+                  f"{total_bytes / elapsed / 2 ** 20:8.1f} MiB/s "
+                  f"speedup x{baseline / elapsed:.1f}")
+    finally:
+        shutil.rmtree(dataset_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import os
+import threading
+
+import grpc
+import python_pachyderm as pachyderm
+from python_pachyderm.client.pfs import pfs_pb2_grpc
+from python_pachyderm.client.pps import pps_pb2_grpc
+from python_pachyderm.util import get_address, get_metadata
+
+from xpresso.ai.core.utils.singleton import Singleton
+
+
+class ChannelRegistry(metaclass=Singleton):
+    """
+    Process wide registry of gRPC channels to pachyderm clusters
+
+    One channel is kept per (address, root certificates, auth token) and it
+    is shared by all the PFS and PPS clients of that cluster and identity,
+    so that requests are multiplexed over a single HTTP/2 connection.
+    Clients of different users never share a channel. Channels connect
+    lazily on the first request. A forked child process drops the channels
+    inherited from its parent and creates its own.
+
+    The clients are created with `__new__` because their `__init__` opens
+    a private channel; the attributes `__init__` sets (CLIENT_ATTRIBUTES)
+    are set here instead. channel_pool_test compares them with the ones of
+    a client built by `__init__`, so an upgrade adding attributes fails.
+    """
+    KEEPALIVE_TIME_MS = 30 * 1000
+    KEEPALIVE_TIMEOUT_MS = 10 * 1000
+    MAX_MESSAGE_LENGTH = 64 * 1024 * 1024
+    CHANNEL_OPTIONS = [
+        ("grpc.keepalive_time_ms", KEEPALIVE_TIME_MS),
+        ("grpc.keepalive_timeout_ms", KEEPALIVE_TIMEOUT_MS),
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.http2.max_pings_without_data", 0),
+        ("grpc.max_send_message_length", MAX_MESSAGE_LENGTH),
+        ("grpc.max_receive_message_length", MAX_MESSAGE_LENGTH),
+    ]
+    # attributes set by PfsClient.__init__ and PpsClient.__init__
+    CLIENT_ATTRIBUTES = ("metadata", "channel", "stub")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = {}
+        self.pid = os.getpid()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.reset_after_fork)
+
+    def reset_after_fork(self):
+        """
+        forgets the channels of the parent process in a forked child
+        """
+        self.lock = threading.Lock()
+        self.channels = {}
+        self.pid = os.getpid()
+
+    def get_channel(self, host=None, port=None, root_certs=None,
+                    auth_token=None):
+        """
+        returns the shared channel to a pachyderm cluster
+
+        :param host:
+            (Optional) pachd host, PACHD_ADDRESS is used if not provided
+        :param port:
+            (Optional) pachd port
+        :param root_certs:
+            (Optional) PEM encoded root certificates for a secure channel
+        :param auth_token:
+            (Optional) authentication token the channel is used with
+        :return:
+            grpc Channel object
+        """
+        if self.pid != os.getpid():
+            # fallback for platforms without os.register_at_fork
+            self.reset_after_fork()
+
+        address = get_address(host, port)
+        channel_key = (address, root_certs, auth_token)
+        with self.lock:
+            channel = self.channels.get(channel_key)
+            if channel is None:
+                if root_certs:
+                    credentials = grpc.ssl_channel_credentials(
+                        root_certificates=root_certs)
+                    channel = grpc.secure_channel(
+                        address, credentials, options=self.CHANNEL_OPTIONS)
+                else:
+                    channel = grpc.insecure_channel(
+                        address, options=self.CHANNEL_OPTIONS)
+                self.channels[channel_key] = channel
+            return channel
+
+    def pfs_client(self, host=None, port=None, auth_token=None,
+                   root_certs=None):
+        """
+        returns a PfsClient which uses the shared channel
+
+        :param host:
+            (Optional) pachd host
+        :param port:
+            (Optional) pachd port
+        :param auth_token:
+            (Optional) authentication token of the cluster
+        :param root_certs:
+            (Optional) PEM encoded root certificates
+        :return:
+            PfsClient object
+        """
+        channel = self.get_channel(host, port, root_certs, auth_token)
+        return self.build_client(pachyderm.PfsClient, pfs_pb2_grpc.APIStub,
+                                 channel, auth_token)
+
+    def pps_client(self, host=None, port=None, auth_token=None,
+                   root_certs=None):
+        """
+        returns a PpsClient which uses the shared channel
+
+        :param host:
+            (Optional) pachd host
+        :param port:
+            (Optional) pachd port
+        :param auth_token:
+            (Optional) authentication token of the cluster
+        :param root_certs:
+            (Optional) PEM encoded root certificates
+        :return:
+            PpsClient object
+        """
+        channel = self.get_channel(host, port, root_certs, auth_token)
+        return self.build_client(pachyderm.PpsClient, pps_pb2_grpc.APIStub,
+                                 channel, auth_token)
+
+    @staticmethod
+    def build_client(client_class, stub_class, channel, auth_token):
+        """
+        creates a python_pachyderm client on a channel without calling its
+        `__init__`, which would open a channel of its own
+
+        :param client_class:
+            PfsClient or PpsClient
+        :param stub_class:
+            gRPC stub class of the client's API
+        :param channel:
+            shared grpc Channel object
+        :param auth_token:
+            authentication token sent as the metadata of every request
+        :return:
+            client object
+        """
+        client = client_class.__new__(client_class)
+        client.metadata = get_metadata(auth_token)
+        client.channel = channel
+        client.stub = stub_class(channel)
+        return client
+
+    def close(self):
+        """
+        closes all the channels of this process
+        """
+        with self.lock:
+            for channel in self.channels.values():
+                channel.close()
+            self.channels = {}
@@ -0,0 +1,175 @@
+import warnings
+
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    PachydermOperationException, DatasetPathException
+
+
+class CommitTransaction:
+    """
+    Single pachyderm commit shared by several pushes
+
+    The commit is opened when the `with` block is entered. Datasets, local
+    directories and in-memory buffers pushed inside the block are streamed
+    into it with the bounded upload pool of PachydermClient, hence memory
+    use does not grow with the size of the transaction. The commit is
+    finished with one manifest update on a clean exit and deleted if the
+    block raises
+    """
+    def __init__(self, repo_manager, repo_name, branch_name, description=None,
+                 max_workers=None):
+        """
+
+        :param repo_manager:
+            PachydermRepoManager which opened the transaction
+        :param repo_name:
+            name of the repo
+        :param branch_name:
+            name of the branch
+        :param description:
+            (Optional) description of the commit
+        :param max_workers:
+            (Optional) number of files uploaded concurrently
+        """
+        self.repo_manager = repo_manager
+        self.pachyderm_client = repo_manager.pachyderm_client
+        self.repo_name = repo_name
+        self.branch_name = branch_name
+        self.description = description
+        self.max_workers = max_workers
+        self.manifest = None
+        self.commit_id = None
+
+    def __enter__(self):
+        self.manifest = self.pachyderm_client.get_manifest(self.repo_name,
+                                                           self.branch_name)
+        self.commit_id = self.pachyderm_client.start_commit(
+            self.repo_name, self.branch_name, self.description,
+            self.pachyderm_client.codec_name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        commit_id = self.commit_id
+        self.commit_id = None
+        if exc_type is not None:
+            self.abort(commit_id)
+            return False
+        try:
+            self.pachyderm_client.finish_commit(self.repo_name,
+                                                self.branch_name, commit_id,
+                                                self.manifest)
+        except BaseException:
+            self.abort(commit_id)
+            raise
+        # id of the finished commit stays available after the block
+        self.commit_id = commit_id
+        return False
+
+    def abort(self, commit_id):
+        """
+        deletes the commit after the block or its commit failed
+
+        A failure to delete it is only warned about, hence the error which
+        caused the abort is the one raised
+
+        :param commit_id:
+            id of the open commit
+        """
+        try:
+            self.pachyderm_client.abort_commit(self.repo_name, commit_id)
+        except Exception as err:
+            warnings.warn(f"commit {commit_id} of {self.repo_name} could not "
+                          f"be deleted: {err}", stacklevel=3)
+
+    def check_open(self):
+        """
+        raises if the transaction is not inside its `with` block
+        """
+        if self.commit_id is None or self.manifest is None:
+            raise PachydermOperationException(
+                "transaction is not open; use it in a `with` block")
+
+    def push_file_list(self, file_path_list):
+        """
+        uploads local files into the commit
+
+        :param file_path_list:
+            list of (local_path, pachyderm_path) tuples
+        :return:
+            list of pachyderm paths uploaded
+        """
+        self.check_open()
+        uploaded_files = self.pachyderm_client.upload_files(
+            self.repo_name, self.commit_id, file_path_list, self.max_workers)
+        for (pachyderm_path, sha256, size_bytes, mtime,
+             stored_size_bytes) in uploaded_files:
+            self.manifest.add(pachyderm_path, sha256, size_bytes, mtime,
+                              self.pachyderm_client.codec_name,
+                              stored_size_bytes)
+        return [uploaded_file[0] for uploaded_file in uploaded_files]
+
+    def push_dataset(self, dataset):
+        """
+        saves a dataset locally and uploads it into the commit
+
+        :param dataset:
+            AbstractDataset object with info on dataset
+        :return:
+            list of pachyderm paths uploaded
+        """
+        self.check_open()
+        dataset_name, file_list = \
+            self.repo_manager.fetch_dataset_file_list(dataset)
+        return self.push_file_list(file_list)
+
+    def push_files(self, path, dataset_name):
+        """
+        uploads a local file or directory into the commit
+
+        :param path:
+            path of a file or directory of the dataset
+        :param dataset_name:
+            name of the dataset
+        :return:
+            list of pachyderm paths uploaded
+        """
+        self.check_open()
+        file_list = self.repo_manager.fetch_local_file_list(path,
+                                                            dataset_name)
+        return self.push_file_list(file_list)
+
+    def put_buffer(self, pachyderm_path, buffer):
+        """
+        uploads in-memory content into the commit
+
+        :param pachyderm_path:
+            path of the file on pachyderm cluster
+        :param buffer:
+            bytes or a binary file like object, read one chunk at a time
+        :return:
+            pachyderm path uploaded
+        """
+        self.check_open()
+        pachyderm_path, sha256, size_bytes, stored_size_bytes = \
+            self.pachyderm_client.upload_buffer(self.repo_name, self.commit_id,
+                                                buffer, pachyderm_path)
+        self.manifest.add(pachyderm_path, sha256, size_bytes,
+                          codec=self.pachyderm_client.codec_name,
+                          stored_size_bytes=stored_size_bytes)
+        return pachyderm_path
+
+    def delete_path(self, path):
+        """
+        deletes a file or directory from the commit
+
+        :param path:
+            path on pachyderm cluster
+        """
+        self.check_open()
+        if not path or path == "/":
+            # deleting the root would delete the commit itself
+            raise DatasetPathException("root of the commit can not be deleted")
+        # manifest of the transaction is saved when it is committed
+        self.pachyderm_client.delete_dataset(self.repo_name, self.commit_id,
+                                             path, update_manifest=False)
+        for file_path in self.manifest.paths_under(path):
+            self.manifest.remove(file_path)
@@ -0,0 +1,314 @@
+import glob
+import os
+import queue
+import threading
+import time
+
+from grpc._channel import _Rendezvous as PachClientException
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    PachydermOperationException
+
+
+class CommitWatcher:
+    """
+    Keeps a local mirror of a branch in sync with pachyderm cluster
+
+    A subscriber thread follows the finished commits of the branch and hands
+    them to an applier thread through a bounded queue. When the applier
+    falls behind, the queue fills up and the subscriber stops reading the
+    stream, which pushes back on the server. The applier drains every
+    commit waiting in the queue and syncs only to the latest of them, so a
+    burst of commits costs one sync.
+
+    Every sync compares the server side file hashes of the new commit with
+    the ones of the last applied commit. Only the added and modified files
+    are downloaded and the removed ones are deleted from the mirror. The
+    first sync of a watcher started without `from_commit_id` is a full
+    sync, which also deletes local files of the mirror missing in the
+    commit. A
+    failed sync is retried with an exponential backoff until it succeeds or
+    a newer commit supersedes it. Partial files are resumed only by a retry
+    of the same commit, any other sync removes them first. Errors of a sync
+    and of the `on_sync` callback are kept in `last_error` and never stop
+    the watcher
+    """
+    DEFAULT_QUEUE_SIZE = 16
+    # seconds to wait for a commit before checking if watcher is stopped
+    POLL_INTERVAL_SECONDS = 1
+    # delay before the first retry of a failed sync, doubled on every
+    # further failure up to the max
+    RETRY_BACKOFF_SECONDS = 2
+    MAX_RETRY_BACKOFF_SECONDS = 300
+
+    def __init__(self, pachyderm_client, repo_name, branch_name, local_dir,
+                 path="/", from_commit_id=None, queue_size=None,
+                 max_workers=None, cache=None, on_sync=None):
+        """
+
+        :param pachyderm_client:
+            PachydermClient connected to the cluster
+        :param repo_name:
+            name of the repo
+        :param branch_name:
+            name of the branch to be mirrored
+        :param local_dir:
+            directory where the mirror is kept
+        :param path:
+            (Optional) path on pachyderm cluster to be mirrored
+        :param from_commit_id:
+            (Optional) commit the mirror is already in sync with. The mirror
+            is fully synced to the branch head if not provided
+        :param queue_size:
+            (Optional) number of commits buffered before the subscription
+            is paused
+        :param max_workers:
+            (Optional) number of files downloaded concurrently
+        :param cache:
+            (Optional) DatasetCache used to skip files pulled before
+        :param on_sync:
+            (Optional) callable called with the commit id and the dict of
+            added, modified and removed paths after every sync
+        """
+        self.pachyderm_client = pachyderm_client
+        self.repo_name = repo_name
+        self.branch_name = branch_name
+        self.local_dir = local_dir
+        self.path = path
+        self.max_workers = max_workers
+        self.cache = cache
+        self.on_sync = on_sync
+        self.commit_queue = queue.Queue(maxsize=queue_size or
+                                        self.DEFAULT_QUEUE_SIZE)
+        self.stop_event = threading.Event()
+        self.stream = None
+        self.threads = []
+
+        self.last_commit_id = from_commit_id
+        # commit whose sync failed and whose partial files may be left
+        self.failed_commit_id = None
+        # consecutive failed syncs and monotonic time of the next retry
+        self.failure_count = 0
+        self.retry_at = None
+        self.file_hashes = {}
+        # nothing is known of the local files until the first sync
+        self.full_sync = from_commit_id is None
+        if from_commit_id:
+            self.file_hashes = self.pachyderm_client.get_file_hashes(
+                repo_name, from_commit_id, path)
+        # counters of the syncs done and commits skipped by coalescing
+        self.sync_count = 0
+        self.coalesced_count = 0
+        self.last_error = None
+
+    def start(self):
+        """
+        starts the subscriber and applier threads
+        """
+        if self.threads:
+            raise PachydermOperationException("watcher is already started")
+        self.stop_event.clear()
+        self.threads = [
+            threading.Thread(target=self.subscribe, daemon=True,
+                             name=f"commit-subscriber-{self.repo_name}"),
+            threading.Thread(target=self.apply, daemon=True,
+                             name=f"commit-applier-{self.repo_name}")
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        stops the watcher and waits for its threads to exit
+
+        :param timeout:
+            (Optional) seconds to wait for each thread
+        """
+        self.stop_event.set()
+        if self.stream is not None:
+            self.stream.cancel()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def subscribe(self):
+        """
+        feeds finished commits of the branch into the queue
+        """
+        from_commit_id = self.last_commit_id
+        if from_commit_id is None:
+            try:
+                from_commit_id = self.pachyderm_client.inspect_branch(
+                    self.repo_name, self.branch_name).head.id or None
+            except PachydermOperationException as err:
+                self.last_error = err
+            if from_commit_id:
+                # the mirror starts from the current head
+                self.enqueue(from_commit_id)
+
+        while not self.stop_event.is_set():
+            try:
+                self.stream = self.pachyderm_client.subscribe_commit(
+                    self.repo_name, self.branch_name, from_commit_id)
+                for commit_info in self.stream:
+                    from_commit_id = commit_info.commit.id
+                    if not self.enqueue(from_commit_id):
+                        return
+            except (PachClientException, PachydermOperationException) as err:
+                if self.stop_event.is_set():
+                    return
+                self.last_error = err
+            # subscription is opened again from the last seen commit
+            self.stop_event.wait(self.POLL_INTERVAL_SECONDS)
+
+    def enqueue(self, commit_id):
+        """
+        puts a commit into the queue, blocking while it is full
+
+        :return:
+            False if watcher was stopped while waiting
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.commit_queue.put(commit_id,
+                                      timeout=self.POLL_INTERVAL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def apply(self):
+        """
+        syncs the mirror to the latest commit waiting in the queue
+        """
+        while not self.stop_event.is_set():
+            try:
+                commit_id = self.commit_queue.get(
+                    timeout=self.POLL_INTERVAL_SECONDS)
+            except queue.Empty:
+                if self.failed_commit_id is None or \
+                        time.monotonic() < self.retry_at:
+                    continue
+                commit_id = self.failed_commit_id
+            # coalesces all the commits which arrived meanwhile
+            while True:
+                try:
+                    commit_id = self.commit_queue.get_nowait()
+                    self.coalesced_count += 1
+                except queue.Empty:
+                    break
+            if commit_id == self.last_commit_id:
+                continue
+            try:
+                self.sync(commit_id)
+            except Exception as err:
+                # last applied commit is kept, the failed one is retried
+                # when the queue is idle unless a newer commit arrives
+                self.failed_commit_id = commit_id
+                self.last_error = err
+                self.failure_count += 1
+                self.retry_at = time.monotonic() + self.get_retry_delay()
+
+    def get_retry_delay(self):
+        """
+        returns seconds to wait before retrying the failed sync
+        """
+        return min(self.RETRY_BACKOFF_SECONDS * 2 ** (self.failure_count - 1),
+                   self.MAX_RETRY_BACKOFF_SECONDS)
+
+    def sync(self, commit_id):
+        """
+        applies the difference between the last applied commit and
+        `commit_id` to the mirror
+
+        :param commit_id:
+            id of the commit to be mirrored
+        :return:
+            dict with lists of added, modified and removed paths
+        """
+        new_hashes = self.pachyderm_client.get_file_hashes(
+            self.repo_name, commit_id, self.path)
+        changes = {
+            "added": sorted(set(new_hashes) - set(self.file_hashes)),
+            "modified": sorted(file_path for file_path in
+                               set(new_hashes) & set(self.file_hashes)
+                               if new_hashes[file_path] !=
+                               self.file_hashes[file_path]),
+            "removed": sorted(set(self.file_hashes) - set(new_hashes))
+        }
+        if self.full_sync:
+            changes["removed"] = self.find_stale_files(new_hashes)
+        file_path_list = [
+            (file_path, self.local_path(file_path), new_hashes[file_path][1])
+            for file_path in changes["added"] + changes["modified"]
+        ]
+        if commit_id != self.failed_commit_id:
+            for (_, local_path, _) in file_path_list:
+                self.remove_partial_files(local_path)
+        if file_path_list:
+            manifest = self.pachyderm_client.get_manifest(self.repo_name,
+                                                          commit_id)
+            self.pachyderm_client.download_files(
+                self.repo_name, commit_id, file_path_list, manifest,
+                self.max_workers, cache=self.cache)
+        for file_path in changes["removed"]:
+            local_path = self.local_path(file_path)
+            if os.path.isfile(local_path):
+                os.remove(local_path)
+
+        self.file_hashes = new_hashes
+        self.full_sync = False
+        self.last_commit_id = commit_id
+        self.failed_commit_id = None
+        self.failure_count = 0
+        self.retry_at = None
+        self.sync_count += 1
+        if self.on_sync:
+            try:
+                self.on_sync(commit_id, changes)
+            except Exception as err:
+                # the commit is applied, a failing callback must not make
+                # it retried or stop the applier
+                self.last_error = err
+        return changes
+
+    def find_stale_files(self, new_hashes):
+        """
+        lists the local files of the mirror which are not in a commit
+
+        :param new_hashes:
+            dict of path to (hash, size_bytes) of the files of the commit
+        :return:
+            sorted list of pachyderm paths of the stale files
+        """
+        stale_paths = []
+        for (dir_path, _, file_names) in os.walk(self.local_path(self.path)):
+            for file_name in file_names:
+                relative_path = os.path.relpath(
+                    os.path.join(dir_path, file_name), self.local_dir)
+                file_path = "/" + relative_path.replace(os.sep, "/")
+                if file_path not in new_hashes:
+                    stale_paths.append(file_path)
+        return sorted(stale_paths)
+
+    def remove_partial_files(self, local_path):
+        """
+        removes the partial, encoded and range files left next to a mirror
+        file by an earlier failed sync
+        """
+        partial_path = local_path + self.pachyderm_client.PARTIAL_FILE_SUFFIX
+        for stale_path in glob.glob(glob.escape(partial_path) + "*"):
+            if os.path.isfile(stale_path):
+                os.remove(stale_path)
+
+    def local_path(self, file_path):
+        """
+        returns the path of a pachyderm file inside the mirror
+        """
+        return os.path.join(self.local_dir, file_path.lstrip("/"))
@@ -0,0 +1,345 @@
+import fcntl
+import os
+import shutil
+import sqlite3
+import stat
+import threading
+import time
+import uuid
+import warnings
+
+
+class DatasetCache:
+    """
+    Content addressed local cache of files pulled from pachyderm cluster
+
+    Every file is stored once under its sha256 in `objects/` and the
+    (repo, commit, path) of each pulled file is mapped to that hash in a
+    sqlite index. Files are materialized into the pull directory as
+    reflinks, which share blocks until either side is written, or as
+    copies where reflinks are not supported. Least recently used objects
+    are evicted once the cache grows beyond `max_size_bytes`.
+
+    Reflinks need a copy-on-write filesystem such as btrfs or xfs. On
+    others, e.g. ext4, every file is copied into the cache when it is
+    pulled and copied out of it when it is reused, hence a cold pull
+    writes each file twice. A warning is issued when the cache falls back
+    to copies.
+
+    With `LINK_TYPE_HARDLINK` the pulled file and the cached object are the
+    same inode, hence cached objects being read only makes the pulled
+    files read only as well. The size and mtime of every object are
+    recorded so an object changed in place is detected and dropped
+    """
+    DEFAULT_CACHE_DIR = os.path.join("~", ".xpresso", "pachyderm_cache")
+    DEFAULT_MAX_SIZE_BYTES = 20 * 1024 * 1024 * 1024
+    INDEX_FILE_NAME = "index.sqlite"
+    OBJECTS_DIR_NAME = "objects"
+    LINK_TYPE_HARDLINK = "hardlink"
+    LINK_TYPE_REFLINK = "reflink"
+    LINK_TYPE_COPY = "copy"
+    # ioctl request to clone a file on copy-on-write filesystems
+    FICLONE = 0x40049409
+
+    def __init__(self, cache_dir=None, max_size_bytes=None,
+                 link_type=LINK_TYPE_REFLINK):
+        """
+
+        :param cache_dir:
+            (Optional) directory where cache is saved
+        :param max_size_bytes:
+            (Optional) total size of cached objects before eviction
+        :param link_type:
+            (Optional) preferred way to materialize a cached file. Falls
+            back to reflink and then to a copy if it is not supported.
+            Hard linked files are left read only
+        """
+        self.cache_dir = os.path.expanduser(cache_dir or self.DEFAULT_CACHE_DIR)
+        self.max_size_bytes = max_size_bytes or self.DEFAULT_MAX_SIZE_BYTES
+        self.link_type = link_type
+        self.objects_dir = os.path.join(self.cache_dir, self.OBJECTS_DIR_NAME)
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.reflink_supported = self.probe_reflink()
+        if link_type == self.LINK_TYPE_REFLINK and not self.reflink_supported:
+            warnings.warn(
+                f"{self.cache_dir} does not support reflinks, cached files "
+                f"are copied. Use a copy-on-write filesystem or "
+                f"link_type='{self.LINK_TYPE_HARDLINK}' to avoid the copies",
+                stacklevel=2)
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            os.path.join(self.cache_dir, self.INDEX_FILE_NAME),
+            check_same_thread=False
+        )
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS objects ("
+                "sha256 TEXT PRIMARY KEY, size_bytes INTEGER, "
+                "last_access REAL, mtime REAL)"
+            )
+            object_columns = [row[1] for row in self.connection.execute(
+                "PRAGMA table_info(objects)")]
+            if "mtime" not in object_columns:
+                # index created before mtime was recorded
+                self.connection.execute(
+                    "ALTER TABLE objects ADD COLUMN mtime REAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "repo TEXT, commit_id TEXT, path TEXT, sha256 TEXT, "
+                "PRIMARY KEY (repo, commit_id, path))"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS objects_last_access "
+                "ON objects (last_access)"
+            )
+
+    def object_path(self, sha256):
+        """
+        returns path of the cached object of a hash
+        """
+        return os.path.join(self.objects_dir, sha256[:2], sha256[2:])
+
+    def lookup(self, repo_name, commit_id, path):
+        """
+        returns the hash of a file pulled before or None
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param path:
+            path of the file on pachyderm cluster
+        :return:
+            sha256 of the file content
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT sha256 FROM files WHERE repo = ? AND commit_id = ? "
+                "AND path = ?", (repo_name, commit_id, path)
+            ).fetchone()
+        return row[0] if row else None
+
+    def materialize(self, sha256, local_path):
+        """
+        links a cached object to `local_path`
+
+        :param sha256:
+            hash of the file content
+        :param local_path:
+            path on local system where the file is needed
+        :return:
+            True if the object was linked to `local_path`, else False
+        """
+        object_path = self.object_path(sha256)
+        with self.lock:
+            if not self.is_object_valid(sha256):
+                return False
+            with self.connection:
+                self.connection.execute(
+                    "UPDATE objects SET last_access = ? WHERE sha256 = ?",
+                    (time.time(), sha256)
+                )
+
+        link_path = local_path + ".link"
+        try:
+            if os.path.lexists(link_path):
+                os.remove(link_path)
+            self.link_file(object_path, link_path)
+            os.replace(link_path, local_path)
+        except OSError:
+            # object was evicted by another thread or process after it was
+            # checked, the file is downloaded instead
+            if os.path.lexists(link_path):
+                os.remove(link_path)
+            with self.lock:
+                self.is_object_valid(sha256)
+            return False
+        return True
+
+    def add(self, repo_name, commit_id, path, local_path, sha256):
+        """
+        adds a pulled file to the cache
+
+        The file is linked into the cache when possible hence adding it
+        does not copy its content
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param path:
+            path of the file on pachyderm cluster
+        :param local_path:
+            path of the pulled file on local system
+        :param sha256:
+            hash of the file content
+        """
+        object_path = self.object_path(sha256)
+        with self.lock:
+            object_valid = self.is_object_valid(sha256)
+        temp_path = None
+        if not object_valid:
+            # content is linked or copied without holding the lock, hence
+            # other pulls are not blocked by a slow copy
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            # unique across processes sharing the cache directory
+            temp_path = f"{object_path}.{os.getpid()}.{uuid.uuid4().hex}"
+            try:
+                self.link_file(local_path, temp_path)
+                os.chmod(temp_path,
+                         stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            except BaseException:
+                if os.path.lexists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+        with self.lock:
+            if temp_path:
+                if self.is_object_valid(sha256):
+                    # same content was added by another thread meanwhile
+                    os.remove(temp_path)
+                else:
+                    os.replace(temp_path, object_path)
+            object_stat = os.stat(object_path)
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO objects (sha256, size_bytes, "
+                    "last_access, mtime) VALUES (?, ?, ?, ?)",
+                    (sha256, object_stat.st_size, time.time(),
+                     object_stat.st_mtime)
+                )
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                    (repo_name, commit_id, path, sha256)
+                )
+            self.evict()
+
+    def is_object_valid(self, sha256):
+        """
+        checks if a cached object is still as it was added, removing it
+        otherwise. Must be called with `lock` acquired
+
+        :param sha256:
+            hash of the file content
+        :return:
+            True if the object is present with its recorded size and mtime
+        """
+        row = self.connection.execute(
+            "SELECT size_bytes, mtime FROM objects WHERE sha256 = ?",
+            (sha256,)
+        ).fetchone()
+        if not row:
+            return False
+        try:
+            object_stat = os.stat(self.object_path(sha256))
+        except OSError:
+            object_stat = None
+        (size_bytes, mtime) = row
+        if object_stat is None or object_stat.st_size != size_bytes or \
+                mtime is None or object_stat.st_mtime != mtime:
+            # object was removed or changed outside of the cache
+            self.remove_object(sha256)
+            return False
+        return True
+
+    def evict(self):
+        """
+        removes least recently used objects until the cache fits in
+        `max_size_bytes`. Must be called with `lock` acquired
+        """
+        total_size = self.connection.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM objects"
+        ).fetchone()[0]
+        if total_size <= self.max_size_bytes:
+            return
+        rows = self.connection.execute(
+            "SELECT sha256, size_bytes FROM objects ORDER BY last_access"
+        ).fetchall()
+        for (sha256, size_bytes) in rows:
+            if total_size <= self.max_size_bytes:
+                break
+            self.remove_object(sha256)
+            total_size -= size_bytes
+
+    def remove_object(self, sha256):
+        """
+        removes an object and all the files pointing to it
+        """
+        object_path = self.object_path(sha256)
+        if os.path.exists(object_path):
+            os.remove(object_path)
+        with self.connection:
+            self.connection.execute("DELETE FROM files WHERE sha256 = ?",
+                                    (sha256,))
+            self.connection.execute("DELETE FROM objects WHERE sha256 = ?",
+                                    (sha256,))
+
+    def size_bytes(self):
+        """
+        returns the total size of cached objects
+        """
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COALESCE(SUM(size_bytes), 0) FROM objects"
+            ).fetchone()[0]
+
+    def link_file(self, source_path, destination_path):
+        """
+        makes `destination_path` share the content of `source_path`
+
+        Tries a hard link, then a reflink and at last copies the file
+        """
+        if self.link_type == self.LINK_TYPE_HARDLINK:
+            try:
+                os.link(source_path, destination_path)
+                return
+            except OSError:
+                pass
+        if self.link_type in (self.LINK_TYPE_HARDLINK,
+                              self.LINK_TYPE_REFLINK) and \
+                self.reflink_supported:
+            try:
+                self.reflink_file(source_path, destination_path)
+                return
+            except OSError:
+                if os.path.exists(destination_path):
+                    os.remove(destination_path)
+        shutil.copyfile(source_path, destination_path)
+
+    def reflink_file(self, source_path, destination_path):
+        """
+        clones a file on filesystems supporting copy-on-write
+        """
+        with open(source_path, "rb") as source_file, \
+                open(destination_path, "wb") as destination_file:
+            fcntl.ioctl(destination_file.fileno(), self.FICLONE,
+                        source_file.fileno())
+
+    def probe_reflink(self):
+        """
+        checks once if the objects directory supports reflinks
+
+        :return:
+            True if a file can be cloned in the objects directory
+        """
+        probe_path = os.path.join(
+            self.objects_dir, f".probe.{os.getpid()}.{uuid.uuid4().hex}")
+        try:
+            with open(probe_path, "wb") as probe_file:
+                probe_file.write(b"probe")
+            self.reflink_file(probe_path, probe_path + ".clone")
+            return True
+        except OSError:
+            return False
+        finally:
+            for path in (probe_path, probe_path + ".clone"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def close(self):
+        """
+        closes the cache index
+        """
+        with self.lock:
+            self.connection.close()
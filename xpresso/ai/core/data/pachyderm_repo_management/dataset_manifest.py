@@ -0,0 +1,251 @@
+import hashlib
+import json
+
+
+class DatasetManifest:
+    """
+    Content hashes of all the files pushed to a pachyderm branch
+
+    Pachyderm's own FileInfo hash is computed over its internal object
+    layout, hence it can not be compared with a hash of local content. The
+    manifest maps each pachyderm file path to the sha256 and size of its
+    raw content.
+
+    Manifests are kept out of the data tree, in the MANIFEST_BRANCH of the
+    same repo with one file per commit id, hence pipelines reading the
+    repo never see them. A commit written without going through
+    PachydermClient, e.g. by pachctl or a pipeline, has no manifest of its
+    own and uses the one of its closest ancestor, which may be stale. An
+    entry is used only after `get_verified` matched it with the size
+    pachyderm reports for the file, otherwise the file is treated as if it
+    had no entry.
+
+    Commits pushed by older versions hold their manifest in the data tree
+    at LEGACY_MANIFEST_PATH. It is still read, and hidden from listings
+    """
+    # branch of every repo holding the manifests of its commits
+    MANIFEST_BRANCH = "xpresso-manifests"
+    # directory of the data tree used for metadata by older versions
+    METADATA_DIR = "/.xpresso"
+    LEGACY_MANIFEST_PATH = "/.xpresso/manifest.json"
+    MANIFEST_VERSION = 1
+    HASH_ALGORITHM = "sha256"
+    SHA256 = "sha256"
+    SIZE = "size_bytes"
+    MTIME = "mtime"
+    CODEC = "codec"
+    # size of the content as stored on the cluster, only recorded when it
+    # differs from the raw size i.e. for encoded files
+    STORED_SIZE = "stored_size_bytes"
+
+    def __init__(self, files=None):
+        """
+
+        :param files:
+            (Optional) dict of pachyderm path to file entry
+        """
+        self.files = files or {}
+
+    @classmethod
+    def from_bytes(cls, content):
+        """
+        loads a manifest from its serialized json content
+
+        :param content:
+            manifest file content as bytes
+        :return:
+            DatasetManifest object
+        """
+        if not content:
+            return cls()
+        manifest_json = json.loads(content.decode("utf-8"))
+        return cls(manifest_json.get("files", {}))
+
+    def to_bytes(self):
+        """
+        serializes the manifest into json bytes
+
+        :return:
+            manifest content as bytes
+        """
+        manifest_json = {
+            "version": self.MANIFEST_VERSION,
+            "hash_algorithm": self.HASH_ALGORITHM,
+            "files": self.files
+        }
+        return json.dumps(manifest_json, indent=1, sort_keys=True).encode("utf-8")
+
+    @staticmethod
+    def normalize_path(path):
+        """
+        pachyderm accepts paths with or without leading `/` but always
+        lists them with one. Manifest keys are kept in the listed form
+        """
+        return "/" + path.lstrip("/")
+
+    @staticmethod
+    def get_manifest_path(commit_id):
+        """
+        path of the manifest of a commit in the MANIFEST_BRANCH
+        """
+        return f"/{commit_id}.json"
+
+    @classmethod
+    def is_metadata_path(cls, path):
+        """
+        checks if the path is inside the xpresso metadata directory
+        """
+        path = cls.normalize_path(path)
+        return path == cls.METADATA_DIR or \
+            path.startswith(cls.METADATA_DIR + "/")
+
+    def add(self, path, sha256, size_bytes, mtime=None, codec=None,
+            stored_size_bytes=None):
+        """
+        adds or replaces the entry of a file
+
+        :param path:
+            path of the file on pachyderm cluster
+        :param sha256:
+            hex digest of the file content
+        :param size_bytes:
+            size of the file content
+        :param mtime:
+            (Optional) modification time of the local file it was pushed from
+        :param codec:
+            (Optional) name of the TransferCodec the content is stored with
+        :param stored_size_bytes:
+            (Optional) size of the content on the cluster if it differs
+            from `size_bytes`
+        """
+        entry = {
+            self.SHA256: sha256,
+            self.SIZE: size_bytes
+        }
+        if mtime is not None:
+            entry[self.MTIME] = mtime
+        if codec is not None:
+            entry[self.CODEC] = codec
+        if stored_size_bytes is not None and stored_size_bytes != size_bytes:
+            entry[self.STORED_SIZE] = stored_size_bytes
+        self.files[self.normalize_path(path)] = entry
+
+    def remove(self, path):
+        """
+        removes the entry of a file if present
+        """
+        self.files.pop(self.normalize_path(path), None)
+
+    def paths_under(self, path):
+        """
+        returns the paths of all the entries at or below `path`
+        """
+        path = self.normalize_path(path).rstrip("/")
+        return [file_path for file_path in self.files
+                if not path or file_path == path or
+                file_path.startswith(path + "/")]
+
+    def copy_entries(self, source_manifest, path):
+        """
+        replaces the entries at or below `path` with the ones of another
+        manifest, as done by a server side copy of that path
+        """
+        for file_path in self.paths_under(path):
+            del self.files[file_path]
+        for file_path in source_manifest.paths_under(path):
+            self.files[file_path] = dict(source_manifest.files[file_path])
+
+    def get(self, path):
+        """
+        returns the entry of a file or None if it is not present
+        """
+        return self.files.get(self.normalize_path(path))
+
+    def get_verified(self, path, size_bytes):
+        """
+        returns the entry of a file only if it matches the size of the file
+        on the cluster
+
+        :param path:
+            path of the file on pachyderm cluster
+        :param size_bytes:
+            size of the file reported by pachyderm, None if it is unknown
+        :return:
+            entry dict or None if it is missing or stale
+        """
+        entry = self.get(path)
+        if not entry or size_bytes is None or \
+                self.get_stored_size(entry) != size_bytes:
+            return None
+        return entry
+
+    def verify(self, file_sizes):
+        """
+        returns a manifest with only the entries which match the files on
+        the cluster
+
+        :param file_sizes:
+            dict of pachyderm path to size reported by pachyderm
+        :return:
+            DatasetManifest object
+        """
+        return DatasetManifest({
+            path: entry for (path, entry) in self.files.items()
+            if self.get_stored_size(entry) == file_sizes.get(path, -1)
+        })
+
+    @classmethod
+    def get_stored_size(cls, entry):
+        """
+        returns the size an entry's content has on the cluster
+        """
+        return entry.get(cls.STORED_SIZE, entry[cls.SIZE])
+
+    def get_hash(self, path):
+        """
+        returns the sha256 of a file or None if it is not present
+        """
+        entry = self.get(path)
+        if not entry:
+            return None
+        return entry[self.SHA256]
+
+    def get_codec(self, path):
+        """
+        returns the name of the codec a file is stored with or None
+        """
+        entry = self.get(path)
+        if not entry:
+            return None
+        return entry.get(self.CODEC)
+
+
+class ContentDigest:
+    """
+    Incrementally computes the hash and size of streamed file content
+    """
+    def __init__(self):
+        self.hasher = hashlib.sha256()
+        self.size_bytes = 0
+        # bytes sent to or received from the cluster for the content,
+        # differs from `size_bytes` when the content is encoded
+        self.stored_size_bytes = 0
+
+    def update(self, chunk):
+        """
+        adds a chunk of the content to the digest
+        """
+        self.hasher.update(chunk)
+        self.size_bytes += len(chunk)
+
+    def add_stored(self, size_bytes):
+        """
+        records bytes of the content as it is stored on the cluster
+        """
+        self.stored_size_bytes += size_bytes
+
+    def hexdigest(self):
+        """
+        returns sha256 hex digest of the content seen so far
+        """
+        return self.hasher.hexdigest()
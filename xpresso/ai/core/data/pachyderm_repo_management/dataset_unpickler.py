@@ -0,0 +1,91 @@
+import io
+import pickle
+
+import numpy
+from pandas.api.extensions import ExtensionArray, ExtensionDtype
+from pandas.core.base import PandasObject
+
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    SerializationFailedException
+
+
+class DatasetUnpickler(pickle.Unpickler):
+    """
+    Unpickler of the datasets saved by StructuredDataset, which refuses
+    every global a dataset is not made of
+
+    Unpickling calls the globals named in the data, hence a plain
+    pickle.loads of a file pulled from the cluster runs whatever code its
+    writer chose. Here only the dataset classes, plain builtin types,
+    numpy arrays and dtypes, pandas containers and the functions pandas
+    and numpy pickle their objects with are resolved
+    """
+    # package holding the dataset classes, its subpackages are not allowed
+    DATASET_PACKAGE = "xpresso.ai.core.data"
+    SAFE_BUILTINS = {"bool", "bytearray", "bytes", "complex", "dict",
+                     "float", "frozenset", "int", "list", "object", "range",
+                     "set", "slice", "str", "tuple"}
+    # protocols below 3 name some modules as python 2 did
+    BUILTIN_MODULES = ("builtins", "__builtin__")
+    SAFE_GLOBALS = {("copyreg", "_reconstructor"), ("_codecs", "encode"),
+                    ("copy_reg", "_reconstructor"),
+                    ("collections", "OrderedDict"),
+                    ("decimal", "Decimal")}
+    # modules whose types are value types without side effects
+    SAFE_TYPE_MODULES = ("datetime",)
+    # numpy and pandas types holding data, their subclasses included
+    SAFE_DATA_TYPES = (numpy.dtype, numpy.generic, PandasObject,
+                       ExtensionArray, ExtensionDtype)
+    # parts of the names of the private functions pandas and numpy rebuild
+    # objects with, e.g. _reconstruct, _unpickle_block or _new_Index
+    RECONSTRUCTOR_NAME_PARTS = ("reconstruct", "frombuffer", "unpickle",
+                                "_new_")
+
+    def find_class(self, module, name):
+        """
+        resolves a global of the pickle only if a dataset may contain it
+        """
+        if (module in self.BUILTIN_MODULES and name in self.SAFE_BUILTINS) or \
+                (module, name) in self.SAFE_GLOBALS:
+            return super().find_class(module, name)
+        root_module = module.split(".")[0]
+        if module in self.SAFE_TYPE_MODULES or \
+                module.rsplit(".", 1)[0] == self.DATASET_PACKAGE:
+            found = super().find_class(module, name)
+            if isinstance(found, type):
+                return found
+        elif root_module in ("numpy", "pandas"):
+            found = super().find_class(module, name)
+            if self.is_safe_global(found, name):
+                return found
+        raise pickle.UnpicklingError(
+            f"{module}.{name} is not allowed in a dataset")
+
+    @classmethod
+    def is_safe_global(cls, found, name):
+        """
+        checks if a numpy or pandas global is a data type or a reconstructor
+        """
+        if isinstance(found, type):
+            # ndarray subclasses such as memmap open files
+            return found is numpy.ndarray or \
+                issubclass(found, cls.SAFE_DATA_TYPES)
+        return callable(found) and name.startswith("_") and \
+            any(part in name for part in cls.RECONSTRUCTOR_NAME_PARTS)
+
+    @classmethod
+    def loads(cls, content):
+        """
+        loads a pickled dataset from bytes
+
+        :param content:
+            pickled dataset
+        :return:
+            dataset object
+        """
+        try:
+            return cls(io.BytesIO(content)).load()
+        except (pickle.UnpicklingError, EOFError, AttributeError,
+                ImportError) as err:
+            raise SerializationFailedException(
+                f"unable to load the dataset; {err}")
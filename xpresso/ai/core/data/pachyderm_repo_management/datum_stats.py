@@ -0,0 +1,81 @@
+import heapq
+from collections import Counter
+
+
+class DatumStats:
+    """
+    Aggregates datum records of a job in a single streaming pass
+
+    Only the per state counters and a heap of the `slowest_count` slowest
+    datums are kept, hence the memory used does not depend on the number
+    of datums in the job
+    """
+    DEFAULT_SLOWEST_COUNT = 10
+
+    def __init__(self, slowest_count=None):
+        """
+
+        :param slowest_count:
+            (Optional) number of slowest datums to be kept
+        """
+        self.slowest_count = slowest_count or self.DEFAULT_SLOWEST_COUNT
+        self.state_counts = Counter()
+        self.datum_count = 0
+        self.total_seconds = 0.0
+        # min heap of (seconds, datum_id, record), its root is the fastest
+        # of the slowest datums seen so far
+        self.slowest_heap = []
+
+    def add(self, datum_record):
+        """
+        adds a datum record to the aggregates
+
+        :param datum_record:
+            dict as returned by PachydermPipelineClient.iter_datums
+        """
+        self.datum_count += 1
+        self.state_counts[datum_record["state"]] += 1
+        seconds = datum_record["total_seconds"]
+        self.total_seconds += seconds
+        entry = (seconds, datum_record["datum_id"], datum_record)
+        if len(self.slowest_heap) < self.slowest_count:
+            heapq.heappush(self.slowest_heap, entry)
+        elif entry[:2] > self.slowest_heap[0][:2]:
+            heapq.heapreplace(self.slowest_heap, entry)
+
+    def update(self, datum_records):
+        """
+        adds all the records of an iterable to the aggregates
+
+        :return:
+            DatumStats object itself
+        """
+        for datum_record in datum_records:
+            self.add(datum_record)
+        return self
+
+    @property
+    def slowest_datums(self):
+        """
+        returns the records of the slowest datums, slowest first
+        """
+        return [record for (_, _, record) in
+                sorted(self.slowest_heap, key=lambda entry: entry[:2],
+                       reverse=True)]
+
+    def to_dict(self):
+        """
+        returns the aggregates as a user friendly dict
+        """
+        return {
+            "datums": self.datum_count,
+            "states": dict(self.state_counts),
+            "seconds": round(self.total_seconds, 3),
+            "slowest": self.slowest_datums
+        }
+
+    def __str__(self):
+        states = ", ".join(f"{count} {state}" for state, count in
+                           sorted(self.state_counts.items()))
+        return f"{self.datum_count} datums ({states}) in " \
+               f"{self.total_seconds:.2f}s"
@@ -0,0 +1,274 @@
+import os
+import sqlite3
+import threading
+
+
+class LineageIndex:
+    """
+    Local sqlite index of the provenance between commits created by jobs
+
+    Every job links the input commits it read to the output commit it
+    wrote. The links are stored as edges, hence the commits upstream or
+    downstream of a commit are found with a single recursive query instead
+    of walking list_job over and over.
+
+    pachd lists jobs newest first, so a refresh reads jobs only until it
+    reaches the ones started before the watermark, i.e. the start time of
+    the newest job indexed so far. Jobs started within
+    `WATERMARK_OVERLAP_SECONDS` of it are read again to pick up the ones
+    which were listed late and the state changes of recent jobs
+    """
+    DEFAULT_INDEX_PATH = os.path.join("~", ".xpresso", "lineage.sqlite")
+    WATERMARK_OVERLAP_SECONDS = 300
+    WATERMARK_KEY = "watermark"
+
+    def __init__(self, pipeline_client, index_path=None):
+        """
+
+        :param pipeline_client:
+            PachydermPipelineClient connected to the cluster
+        :param index_path:
+            (Optional) path of the sqlite file, ":memory:" keeps the index
+            in memory only
+        """
+        self.pipeline_client = pipeline_client
+        self.index_path = index_path or self.DEFAULT_INDEX_PATH
+        if self.index_path != ":memory:":
+            self.index_path = os.path.expanduser(self.index_path)
+            os.makedirs(os.path.dirname(self.index_path) or ".",
+                        exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.index_path,
+                                          check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, pipeline TEXT, output_repo TEXT, "
+                "output_commit TEXT, state INTEGER, started REAL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS edges ("
+                "input_repo TEXT, input_commit TEXT, output_repo TEXT, "
+                "output_commit TEXT, job_id TEXT, "
+                "PRIMARY KEY (input_repo, input_commit, output_repo, "
+                "output_commit))"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS edges_output "
+                "ON edges (output_repo, output_commit)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_output "
+                "ON jobs (output_repo, output_commit)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "key TEXT PRIMARY KEY, value REAL)"
+            )
+
+    @property
+    def watermark(self):
+        """
+        start time of the newest indexed job in epoch seconds or None
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM metadata WHERE key = ?",
+                (self.WATERMARK_KEY,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def refresh(self, pipeline_name=None, full=False):
+        """
+        indexes the jobs started since the watermark
+
+        :param pipeline_name:
+            (Optional) only the jobs of this pipeline are read
+        :param full:
+            (Optional) reads all the jobs ignoring the watermark
+        :return:
+            number of jobs indexed
+        """
+        watermark = None if full else self.watermark
+        stop_before = None
+        if watermark is not None:
+            stop_before = watermark - self.WATERMARK_OVERLAP_SECONDS
+        job_count = 0
+        newest_started = watermark
+        for job_info in self.pipeline_client.list_job(pipeline_name,
+                                                      history=-1):
+            if not job_info.HasField("started"):
+                # a job still queued has no start time, it says nothing
+                # about the watermark and older jobs follow it
+                self.add_job(job_info)
+                job_count += 1
+                continue
+            started = self.to_seconds(job_info.started)
+            if stop_before is not None and started < stop_before:
+                break
+            self.add_job(job_info)
+            job_count += 1
+            if newest_started is None or started > newest_started:
+                newest_started = started
+        # a pipeline filtered refresh does not see the jobs of the other
+        # pipelines, hence it must not move the shared watermark
+        if newest_started is not None and pipeline_name is None:
+            with self.lock, self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO metadata (key, value) "
+                    "VALUES (?, ?)", (self.WATERMARK_KEY, newest_started)
+                )
+        return job_count
+
+    def add_job(self, job_info):
+        """
+        adds or updates a job and the edges from its input commits to its
+        output commit
+
+        :param job_info:
+            JobInfo object
+        """
+        job_id = job_info.job.id
+        output_repo = job_info.output_commit.repo.name
+        output_commit = job_info.output_commit.id
+        edges = [
+            (input_repo, input_commit, output_repo, output_commit, job_id)
+            for (input_repo, input_commit) in
+            self.get_input_commits(job_info.input)
+        ]
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, pipeline, output_repo, "
+                "output_commit, state, started) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, job_info.pipeline.name, output_repo, output_commit,
+                 job_info.state, self.to_seconds(job_info.started)
+                 if job_info.HasField("started") else None)
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO edges (input_repo, input_commit, "
+                "output_repo, output_commit, job_id) VALUES (?, ?, ?, ?, ?)",
+                edges
+            )
+
+    @classmethod
+    def get_input_commits(cls, job_input):
+        """
+        returns the commits read by a job from its input tree
+
+        :param job_input:
+            Input object of a JobInfo
+        :return:
+            set of (repo, commit_id) tuples
+        """
+        input_commits = set()
+        if job_input is None:
+            return input_commits
+        # join inputs only exist on newer pachd versions
+        for input_type in ("cross", "union", "join"):
+            for nested_input in getattr(job_input, input_type, ()):
+                input_commits |= cls.get_input_commits(nested_input)
+        for input_type in ("pfs", "cron", "git"):
+            atom_input = getattr(job_input, input_type, None)
+            repo_name = getattr(atom_input, "repo", None)
+            commit_id = getattr(atom_input, "commit", None)
+            if repo_name and commit_id:
+                input_commits.add((repo_name, commit_id))
+        return input_commits
+
+    def get_upstream(self, repo_name, commit_id):
+        """
+        returns all the commits a commit was derived from, directly or
+        through intermediate pipelines
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :return:
+            sorted list of (repo, commit_id) tuples
+        """
+        return self.query_lineage(
+            "WITH RECURSIVE upstream (repo, commit_id) AS ("
+            "SELECT input_repo, input_commit FROM edges "
+            "WHERE output_repo = ? AND output_commit = ? "
+            "UNION "
+            "SELECT edges.input_repo, edges.input_commit FROM edges "
+            "JOIN upstream ON edges.output_repo = upstream.repo "
+            "AND edges.output_commit = upstream.commit_id) "
+            "SELECT repo, commit_id FROM upstream ORDER BY repo, commit_id",
+            repo_name, commit_id
+        )
+
+    def get_downstream(self, repo_name, commit_id):
+        """
+        returns all the commits derived from a commit, directly or through
+        intermediate pipelines
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :return:
+            sorted list of (repo, commit_id) tuples
+        """
+        return self.query_lineage(
+            "WITH RECURSIVE downstream (repo, commit_id) AS ("
+            "SELECT output_repo, output_commit FROM edges "
+            "WHERE input_repo = ? AND input_commit = ? "
+            "UNION "
+            "SELECT edges.output_repo, edges.output_commit FROM edges "
+            "JOIN downstream ON edges.input_repo = downstream.repo "
+            "AND edges.input_commit = downstream.commit_id) "
+            "SELECT repo, commit_id FROM downstream ORDER BY repo, commit_id",
+            repo_name, commit_id
+        )
+
+    def query_lineage(self, query, repo_name, commit_id):
+        """
+        runs a lineage query for a commit
+        """
+        with self.lock:
+            rows = self.connection.execute(query,
+                                           (repo_name, commit_id)).fetchall()
+        return [tuple(row) for row in rows]
+
+    def get_job(self, repo_name, commit_id):
+        """
+        returns the job which wrote an output commit
+
+        :param repo_name:
+            name of the output repo
+        :param commit_id:
+            id of the output commit
+        :return:
+            dict of job id, pipeline, state and start time or None
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT job_id, pipeline, state, started FROM jobs "
+                "WHERE output_repo = ? AND output_commit = ? "
+                "ORDER BY started DESC", (repo_name, commit_id)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "job_id": row[0],
+            "pipeline": row[1],
+            "state": row[2],
+            "started": row[3]
+        }
+
+    @staticmethod
+    def to_seconds(timestamp):
+        """
+        converts a protobuf Timestamp into epoch seconds
+        """
+        return timestamp.seconds + timestamp.nanos / 1e9
+
+    def close(self):
+        """
+        closes the lineage index
+        """
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,264 @@
+import heapq
+import itertools
+import queue
+import re
+import threading
+import time
+from collections import deque
+
+from grpc._channel import _Rendezvous as PachClientException
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    PachydermOperationException
+
+
+class LogTailer:
+    """
+    Streams and filters the logs of pachyderm jobs and pipelines
+
+    Log messages are filtered as they arrive and handed over one at a time,
+    so a followed stream is never collected into a list. Only the latest
+    `buffer_size` matching messages are kept in a ring buffer for callers
+    which want to look back e.g. after a job failed.
+
+    Logs of several jobs are merged by their timestamps. Each stream is read
+    by its own thread into a bounded queue and messages are held back for
+    `reorder_seconds` in a heap, hence messages which arrive late by less
+    than that window are still emitted in timestamp order
+    """
+    DEFAULT_BUFFER_SIZE = 1000
+    DEFAULT_REORDER_SECONDS = 2
+    # seconds to wait on a full or empty queue before checking if the
+    # tailer is stopped
+    POLL_INTERVAL_SECONDS = 0.5
+    # queued by a reader thread after the last message of its stream
+    END_OF_STREAM = object()
+
+    def __init__(self, pipeline_client, datum_id=None, worker_id=None,
+                 pattern=None, buffer_size=None, reorder_seconds=None):
+        """
+
+        :param pipeline_client:
+            PachydermPipelineClient connected to the cluster
+        :param datum_id:
+            (Optional) only the logs of this datum are returned
+        :param worker_id:
+            (Optional) only the logs of this worker are returned
+        :param pattern:
+            (Optional) regular expression searched in the log message
+        :param buffer_size:
+            (Optional) number of the latest matching messages kept in
+            memory, also bounds the messages held back while merging
+        :param reorder_seconds:
+            (Optional) seconds for which merged messages are held back to
+            be put in timestamp order
+        """
+        self.pipeline_client = pipeline_client
+        self.datum_id = datum_id
+        self.worker_id = worker_id
+        self.pattern = re.compile(pattern) if pattern else None
+        self.buffer_size = buffer_size or self.DEFAULT_BUFFER_SIZE
+        self.reorder_seconds = self.DEFAULT_REORDER_SECONDS
+        if reorder_seconds is not None:
+            self.reorder_seconds = reorder_seconds
+        self.recent_messages = deque(maxlen=self.buffer_size)
+        self.stop_event = threading.Event()
+        self.streams = []
+
+    def matches(self, log_message):
+        """
+        checks if a log message passes all the filters
+        """
+        if self.datum_id and log_message.datum_id != self.datum_id:
+            return False
+        if self.worker_id and log_message.worker_id != self.worker_id:
+            return False
+        if self.pattern and not self.pattern.search(log_message.message):
+            return False
+        return True
+
+    def tail_job(self, job_id, follow=False, tail=None):
+        """
+        yields the matching log messages of a job
+
+        :param job_id:
+            id of the job
+        :param follow:
+            (Optional) keeps waiting for new logs if True
+        :param tail:
+            (Optional) number of latest lines to start from per worker
+        :return:
+            generator of LogMessage objects
+        """
+        stream = self.pipeline_client.get_job_logs(job_id, follow, tail)
+        yield from self.iter_stream(stream)
+
+    def tail_pipeline(self, pipeline_name, follow=False, tail=None):
+        """
+        yields the matching log messages of a pipeline
+
+        :param pipeline_name:
+            name of the pipeline
+        :param follow:
+            (Optional) keeps waiting for new logs if True
+        :param tail:
+            (Optional) number of latest lines to start from per worker
+        :return:
+            generator of LogMessage objects
+        """
+        stream = self.pipeline_client.get_pipeline_logs(pipeline_name,
+                                                        follow, tail)
+        yield from self.iter_stream(stream)
+
+    def iter_stream(self, stream):
+        """
+        yields the matching messages of a single log stream
+        """
+        self.streams.append(stream)
+        try:
+            for log_message in stream:
+                if self.matches(log_message):
+                    self.recent_messages.append(log_message)
+                    yield log_message
+        except PachClientException as err:
+            if not self.stop_event.is_set():
+                raise PachydermOperationException(err.details())
+        finally:
+            stream.cancel()
+            self.streams.remove(stream)
+
+    def merge_jobs(self, job_ids, follow=False, tail=None):
+        """
+        yields the matching log messages of many jobs in timestamp order
+
+        :param job_ids:
+            list of job ids
+        :param follow:
+            (Optional) keeps waiting for new logs if True
+        :param tail:
+            (Optional) number of latest lines to start from per worker
+        :return:
+            generator of LogMessage objects
+        """
+        message_queue = queue.Queue(maxsize=self.buffer_size)
+        merge_stopped = threading.Event()
+        streams = [self.pipeline_client.get_job_logs(job_id, follow, tail)
+                   for job_id in job_ids]
+        readers = [
+            threading.Thread(target=self.read_stream, daemon=True,
+                             args=(stream, message_queue, merge_stopped),
+                             name=f"log-reader-{job_id}")
+            for job_id, stream in zip(job_ids, streams)
+        ]
+        self.streams.extend(streams)
+        for reader in readers:
+            reader.start()
+
+        # heap of (timestamp, sequence, arrival time, message), the
+        # sequence keeps messages with equal timestamps in arrival order
+        held_messages = []
+        sequence = itertools.count()
+        open_streams = len(streams)
+        try:
+            while (open_streams or held_messages) and \
+                    not self.stop_event.is_set():
+                if open_streams:
+                    try:
+                        item = message_queue.get(
+                            timeout=self.POLL_INTERVAL_SECONDS)
+                    except queue.Empty:
+                        item = None
+                    if isinstance(item, Exception):
+                        raise item
+                    if item is self.END_OF_STREAM:
+                        open_streams -= 1
+                    elif item is not None:
+                        heapq.heappush(held_messages, (
+                            self.get_timestamp(item), next(sequence),
+                            time.monotonic(), item))
+
+                release_time = time.monotonic() - self.reorder_seconds
+                while held_messages and (
+                        not open_streams or
+                        len(held_messages) > self.buffer_size or
+                        held_messages[0][2] <= release_time):
+                    log_message = heapq.heappop(held_messages)[3]
+                    self.recent_messages.append(log_message)
+                    yield log_message
+        finally:
+            merge_stopped.set()
+            for stream in streams:
+                stream.cancel()
+                self.streams.remove(stream)
+
+    def read_stream(self, stream, message_queue, merge_stopped):
+        """
+        puts the matching messages of a stream into the queue followed by
+        an end marker
+        """
+        try:
+            for log_message in stream:
+                if self.matches(log_message) and not self.enqueue(
+                        message_queue, log_message, merge_stopped):
+                    return
+        except PachClientException as err:
+            if not merge_stopped.is_set() and not self.stop_event.is_set():
+                self.enqueue(message_queue,
+                             PachydermOperationException(err.details()),
+                             merge_stopped)
+        self.enqueue(message_queue, self.END_OF_STREAM, merge_stopped)
+
+    def enqueue(self, message_queue, item, merge_stopped):
+        """
+        puts an item into the queue, blocking while it is full
+
+        :return:
+            False if the tailer or the merge was stopped while waiting
+        """
+        while not self.stop_event.is_set() and not merge_stopped.is_set():
+            try:
+                message_queue.put(item, timeout=self.POLL_INTERVAL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def stop(self):
+        """
+        cancels all the open log streams, the tailer can not be used
+        after it is stopped
+        """
+        self.stop_event.set()
+        for stream in list(self.streams):
+            stream.cancel()
+
+    def get_recent_messages(self, count=None):
+        """
+        returns the latest matching messages seen by this tailer
+
+        :param count:
+            (Optional) number of messages, all the buffered ones if None
+        :return:
+            list of LogMessage objects, oldest first
+        """
+        messages = list(self.recent_messages)
+        if count is not None:
+            messages = messages[-count:] if count else []
+        return messages
+
+    @staticmethod
+    def get_timestamp(log_message):
+        """
+        returns the timestamp of a log message as a sortable tuple
+        """
+        return log_message.ts.seconds, log_message.ts.nanos
+
+    @staticmethod
+    def format_message(log_message):
+        """
+        formats a log message into a single line
+        """
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S",
+                                  time.gmtime(log_message.ts.seconds))
+        return f"{timestamp}.{log_message.ts.nanos // 1000000:03d}Z " \
+               f"{log_message.job_id} {log_message.worker_id} " \
+               f"{log_message.datum_id} {log_message.message}"
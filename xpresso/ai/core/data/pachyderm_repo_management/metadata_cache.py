@@ -0,0 +1,97 @@
+import threading
+import time
+
+
+class MetadataCache:
+    """
+    In-process cache of commit and branch metadata fetched from pachyderm
+
+    Entries are stored against a key tuple starting with the repo name.
+    An entry without ttl never expires, which is used for finished commits
+    as they are immutable. Branch heads move, hence they are kept only for
+    a short ttl and are invalidated explicitly after our own writes.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        returns the cached value of a key or None
+
+        :param key:
+            tuple whose first item is the repo name
+        :return:
+            cached value if present and not expired
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                value, expiry_time = entry
+                if expiry_time is None or expiry_time > time.monotonic():
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, ttl_seconds=None):
+        """
+        caches a value
+
+        :param key:
+            tuple whose first item is the repo name
+        :param value:
+            value to be cached
+        :param ttl_seconds:
+            (Optional) seconds after which entry expires. Never expires if
+            not provided
+        """
+        expiry_time = None
+        if ttl_seconds is not None:
+            expiry_time = time.monotonic() + ttl_seconds
+        with self.lock:
+            self.entries[key] = (value, expiry_time)
+
+    def invalidate(self, repo_name, kind=None, name=None):
+        """
+        removes cached entries of a repo
+
+        :param repo_name:
+            name of the repo
+        :param kind:
+            (Optional) removes only the entries of this kind i.e. the second
+            item of the key
+        :param name:
+            (Optional) removes only the entries of this commit or branch
+            i.e. the third item of the key
+        """
+        with self.lock:
+            for key in list(self.entries):
+                if key[0] != repo_name:
+                    continue
+                if kind is not None and key[1] != kind:
+                    continue
+                if name is not None and key[2] != name:
+                    continue
+                del self.entries[key]
+
+    def clear(self):
+        """
+        removes all the entries
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """
+        returns hit and miss counters of the cache
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries)
+            }
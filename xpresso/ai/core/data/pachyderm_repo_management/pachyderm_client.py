@@ -1,9 +1,26 @@
-import python_pachyderm as pachyderm
+import io
+import json
 import os
 import pickle
+import sqlite3
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import grpc
 from grpc._channel import _Rendezvous as PachClientException
-from xpresso.ai.core.data.exception_handling.custom_exception import PachydermOperationException
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    PachydermOperationException, DatasetIntegrityException, \
+    LocalFilePathException
+from xpresso.ai.core.data.pachyderm_repo_management.dataset_manifest import \
+    ContentDigest, DatasetManifest
+from xpresso.ai.core.data.pachyderm_repo_management.transfer_stats import TransferStats
+from xpresso.ai.core.data.pachyderm_repo_management.metadata_cache import MetadataCache
+from xpresso.ai.core.data.pachyderm_repo_management.channel_pool import ChannelRegistry
+from xpresso.ai.core.data.pachyderm_repo_management.pachyderm_pipeline_client import \
+    PachydermPipelineClient
+from xpresso.ai.core.data.pachyderm_repo_management.transfer_codec import TransferCodec
 
 # TODO: Make sure to add exceptions for all the client methods
 
@@ -14,27 +31,100 @@ class PachydermClient:
 
 
     """
-    def __init__(self, host, port, auth_token=None):
+    # number of files streamed concurrently into a single commit
+    DEFAULT_PUSH_WORKERS = 4
+    # number of retries for a file upload that failed with a transient error
+    DEFAULT_PUSH_RETRIES = 2
+    # number of files downloaded concurrently during a pull
+    DEFAULT_PULL_WORKERS = 4
+    DEFAULT_PULL_RETRIES = 2
+    # files are downloaded next to their destination with this suffix and
+    # renamed once complete
+    PARTIAL_FILE_SUFFIX = ".part"
+    # encoded content is downloaded into a file with this suffix and then
+    # decoded into the partial file
+    ENCODED_FILE_SUFFIX = ".enc"
+    # files above this size are split into byte ranges when range
+    # downloads are enabled i.e. range_workers is more than 1
+    RANGE_DOWNLOAD_THRESHOLD = 256 * 1024 * 1024
+    DEFAULT_RANGE_WORKERS = 1
+    # bytes received by each range of a range download are recorded next
+    # to the partial file with this suffix, hence the ranges resume
+    RANGE_STATE_SUFFIX = ".ranges"
+    # number of ancestors searched for a manifest when a commit was
+    # written without one
+    MANIFEST_ANCESTOR_DEPTH = 10
+    # seconds for which inspected branch heads are reused
+    BRANCH_CACHE_TTL_SECONDS = 5
+    COMMIT_METADATA = "commit"
+    BRANCH_METADATA = "branch"
+    # CommitState.FINISHED of pfs protos
+    COMMIT_STATE_FINISHED = 2
+    RETRY_BACKOFF_SECONDS = 1
+    # commits holding files encoded with a TransferCodec carry this line,
+    # followed by the codec name, in their description
+    CODEC_DESCRIPTION_TAG = "xpresso-codec: "
+    # size of a single PutFile request while streaming a file
+    DEFAULT_CHUNK_SIZE = 3 * 1024 * 1024
+    # raw mode moves file bytes as they are and verifies them with sha256,
+    # pickle mode additionally loads and re-dumps every .pkl file
+    TRANSFER_MODE_RAW = "raw"
+    TRANSFER_MODE_PICKLE = "pickle"
+    RETRYABLE_STATUS_CODES = (grpc.StatusCode.UNAVAILABLE,
+                              grpc.StatusCode.DEADLINE_EXCEEDED,
+                              grpc.StatusCode.RESOURCE_EXHAUSTED)
+
+    def __init__(self, host, port, auth_token=None, chunk_size=None,
+                 transfer_mode=None, codec=None):
         """
 
         :param host:
         :param port:
         :param auth_token:
+        :param chunk_size:
+            (Optional) number of bytes sent in a single upload request
+        :param transfer_mode:
+            (Optional) one of TRANSFER_MODE_RAW or TRANSFER_MODE_PICKLE
+        :param codec:
+            (Optional) name of the TransferCodec used to compress uploaded
+            files e.g. zstd or lz4. Pulls decode files of any codec. Files
+            are stored encoded, hence pipelines can not read them
         """
         self.host = host
         self.port = port
         self.auth_token = auth_token
-        self.client = self.connect(host, port)
+        self.chunk_size = chunk_size or self.DEFAULT_CHUNK_SIZE
+        self.transfer_mode = transfer_mode or self.TRANSFER_MODE_RAW
+        self.set_codec(codec)
+        self.metadata_cache = MetadataCache()
+        self.client = self.connect(host, port, auth_token)
+        # PachydermPipelineClient, connected when first needed
+        self.pipeline_client = None
+
+    def set_codec(self, codec):
+        """
+        selects the TransferCodec used to compress uploaded files
+
+        :param codec:
+            name of the codec e.g. zstd or lz4. Files are uploaded as they
+            are if it is None. Encoded files are not readable by pipelines,
+            hence pushing them to a repo read by a pipeline is refused
+        """
+        self.codec = TransferCodec.get(codec) if codec else None
+        self.codec_name = codec
 
     @staticmethod
-    def connect(host, port):
+    def connect(host, port, auth_token=None):
         """
+        returns a PfsClient on the channel shared by all the clients of
+        this cluster in the process
 
         :param host:
         :param port:
+        :param auth_token:
         :return:
         """
-        client = pachyderm.PfsClient(host, port)
+        client = ChannelRegistry().pfs_client(host, port, auth_token)
         return client
 
     def create_new_repo(self, repo_name, description=None, update=None):
@@ -67,6 +157,7 @@ class PachydermClient:
         :return:
         """
         self.client.delete_repo(repo_name)
+        self.metadata_cache.invalidate(repo_name)
 
     def create_new_branch(self, repo_name, branch_name):
         """
@@ -82,6 +173,8 @@ class PachydermClient:
             self.client.create_branch(repo_name, branch_name)
         except PachClientException as err:
             raise PachydermOperationException(err.details())
+        finally:
+            self.invalidate_branch(repo_name, branch_name)
 
     def get_branch(self, repo_name):
         """
@@ -90,12 +183,16 @@ class PachydermClient:
             name of the repo
         """
         branches = self.client.list_branch(repo_name)
-        return branches
+        # branch holding the manifests is not a part of any dataset
+        return [branch for branch in branches
+                if branch.name != DatasetManifest.MANIFEST_BRANCH]
 
     def inspect_branch(self, repo_name, branch_name):
         """
         provides information on a branch
 
+        The result is cached for BRANCH_CACHE_TTL_SECONDS
+
         :param repo_name:
             name of the repo where branch resides
         :param branch_name:
@@ -103,8 +200,14 @@ class PachydermClient:
         :return:
             branch information object
         """
+        cache_key = (repo_name, self.BRANCH_METADATA, branch_name)
+        branch_info = self.metadata_cache.get(cache_key)
+        if branch_info is not None:
+            return branch_info
         try:
             branch_info = self.client.inspect_branch(repo_name, branch_name)
+            self.metadata_cache.put(cache_key, branch_info,
+                                    self.BRANCH_CACHE_TTL_SECONDS)
             return branch_info
         except PachClientException as err:
             raise PachydermOperationException(err.details())
@@ -119,11 +222,16 @@ class PachydermClient:
             name of the branch that needs to be deleted
         """
         self.client.delete_branch(repo_name, branch_name)
+        self.invalidate_branch(repo_name, branch_name)
 
     def inspect_commit(self, repo_name, commit_id, block_state=None):
         """
         provides information on a commit
 
+        Finished commits are immutable, hence they are cached for the
+        lifetime of the client. A commit referred by a branch name is cached
+        for BRANCH_CACHE_TTL_SECONDS
+
         :param repo_name:
             name of the repo
         :param commit_id:
@@ -132,12 +240,24 @@ class PachydermClient:
         :return:
             returns CommitInfo Object
         """
+        cache_key = (repo_name, self.COMMIT_METADATA, commit_id)
+        if block_state is None:
+            commit_info = self.metadata_cache.get(cache_key)
+            if commit_info is not None:
+                return commit_info
         try:
             commit_info = self.client.inspect_commit((repo_name, commit_id), block_state)
-            return commit_info
         except PachClientException as err:
             raise PachydermOperationException(err.details())
 
+        if commit_info.commit.id != commit_id:
+            # commit_id is a branch name and will move with the branch head
+            self.metadata_cache.put(cache_key, commit_info,
+                                    self.BRANCH_CACHE_TTL_SECONDS)
+        elif commit_info.finished.seconds:
+            self.metadata_cache.put(cache_key, commit_info)
+        return commit_info
+
     def list_commit(self, repo_name, upper_commit=None, lower_commit=None, count=None):
         """
         lists commits in a repo
@@ -145,7 +265,8 @@ class PachydermClient:
         :param repo_name:
             name of the commit
         :param upper_commit:
-            id of the last commit that needs to be shown
+            id of the last commit that needs to be shown. Name of a branch
+            lists the commits in the history of its head
         :param lower_commit:
             id of the commit from which list starts
         :param count:
@@ -162,6 +283,28 @@ class PachydermClient:
             raise PachydermOperationException(commits.details())
         return commits
 
+    def subscribe_commit(self, repo_name, branch_name, from_commit_id=None):
+        """
+        subscribes to the finished commits of a branch
+
+        :param repo_name:
+            name of the repo
+        :param branch_name:
+            name of the branch
+        :param from_commit_id:
+            (Optional) only the commits created after this commit are
+            returned
+        :return:
+            blocking stream of CommitInfo objects. It never ends on its own
+            and is stopped with its `cancel` method
+        """
+        try:
+            return self.client.subscribe_commit(
+                repo_name, branch_name, from_commit_id,
+                state=self.COMMIT_STATE_FINISHED)
+        except PachClientException as err:
+            raise PachydermOperationException(err.details())
+
     def delete_commit(self, repo_name, commit_id):
         """
         deletes a commit and its contents
@@ -175,6 +318,8 @@ class PachydermClient:
             self.client.delete_commit((repo_name, commit_id))
         except PachClientException as err:
             raise PachydermOperationException(err.details())
+        finally:
+            self.invalidate_commit(repo_name, commit_id)
 
     @staticmethod
     def fetch_dataset_info(file_object):
@@ -198,7 +343,8 @@ class PachydermClient:
         info["size_in_bytes"] = file_object.size_bytes
         return info
 
-    def list_dataset(self, repo_name, commit_id, path="/", history=None, include_contents=None):
+    def list_dataset(self, repo_name, commit_id, path="/", history=None,
+                     include_contents=None):
         """
         list the dataset in a branch or provided commit
 
@@ -209,80 +355,814 @@ class PachydermClient:
         :param path:
             path to the dataset file/folder
         :param history:
-            (Optional) retrieves previous versions of file
+            (Deprecated) retrieves previous versions of file. Lists one
+            directory per request instead of a single walk
         :param include_contents:
-            includes file contents in response
+            (Deprecated) has no effect, the listing never held the contents
         :return:
+            list of file info dicts
+        """
+        if include_contents is not None:
+            warnings.warn("include_contents of list_dataset is deprecated "
+                          "and has no effect", DeprecationWarning,
+                          stacklevel=2)
+        if history:
+            warnings.warn("history of list_dataset is deprecated",
+                          DeprecationWarning, stacklevel=2)
+            return self.list_file_history(repo_name, commit_id, path,
+                                          history)
+        return list(self.iter_dataset(repo_name, commit_id, path))
+
+    def list_file_history(self, repo_name, commit_id, path, history):
+        """
+        lists the previous versions of the files under a path, one
+        directory per request
 
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param path:
+            path to the dataset file/folder
+        :param history:
+            number of previous versions of each file, -1 for all of them
+        :return:
+            list of file info dicts
         """
-        files = self.client.list_file((repo_name, commit_id), path, history, include_contents)
+        files = self.client.list_file((repo_name, commit_id), path, history)
         if files.done():
             raise PachydermOperationException(files.details())
         file_list = []
         sub_dir_path_list = []
         for file_item in files:
-            file_info = self.fetch_dataset_info(file_item)
-            file_list.append(file_info)
+            if DatasetManifest.is_metadata_path(file_item.file.path):
+                continue
+            file_list.append(self.fetch_dataset_info(file_item))
             # if file type is a directory
             if file_item.file_type == 2:
                 sub_dir_path_list.append(file_item.file.path)
 
         for sub_dir_path in sub_dir_path_list:
-            file_list += self.list_dataset(repo_name, commit_id, sub_dir_path,
-                                           history, include_contents)
-
+            file_list += self.list_file_history(repo_name, commit_id,
+                                                sub_dir_path, history)
         return file_list
 
-    def push_dataset(self, repo_name, branch_name, file_path_list, push_description=None):
+    def iter_dataset(self, repo_name, commit_id, path="/"):
+        """
+        lazily lists the dataset in a branch or provided commit
+
+        All the descendants of `path` are fetched in a single server side
+        walk instead of one list call per sub directory, and are yielded
+        as they arrive
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param path:
+            path to the dataset file/folder
+        :return:
+            generator of file info dicts
+        """
+        walk_root = DatasetManifest.normalize_path(path).rstrip("/") or "/"
+        try:
+            files = self.client.walk_file((repo_name, commit_id), path)
+            for file_item in files:
+                if DatasetManifest.is_metadata_path(file_item.file.path):
+                    # xpresso metadata is not a part of any dataset
+                    continue
+                # walk includes the directory it starts from
+                if file_item.file_type == 2 and \
+                        (file_item.file.path.rstrip("/") or "/") == walk_root:
+                    continue
+                yield self.fetch_dataset_info(file_item)
+        except PachClientException as err:
+            raise PachydermOperationException(err.details())
+
+    def glob_dataset(self, repo_name, commit_id, pattern):
+        """
+        lazily lists the files and folders matching a glob pattern
+
+        Matching is done on the cluster, hence only the matches are sent
+        to the client
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit or name of the branch
+        :param pattern:
+            glob pattern e.g. `dataset/sales/2024-*/part-*.parquet`
+        :return:
+            generator of file info dicts
+        """
+        try:
+            files = self.client.glob_file((repo_name, commit_id), pattern)
+            for file_item in files:
+                if DatasetManifest.is_metadata_path(file_item.file.path):
+                    continue
+                yield self.fetch_dataset_info(file_item)
+        except PachClientException as err:
+            raise PachydermOperationException(err.details())
+
+    def push_dataset(self, repo_name, branch_name, file_path_list,
+                     push_description=None, max_workers=None, retries=None,
+                     incremental=False, dataset_path=None, dedup=False,
+                     dedup_sources=None):
         """
         pushes a dataset into pachyderm cluster
 
-        starts a new commit and pushes the file provided at the `path`
-        to the cluster
+        starts a new commit and streams all the files provided in
+        `file_path_list` into it using a bounded pool of workers. The commit
+        is finished only if every file is uploaded, otherwise it is deleted.
+        Content hashes of the uploaded files are added to the manifest of
+        the branch.
+
+        In incremental mode only the files that are new or modified since
+        the head of the branch are uploaded, and files under `dataset_path`
+        that are not present locally anymore are deleted
 
         :param repo_name:
             name of the repo
         :param branch_name:
             name of the branch
         :param file_path_list:
-            list of paths of all the files
+            list of (local_path, pachyderm_path) tuples of all the files
         :param push_description:
             description for this push
+        :param max_workers:
+            (Optional) number of files uploaded concurrently
+        :param retries:
+            (Optional) number of retries for a failed file upload
+        :param incremental:
+            (Optional) uploads only the files changed since the branch head
+        :param dataset_path:
+            (Optional) directory on pachyderm cluster holding all the files
+            of this dataset. Used to find deleted files in incremental mode
+        :param dedup:
+            (Optional) files whose content is already present in the branch
+            head or in `dedup_sources` are copied on the cluster instead of
+            being uploaded
+        :param dedup_sources:
+            (Optional) list of other commit ids or branch names of the repo
+            searched for identical content in dedup mode
+        :return:
+            id of the new commit, or id of the branch head if nothing has
+            changed in incremental mode
+        """
+        manifest = self.get_manifest(repo_name, branch_name)
+        removed_paths = []
+        if incremental:
+            file_path_list, removed_paths = self.find_changed_files(
+                repo_name, branch_name, file_path_list, manifest,
+                dataset_path, max_workers)
+            if not file_path_list and not removed_paths:
+                return self.inspect_branch(repo_name, branch_name).head.id
+        duplicate_files = []
+        if dedup:
+            file_path_list, duplicate_files = self.find_duplicate_files(
+                repo_name, branch_name, file_path_list, dedup_sources,
+                max_workers)
+
+        new_commit_id = self.start_commit(repo_name, branch_name,
+                                          push_description, self.codec_name)
+        try:
+            for removed_path in removed_paths:
+                self.client.delete_file((repo_name, new_commit_id),
+                                        removed_path)
+                manifest.remove(removed_path)
+            for (source_commit_id, source_path, pachyderm_path, sha256,
+                 size_bytes, mtime, codec, stored_size_bytes) in \
+                    duplicate_files:
+                if source_commit_id is not None:
+                    self.client.copy_file((repo_name, source_commit_id),
+                                          source_path,
+                                          (repo_name, new_commit_id),
+                                          pachyderm_path, overwrite=True)
+                manifest.add(pachyderm_path, sha256, size_bytes, mtime, codec,
+                             stored_size_bytes)
+            uploaded_files = self.upload_files(repo_name, new_commit_id,
+                                               file_path_list, max_workers,
+                                               retries)
+            for (pachyderm_path, sha256, size_bytes, mtime,
+                 stored_size_bytes) in uploaded_files:
+                manifest.add(pachyderm_path, sha256, size_bytes, mtime,
+                             self.codec_name, stored_size_bytes)
+            self.finish_commit(repo_name, branch_name, new_commit_id, manifest)
+            return new_commit_id
+        except PachClientException as err:
+            self.abort_commit(repo_name, new_commit_id)
+            raise PachydermOperationException(err.details())
+        except BaseException:
+            # removes the above commit, also on errors of local files or
+            # an interrupted push
+            self.abort_commit(repo_name, new_commit_id)
+            raise
+
+    def start_commit(self, repo_name, branch_name, description=None,
+                     codec=None):
+        """
+        opens a new commit on a branch
+
+        :param repo_name:
+            name of the repo
+        :param branch_name:
+            name of the branch
+        :param description:
+            (Optional) description of the commit
+        :param codec:
+            (Optional) name of the TransferCodec files of the commit are
+            encoded with. It is recorded in the description of the commit.
+            Refused if a pipeline reads the repo, as pipelines can not
+            decode the files
         :return:
-            status of the push
+            id of the open commit
+        """
+        if codec:
+            self.check_encoded_push(repo_name, codec)
+            description = self.tag_codec(description, codec)
+        try:
+            new_commit = self.client.start_commit(repo_name, branch_name,
+                                                  parent=None,
+                                                  description=description)
+        except PachClientException as err:
+            raise PachydermOperationException(err.details())
+        return new_commit.id
+
+    def check_encoded_push(self, repo_name, codec):
+        """
+        raises if files encoded with a codec can not be pushed to a repo
+        because pipelines read it
+
+        :param repo_name:
+            name of the repo
+        :param codec:
+            name of the TransferCodec
+        """
+        if self.pipeline_client is None:
+            self.pipeline_client = PachydermPipelineClient(
+                self.host, self.port, self.auth_token)
+        pipelines = self.pipeline_client.get_reading_pipelines(repo_name)
+        if pipelines:
+            raise PachydermOperationException(
+                f"files encoded with {codec} can not be pushed to "
+                f"{repo_name}; it is read by pipelines {', '.join(pipelines)}")
+
+    @classmethod
+    def tag_codec(cls, description, codec):
+        """
+        adds the codec line to a commit description
+        """
+        codec_line = f"{cls.CODEC_DESCRIPTION_TAG}{codec}"
+        return f"{description}\n{codec_line}" if description else codec_line
+
+    @classmethod
+    def get_codec_tag(cls, description):
+        """
+        returns the codec recorded in a commit description or None
+        """
+        for line in (description or "").splitlines():
+            if line.startswith(cls.CODEC_DESCRIPTION_TAG):
+                return line[len(cls.CODEC_DESCRIPTION_TAG):].strip()
+        return None
+
+    def get_commit_codec(self, repo_name, commit_id):
+        """
+        returns the name of the TransferCodec files of a commit were pushed
+        with, None if they were pushed as they are
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit or name of the branch
+        """
+        return self.get_codec_tag(
+            self.inspect_commit(repo_name, commit_id).description)
+
+    def finish_commit(self, repo_name, branch_name, commit_id, manifest):
+        """
+        saves the manifest of an open commit and finishes it
+
+        :param repo_name:
+            name of the repo
+        :param branch_name:
+            name of the branch commit was opened on
+        :param commit_id:
+            id of the open commit
+        :param manifest:
+            DatasetManifest of all the files in the commit
         """
-        # TODO: add FileNotFound & byte encoding exceptions
         try:
-            # opens a new commit
-            new_commit = self.client.start_commit(repo_name, branch_name, parent=None,
-                                                  description=push_description)
+            self.put_manifest(repo_name, commit_id, manifest)
+            self.client.finish_commit((repo_name, commit_id))
         except PachClientException as err:
-            # returns in case of opening a new commit
             raise PachydermOperationException(err.details())
+        finally:
+            self.invalidate_branch(repo_name, branch_name)
+
+    def abort_commit(self, repo_name, commit_id):
+        """
+        deletes an open commit along with everything written into it
 
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the open commit
+        """
         try:
-            for (local_path, pachyderm_path) in file_path_list:
-                # fetching file extension before reading
-                file_extension = os.path.splitext(local_path)[1]
+            self.client.delete_commit((repo_name, commit_id))
+        except PachClientException as err:
+            raise PachydermOperationException(err.details())
+        finally:
+            self.invalidate_commit(repo_name, commit_id)
+
+    def upload_files(self, repo_name, commit_id, file_path_list,
+                     max_workers=None, retries=None):
+        """
+        uploads files into an open commit concurrently
+
+        Stops scheduling new uploads as soon as one of the files fails
+        and raises the failure
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the open commit
+        :param file_path_list:
+            list of (local_path, pachyderm_path) tuples
+        :param max_workers:
+            (Optional) number of files uploaded concurrently
+        :param retries:
+            (Optional) number of retries for a failed file upload
+        :return:
+            list of (pachyderm_path, sha256, size_bytes, mtime,
+            stored_size_bytes) of uploaded files
+        """
+        if max_workers is None:
+            max_workers = self.DEFAULT_PUSH_WORKERS
+        if retries is None:
+            retries = self.DEFAULT_PUSH_RETRIES
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [
+                executor.submit(self.upload_file, repo_name, commit_id,
+                                local_path, pachyderm_path, retries)
+                for (local_path, pachyderm_path) in file_path_list
+            ]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        return [future.result() for future in futures]
 
+    def upload_file(self, repo_name, commit_id, local_path, pachyderm_path,
+                    retries=0):
+        """
+        uploads a single file into an open commit
+
+        Existing file at `pachyderm_path` is overwritten. Transient gRPC
+        failures are retried with a linear backoff
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the open commit
+        :param local_path:
+            path of the file on local system
+        :param pachyderm_path:
+            path of the file on pachyderm cluster
+        :param retries:
+            number of retries in case of a transient failure
+        :return:
+            (pachyderm_path, sha256, size_bytes, mtime, stored_size_bytes)
+            of the uploaded content
+        """
+        attempt = 0
+        while True:
+            try:
+                digest = ContentDigest()
+                mtime = os.stat(local_path).st_mtime
                 with open(local_path, "rb") as dataset:
-                    if file_extension == ".pkl":
-                        # if pickle file is provided
-                        dataset_object = pickle.load(dataset)
-                        byte_data = pickle.dumps(dataset_object)
-                    else:
-                        byte_data = dataset.read()
-                        # byte_data = data.encode('utf-8')
-                self.client.put_file_bytes((repo_name, new_commit.id), pachyderm_path, byte_data)
-
-            self.client.finish_commit((repo_name, new_commit.id))
-            return new_commit.id
+                    # put file appends to an existing file by default
+                    self.client.put_file_bytes(
+                        (repo_name, commit_id), pachyderm_path,
+                        self.iter_upload_chunks(local_path, dataset, digest),
+                        overwrite_index=0)
+                return pachyderm_path, digest.hexdigest(), \
+                    digest.size_bytes, mtime, digest.stored_size_bytes
+            except grpc.RpcError as err:
+                if attempt >= retries or \
+                        err.code() not in self.RETRYABLE_STATUS_CODES:
+                    raise PachydermOperationException(
+                        f"Failed to upload {local_path}: {err.details()}")
+                attempt += 1
+                time.sleep(self.RETRY_BACKOFF_SECONDS * attempt)
+            except OSError as err:
+                raise PachydermOperationException(
+                    f"Failed to read {local_path}: {err}")
+            except UnicodeError:
+                raise PachydermOperationException("File encoding failure")
+
+    def upload_buffer(self, repo_name, commit_id, buffer, pachyderm_path):
+        """
+        uploads in-memory content into an open commit
+
+        File like objects are read `chunk_size` bytes at a time, hence only
+        one chunk is held in memory by the upload. Existing file at
+        `pachyderm_path` is overwritten
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the open commit
+        :param buffer:
+            bytes or a binary file like object
+        :param pachyderm_path:
+            path of the file on pachyderm cluster
+        :return:
+            (pachyderm_path, sha256, size_bytes, stored_size_bytes) of the
+            uploaded content
+        """
+        digest = ContentDigest()
+        if isinstance(buffer, (bytes, bytearray, memoryview)):
+            content = memoryview(buffer)
+            chunks = (bytes(content[offset:offset + self.chunk_size])
+                      for offset in range(0, len(content), self.chunk_size))
+        else:
+            chunks = iter(lambda: buffer.read(self.chunk_size), b"")
+
+        try:
+            self.client.put_file_bytes(
+                (repo_name, commit_id), pachyderm_path,
+                TransferCodec.iter_stored_chunks(chunks, self.codec, digest),
+                overwrite_index=0)
         except PachClientException as err:
-            # removes the above commit
-            self.client.delete_commit((repo_name, new_commit))
+            raise PachydermOperationException(
+                f"Failed to upload {pachyderm_path}: {err.details()}")
+        return pachyderm_path, digest.hexdigest(), digest.size_bytes, \
+            digest.stored_size_bytes
+
+    def find_changed_files(self, repo_name, branch_name, file_path_list,
+                           manifest, dataset_path=None, max_workers=None):
+        """
+        compares local files with the files at the head of a branch
+
+        A local file is unchanged if its size and modification time match
+        the manifest entry of its pachyderm path, or else if its content
+        hash does. Hashes of local files are computed concurrently and only
+        when needed. Manifest entries are used only for files still present
+        at the branch head with the recorded size, hence files deleted or
+        rewritten outside of this client are pushed again
+
+        :param repo_name:
+            name of the repo
+        :param branch_name:
+            name of the branch
+        :param file_path_list:
+            list of (local_path, pachyderm_path) tuples
+        :param manifest:
+            DatasetManifest of the branch head
+        :param dataset_path:
+            (Optional) directory on pachyderm cluster holding the dataset
+        :param max_workers:
+            (Optional) number of files hashed concurrently
+        :return:
+            tuple of list of (local_path, pachyderm_path) of new or modified
+            files and list of pachyderm paths of removed files
+        """
+        # the whole repo is walked without a dataset path since the pushed
+        # files may be anywhere in it
+        remote_files = {
+            path: size_bytes for (path, (_, size_bytes)) in
+            self.get_file_hashes(repo_name, branch_name,
+                                 dataset_path or "/").items()
+        }
+        manifest = manifest.verify(remote_files)
+
+        def is_changed(local_path, pachyderm_path):
+            entry = manifest.get(pachyderm_path)
+            if not entry:
+                return True
+            local_stat = os.stat(local_path)
+            if local_stat.st_size != entry[DatasetManifest.SIZE]:
+                return True
+            if local_stat.st_mtime == entry.get(DatasetManifest.MTIME):
+                return False
+            return self.hash_local_file(local_path) != \
+                entry[DatasetManifest.SHA256]
+
+        if max_workers is None:
+            max_workers = self.DEFAULT_PUSH_WORKERS
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            change_status = executor.map(
+                lambda file_paths: is_changed(*file_paths), file_path_list)
+            changed_files = [file_paths for (file_paths, changed)
+                             in zip(file_path_list, change_status) if changed]
+
+        local_paths = {DatasetManifest.normalize_path(pachyderm_path)
+                       for (_, pachyderm_path) in file_path_list}
+        removed_paths = []
+        if dataset_path:
+            removed_paths = [path for path in remote_files
+                             if path not in local_paths]
+        return changed_files, removed_paths
+
+    def find_duplicate_files(self, repo_name, branch_name, file_path_list,
+                             dedup_sources=None, max_workers=None):
+        """
+        finds local files whose content is already present in the repo
+
+        Local files are hashed concurrently and looked up in the manifests
+        of the branch head and of `dedup_sources`. Pachyderm FileInfo
+        hashes are not content digests, hence manifests are used instead.
+        Each source commit is walked once and manifest entries whose file
+        is missing or has another size there are ignored, so such files
+        are uploaded instead of copied.
+
+        Files no manifest covers, e.g. written or copied by pachctl, fall
+        back to their FileInfo hash: equal hashes within a repo mean equal
+        content, hence such a file takes the entry of a covered file with
+        the same FileInfo hash. Without any manifest all files are uploaded
+
+        :param repo_name:
+            name of the repo
+        :param branch_name:
+            name of the branch being pushed
+        :param file_path_list:
+            list of (local_path, pachyderm_path) tuples
+        :param dedup_sources:
+            (Optional) list of other commit ids or branch names to search
+        :param max_workers:
+            (Optional) number of files hashed concurrently
+        :return:
+            tuple of list of (local_path, pachyderm_path) to be uploaded and
+            list of (source_commit_id, source_path, pachyderm_path, sha256,
+            size_bytes, mtime, codec, stored_size_bytes) of duplicates. source_commit_id is None
+            when the file is unchanged at the same path in the branch head
+        """
+        head_commit_id = None
+        try:
+            head_commit_id = self.inspect_branch(repo_name,
+                                                 branch_name).head.id or None
+        except PachydermOperationException:
+            # branch does not exist yet
+            pass
+        source_commit_ids = [head_commit_id] if head_commit_id else []
+        for source in dedup_sources or []:
+            source_commit_ids.append(
+                self.inspect_commit(repo_name, source).commit.id)
+
+        # FileInfo hash to the manifest entry of a file with that content
+        entries_by_file_hash = {}
+        source_listings = []
+        for source_commit_id in source_commit_ids:
+            file_hashes = self.get_file_hashes(repo_name, source_commit_id)
+            file_sizes = {path: size_bytes for (path, (_, size_bytes))
+                          in file_hashes.items()}
+            source_manifest = self.get_manifest(
+                repo_name, source_commit_id).verify(file_sizes)
+            for (path, entry) in source_manifest.files.items():
+                entries_by_file_hash.setdefault(file_hashes[path][0], entry)
+            source_listings.append((source_commit_id, file_hashes,
+                                    source_manifest))
+
+        # sha256 to the first (commit id, path, size, codec, stored size)
+        # holding that content
+        known_content = {}
+        head_manifest = DatasetManifest()
+        for (source_commit_id, file_hashes, source_manifest) in \
+                source_listings:
+            for (path, (file_hash, _)) in file_hashes.items():
+                entry = entries_by_file_hash.get(file_hash)
+                if entry and source_manifest.get(path) is None:
+                    source_manifest.add(
+                        path, entry[DatasetManifest.SHA256],
+                        entry[DatasetManifest.SIZE],
+                        codec=entry.get(DatasetManifest.CODEC),
+                        stored_size_bytes=entry.get(
+                            DatasetManifest.STORED_SIZE))
+            if source_commit_id == head_commit_id:
+                head_manifest = source_manifest
+            for (path, entry) in source_manifest.files.items():
+                known_content.setdefault(
+                    entry[DatasetManifest.SHA256],
+                    (source_commit_id, path, entry[DatasetManifest.SIZE],
+                     entry.get(DatasetManifest.CODEC),
+                     DatasetManifest.get_stored_size(entry)))
+        if not known_content:
+            return file_path_list, []
+
+        if max_workers is None:
+            max_workers = self.DEFAULT_PUSH_WORKERS
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            local_hashes = list(executor.map(
+                lambda file_paths: self.hash_local_file(file_paths[0]),
+                file_path_list))
+
+        upload_files = []
+        duplicate_files = []
+        for ((local_path, pachyderm_path), sha256) in zip(file_path_list,
+                                                          local_hashes):
+            local_stat = os.stat(local_path)
+            source = known_content.get(sha256)
+            if not source or source[2] != local_stat.st_size:
+                upload_files.append((local_path, pachyderm_path))
+                continue
+            (source_commit_id, source_path, _, codec,
+             stored_size_bytes) = source
+            if head_manifest.get_hash(pachyderm_path) == sha256:
+                # the new commit inherits this file from the branch head
+                source_commit_id = None
+                head_entry = head_manifest.get(pachyderm_path)
+                codec = head_entry.get(DatasetManifest.CODEC)
+                stored_size_bytes = DatasetManifest.get_stored_size(head_entry)
+            duplicate_files.append((source_commit_id, source_path,
+                                    pachyderm_path, sha256,
+                                    local_stat.st_size, local_stat.st_mtime,
+                                    codec, stored_size_bytes))
+        return upload_files, duplicate_files
+
+    def walk_files(self, repo_name, commit_id, path):
+        """
+        lists all the files under a path, excluding directories
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit or name of the branch
+        :param path:
+            path of the directory on pachyderm cluster
+        :return:
+            list of file info dicts, empty if the path does not exist
+        """
+        try:
+            return [file_info for file_info
+                    in self.iter_dataset(repo_name, commit_id, path)
+                    if file_info["type"] == "File"]
+        except PachydermOperationException as err:
+            if "not found" in str(err):
+                return []
+            raise
+
+    def get_file_hashes(self, repo_name, commit_id, path="/"):
+        """
+        fetches the server side hash and size of every file under a path
+        in a single walk, without downloading any content
+
+        Hashes are computed by pachyderm and can be compared across commits
+        of the same repo only
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit or name of the branch
+        :param path:
+            path of the directory on pachyderm cluster
+        :return:
+            dict of path to (hash, size_bytes), empty if the path does not
+            exist
+        """
+        file_hashes = {}
+        try:
+            for file_item in self.client.walk_file((repo_name, commit_id),
+                                                   path):
+                if file_item.file_type != 1 or \
+                        DatasetManifest.is_metadata_path(file_item.file.path):
+                    continue
+                file_hashes[file_item.file.path] = (file_item.hash.hex(),
+                                                    file_item.size_bytes)
+        except grpc.RpcError as err:
+            if err.code() == grpc.StatusCode.NOT_FOUND or \
+                    "not found" in (err.details() or ""):
+                return {}
+            raise PachydermOperationException(err.details())
+        return file_hashes
+
+    def hash_local_file(self, local_path):
+        """
+        computes sha256 of a local file reading `chunk_size` bytes at a time
+        """
+        digest = ContentDigest()
+        with open(local_path, "rb") as dataset:
+            for chunk in iter(lambda: dataset.read(self.chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def iter_upload_chunks(self, local_path, dataset, digest=None):
+        """
+        yields the content of a local file as chunks of `chunk_size` bytes
+
+        The chunks are fed straight into the PutFile request stream, hence
+        only one chunk per upload is held in memory at a time
+
+        :param local_path:
+            path of the file on local system
+        :param dataset:
+            file object opened in binary mode
+        :param digest:
+            (Optional) ContentDigest updated with every chunk sent
+        :return:
+            generator of byte chunks
+        """
+        # fetching file extension before reading
+        file_extension = os.path.splitext(local_path)[1]
+
+        if file_extension == ".pkl" and \
+                self.transfer_mode == self.TRANSFER_MODE_PICKLE:
+            # if pickle file is provided
+            dataset_object = pickle.load(dataset)
+            byte_data = memoryview(pickle.dumps(dataset_object))
+            chunks = (byte_data[i:i + self.chunk_size].tobytes()
+                      for i in range(0, len(byte_data), self.chunk_size))
+        else:
+            chunks = iter(lambda: dataset.read(self.chunk_size), b"")
+
+        return TransferCodec.iter_stored_chunks(chunks, self.codec, digest)
+
+    def get_manifest(self, repo_name, commit_id):
+        """
+        fetches the dataset manifest of a commit
+
+        A commit without a manifest of its own uses the one of its closest
+        ancestor, up to MANIFEST_ANCESTOR_DEPTH commits back
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit or name of the branch
+        :return:
+            DatasetManifest object, empty if no manifest is found
+        """
+        try:
+            commit_info = self.inspect_commit(repo_name, commit_id)
+        except PachydermOperationException as err:
+            if "not found" in str(err):
+                # branch has no commits yet
+                return DatasetManifest()
+            raise
+        content = self.read_manifest(repo_name, commit_info.commit.id)
+        if content is None:
+            content = self.read_file(repo_name, commit_info.commit.id,
+                                     DatasetManifest.LEGACY_MANIFEST_PATH)
+        depth = 0
+        while content is None and commit_info.parent_commit.id and \
+                depth < self.MANIFEST_ANCESTOR_DEPTH:
+            depth += 1
+            commit_info = self.inspect_commit(repo_name,
+                                              commit_info.parent_commit.id)
+            content = self.read_manifest(repo_name, commit_info.commit.id)
+        return DatasetManifest.from_bytes(content)
+
+    def read_manifest(self, repo_name, commit_id):
+        """
+        reads the manifest saved for a commit in the MANIFEST_BRANCH
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :return:
+            manifest content as bytes, None if the commit has no manifest
+        """
+        return self.read_file(repo_name, DatasetManifest.MANIFEST_BRANCH,
+                              DatasetManifest.get_manifest_path(commit_id))
+
+    def read_file(self, repo_name, commit_id, path):
+        """
+        reads a small file of a commit into memory
+
+        :return:
+            content as bytes, None if the file or commit does not exist
+        """
+        try:
+            return b"".join(self.client.get_file((repo_name, commit_id),
+                                                 path))
+        except grpc.RpcError as err:
+            if err.code() == grpc.StatusCode.NOT_FOUND or \
+                    "not found" in (err.details() or ""):
+                return None
             raise PachydermOperationException(err.details())
-        except UnicodeError as err:
-            raise PachydermOperationException("File encoding failure")
+
+    def put_manifest(self, repo_name, commit_id, manifest):
+        """
+        replaces the dataset manifest of a commit
+
+        The manifest is written into the MANIFEST_BRANCH in a commit of
+        its own, hence the data tree of `commit_id` is not modified
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit, usually an open one
+        :param manifest:
+            DatasetManifest object
+        """
+        self.client.put_file_bytes(
+            (repo_name, DatasetManifest.MANIFEST_BRANCH),
+            DatasetManifest.get_manifest_path(commit_id), manifest.to_bytes(),
+            overwrite_index=0)
 
     def pull_dataset(self, repo_name, commit_id, path):
         """
@@ -295,31 +1175,532 @@ class PachydermClient:
         :param path:
             path of the file in the pachyderm cluster
         :return:
-            returns the fileInfo object if success
+            returns the content of the file as bytes, decoded if it is
+            stored with a TransferCodec
         """
         commit_tuple = (repo_name, commit_id)
         files = self.client.get_file(commit_tuple, path)
         try:
-            for file in files:
-                return file
+            content = b"".join(files)
         except PachClientException as err:
             raise PachydermOperationException(err.details())
+        # the manifest entry is trusted only if it matches the stored size
+        entry = self.get_manifest(repo_name, commit_id).get_verified(
+            path, len(content))
+        codec = entry.get(DatasetManifest.CODEC) if entry else None
+        content_file = io.BytesIO(content)
+        codec = codec or TransferCodec.detect(content_file)
+        if codec:
+            content = b"".join(TransferCodec.get(codec).iter_decoded(
+                content_file))
+        return content
+
+    def download_files(self, repo_name, commit_id, file_path_list,
+                       manifest=None, max_workers=None, retries=None,
+                       range_workers=None, cache=None):
+        """
+        downloads files of a commit concurrently
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param file_path_list:
+            list of (pachyderm_path, local_path, size_bytes) tuples where
+            size_bytes is the size reported by pachyderm
+        :param manifest:
+            (Optional) DatasetManifest used to verify the content. Entries
+            not matching `size_bytes` are ignored as stale
+        :param max_workers:
+            (Optional) number of files downloaded concurrently
+        :param retries:
+            (Optional) number of retries for a failed file download
+        :param range_workers:
+            (Optional) number of byte ranges of a large file downloaded
+            concurrently
+        :param cache:
+            (Optional) DatasetCache used to skip files pulled before
+        :return:
+            TransferStats of the download
+        """
+        if max_workers is None:
+            max_workers = self.DEFAULT_PULL_WORKERS
+        if retries is None:
+            retries = self.DEFAULT_PULL_RETRIES
+        if manifest is None:
+            manifest = DatasetManifest()
+
+        stats = TransferStats()
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = []
+            for (pachyderm_path, local_path, size_bytes) in file_path_list:
+                entry = manifest.get_verified(pachyderm_path, size_bytes) or {}
+                futures.append(executor.submit(
+                    self.pull_file, repo_name, commit_id, pachyderm_path,
+                    local_path, entry.get(DatasetManifest.SHA256), stats,
+                    retries, size_bytes, range_workers, cache,
+                    entry.get(DatasetManifest.CODEC)))
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        stats.stop()
+        return stats
+
+    def pull_file(self, repo_name, commit_id, path, local_path,
+                  expected_hash=None, stats=None, retries=0, size_bytes=None,
+                  range_workers=None, cache=None, codec=None):
+        """
+        streams a file of a commit onto the local system
+
+        Chunks are written to a partial file next to `local_path` as they
+        arrive which is renamed to `local_path` once the download is
+        complete and verified. A partial file left by an interrupted pull
+        is resumed from its current length. Files larger than
+        RANGE_DOWNLOAD_THRESHOLD can be split into `range_workers` byte
+        ranges which are fetched in parallel. If a `cache` is provided, a
+        file already present in it is linked to `local_path` instead of
+        being downloaded. Files stored with a TransferCodec are downloaded
+        encoded, with ranges and resume working the same, and decoded once
+        complete
 
-    def delete_dataset(self, repo_name, commit_id, file_path):
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param path:
+            path of the file on pachyderm cluster
+        :param local_path:
+            path at which file is saved on local system
+        :param expected_hash:
+            (Optional) sha256 of the file recorded during push
+        :param stats:
+            (Optional) TransferStats updated during the download
+        :param retries:
+            number of retries in case of a transient failure
+        :param size_bytes:
+            (Optional) size of the file on pachyderm cluster
+        :param range_workers:
+            (Optional) number of byte ranges downloaded concurrently
+        :param cache:
+            (Optional) DatasetCache holding files pulled before
+        :param codec:
+            (Optional) name of the TransferCodec the file is stored with
+        """
+        local_dir = os.path.dirname(local_path)
+        if os.path.isfile(local_dir):
+            raise LocalFilePathException(f"file exists at this path; {local_path}")
+        os.makedirs(local_dir, exist_ok=True)
+
+        if self.transfer_mode == self.TRANSFER_MODE_PICKLE:
+            # local content differs from the hash in this mode
+            cache = None
+        if cache:
+            cached_hash = expected_hash or \
+                cache.lookup(repo_name, commit_id, path)
+            if cached_hash and cache.materialize(cached_hash, local_path):
+                if stats:
+                    stats.add_file()
+                return
+
+        if range_workers is None:
+            range_workers = self.DEFAULT_RANGE_WORKERS
+        partial_path = local_path + self.PARTIAL_FILE_SUFFIX
+        download_path = partial_path
+        if codec:
+            download_path = partial_path + self.ENCODED_FILE_SUFFIX
+        if size_bytes and range_workers > 1 and \
+                size_bytes >= self.RANGE_DOWNLOAD_THRESHOLD:
+            digest = self.pull_file_ranges(repo_name, commit_id, path,
+                                           download_path, size_bytes,
+                                           range_workers, stats, retries)
+        else:
+            digest = ContentDigest()
+            self.pull_file_range(repo_name, commit_id, path, download_path,
+                                 0, size_bytes, digest, stats, retries)
+        if not codec:
+            # encoded content is recognised by its header even when the
+            # manifest entry was not usable
+            codec = TransferCodec.detect_file(download_path)
+            if codec:
+                encoded_path = partial_path + self.ENCODED_FILE_SUFFIX
+                os.replace(download_path, encoded_path)
+                download_path = encoded_path
+        if codec:
+            digest = TransferCodec.get(codec).decode_file(download_path,
+                                                          partial_path)
+
+        if expected_hash and digest.hexdigest() != expected_hash:
+            os.remove(partial_path)
+            raise DatasetIntegrityException(f"content hash mismatch for {path}")
+
+        if os.path.splitext(local_path)[1] == ".pkl" and \
+                self.transfer_mode == self.TRANSFER_MODE_PICKLE:
+            # if it is pickle file we use pickle to dump it onto file
+            with open(partial_path, "rb") as in_file:
+                dataset_object = pickle.load(in_file)
+            with open(partial_path, "wb") as out_file:
+                pickle.dump(dataset_object, out_file, pickle.HIGHEST_PROTOCOL)
+
+        os.replace(partial_path, local_path)
+        if cache:
+            try:
+                cache.add(repo_name, commit_id, path, local_path,
+                          digest.hexdigest())
+            except (OSError, sqlite3.Error) as err:
+                # the file is pulled, only its next pull is not faster
+                warnings.warn(f"{path} could not be added to the cache: {err}",
+                              stacklevel=2)
+        if stats:
+            stats.add_file()
+
+    def pull_file_ranges(self, repo_name, commit_id, path, partial_path,
+                         size_bytes, range_workers, stats=None, retries=0):
+        """
+        downloads a file as byte ranges in parallel into `partial_path`
+
+        The partial file is allocated once at its full size and every range
+        is written at its own offset. Bytes received by each range are
+        recorded in a state file next to it, hence each range resumes
+        independently if the pull is interrupted
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param path:
+            path of the file on pachyderm cluster
+        :param partial_path:
+            local path into which the ranges are written
+        :param size_bytes:
+            size of the file on pachyderm cluster
+        :param range_workers:
+            number of byte ranges downloaded concurrently
+        :param stats:
+            (Optional) TransferStats updated during the download
+        :param retries:
+            number of retries in case of a transient failure
+        :return:
+            ContentDigest of the downloaded file
+        """
+        range_size = -(-size_bytes // range_workers)
+        ranges = [(offset, min(range_size, size_bytes - offset))
+                  for offset in range(0, size_bytes, range_size)]
+        state_path = partial_path + self.RANGE_STATE_SUFFIX
+        received = self.load_range_state(state_path, partial_path,
+                                         size_bytes, ranges)
+        if received is None:
+            received = {offset: 0 for (offset, _) in ranges}
+            with open(partial_path, "wb") as out_file:
+                if hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(out_file.fileno(), 0, size_bytes)
+                else:
+                    out_file.truncate(size_bytes)
+        state_lock = threading.Lock()
+
+        def write_range_chunk(offset, chunk):
+            position = offset + received[offset]
+            written = 0
+            while written < len(chunk):
+                written += os.pwrite(out_fd, chunk[written:],
+                                     position + written)
+            with state_lock:
+                received[offset] += len(chunk)
+                self.save_range_state(state_path, size_bytes, received)
+
+        out_fd = os.open(partial_path, os.O_WRONLY)
+        try:
+            with ThreadPoolExecutor(max_workers=range_workers) as executor:
+                futures = [
+                    executor.submit(
+                        self.stream_file_range, repo_name, commit_id, path,
+                        offset, length, received[offset],
+                        lambda chunk, offset=offset:
+                        write_range_chunk(offset, chunk),
+                        stats, retries)
+                    for (offset, length) in ranges
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            os.close(out_fd)
+
+        digest = ContentDigest()
+        with open(partial_path, "rb") as in_file:
+            for chunk in iter(lambda: in_file.read(self.chunk_size), b""):
+                digest.update(chunk)
+        os.remove(state_path)
+        return digest
+
+    @staticmethod
+    def load_range_state(state_path, partial_path, size_bytes, ranges):
+        """
+        reads the bytes received by each range of an interrupted range
+        download
+
+        :return:
+            dict of range offset to bytes received, None if the partial
+            file can not be resumed with these ranges
+        """
+        try:
+            with open(state_path) as state_file:
+                state = json.load(state_file)
+            if state["size_bytes"] != size_bytes or \
+                    os.path.getsize(partial_path) != size_bytes:
+                return None
+            received = {int(offset): received_bytes for
+                        (offset, received_bytes) in state["received"].items()}
+        except (OSError, ValueError, KeyError):
+            return None
+        if set(received) != {offset for (offset, _) in ranges} or any(
+                not 0 <= received[offset] <= length
+                for (offset, length) in ranges):
+            return None
+        return received
+
+    @staticmethod
+    def save_range_state(state_path, size_bytes, received):
+        """
+        records the bytes received by each range of a range download
+        """
+        temp_path = state_path + ".tmp"
+        with open(temp_path, "w") as state_file:
+            json.dump({"size_bytes": size_bytes,
+                       "received": {str(offset): received_bytes for
+                                    (offset, received_bytes) in
+                                    received.items()}}, state_file)
+        os.replace(temp_path, state_path)
+
+    def pull_file_range(self, repo_name, commit_id, path, partial_path,
+                        offset_bytes=0, size_bytes=None, digest=None,
+                        stats=None, retries=0):
+        """
+        streams a byte range of a file into `partial_path`
+
+        Content already present in `partial_path` is kept and only the rest
+        of the range is requested using `offset_bytes`, hence an interrupted
+        download resumes from where it stopped
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param path:
+            path of the file on pachyderm cluster
+        :param partial_path:
+            local path to which the range is appended
+        :param offset_bytes:
+            start of the range in the file
+        :param size_bytes:
+            (Optional) length of the range, rest of the file if not provided
+        :param digest:
+            (Optional) ContentDigest updated with the whole range content
+        :param stats:
+            (Optional) TransferStats updated during the download
+        :param retries:
+            number of retries in case of a transient failure
+        """
+        if size_bytes and os.path.exists(partial_path) and \
+                os.path.getsize(partial_path) > size_bytes:
+            # partial file does not belong to this range
+            os.remove(partial_path)
+        if digest and os.path.exists(partial_path):
+            with open(partial_path, "rb") as in_file:
+                for chunk in iter(lambda: in_file.read(self.chunk_size), b""):
+                    digest.update(chunk)
+
+        def write_chunk(chunk):
+            out_file.write(chunk)
+            if digest:
+                digest.update(chunk)
+
+        with open(partial_path, "ab") as out_file:
+            self.stream_file_range(repo_name, commit_id, path, offset_bytes,
+                                   size_bytes, out_file.tell(), write_chunk,
+                                   stats, retries)
+
+    def stream_file_range(self, repo_name, commit_id, path, offset_bytes,
+                          size_bytes, received_bytes, write_chunk,
+                          stats=None, retries=0):
+        """
+        streams the part of a byte range not received yet into
+        `write_chunk`, retrying transient failures from where they stopped
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param path:
+            path of the file on pachyderm cluster
+        :param offset_bytes:
+            start of the range in the file
+        :param size_bytes:
+            length of the range, rest of the file if None
+        :param received_bytes:
+            bytes of the range received before
+        :param write_chunk:
+            callable called with every chunk received
+        :param stats:
+            (Optional) TransferStats updated during the download
+        :param retries:
+            number of retries in case of a transient failure
+        """
+        attempt = 0
+        while True:
+            if size_bytes and received_bytes >= size_bytes:
+                return
+            remaining_bytes = size_bytes - received_bytes if size_bytes else None
+            try:
+                for chunk in self.client.get_file(
+                        (repo_name, commit_id), path,
+                        offset_bytes=offset_bytes + received_bytes,
+                        size_bytes=remaining_bytes):
+                    write_chunk(chunk)
+                    received_bytes += len(chunk)
+                    if stats:
+                        stats.add_bytes(len(chunk))
+                return
+            except grpc.RpcError as err:
+                if attempt >= retries or \
+                        err.code() not in self.RETRYABLE_STATUS_CODES:
+                    raise PachydermOperationException(
+                        f"Failed to download {path}: {err.details()}")
+                attempt += 1
+                time.sleep(self.RETRY_BACKOFF_SECONDS * attempt)
+
+    def delete_dataset(self, repo_name, commit_id, file_path,
+                       update_manifest=True):
         """
         deletes a dataset from the cluster
 
+        The manifest entries of the deleted files are removed in the same
+        commit. When a branch name is given, the deletion is done in a new
+        commit on that branch
+
         :param repo_name:
             name of the repo dataset is in
         :param commit_id:
-            id of the commit to find the dataset
+            id of an open commit or name of a branch
         :param file_path:
             path of the dataset on the pachyderm cluster
+        :param update_manifest:
+            (Optional) False if the caller keeps the manifest of the open
+            commit itself
         """
+        if not file_path or file_path == "/":
+            self.delete_commit(repo_name, commit_id)
+            return
         try:
-            if not file_path or file_path == "/":
-                self.delete_commit(repo_name, commit_id)
-            else:
+            if not update_manifest:
+                self.client.delete_file((repo_name, commit_id), file_path)
+                return
+            manifest = self.get_manifest(repo_name, commit_id)
+            for path in manifest.paths_under(file_path):
+                manifest.remove(path)
+            commit_info = self.inspect_commit(repo_name, commit_id)
+            if commit_info.commit.id == commit_id:
+                # an open commit is written into directly
                 self.client.delete_file((repo_name, commit_id), file_path)
+                self.put_manifest(repo_name, commit_id, manifest)
+                return
+            new_commit_id = self.start_commit(repo_name, commit_id)
+            try:
+                self.client.delete_file((repo_name, new_commit_id),
+                                        file_path)
+                self.finish_commit(repo_name, commit_id, new_commit_id,
+                                   manifest)
+            except BaseException:
+                self.abort_commit(repo_name, new_commit_id)
+                raise
         except PachClientException as err:
             raise PachydermOperationException(err.details())
+        finally:
+            self.invalidate_commit(repo_name, commit_id)
+
+    def copy_dataset(self, repo_name, source_commit, branch_name, path,
+                     description=None):
+        """
+        copies a dataset into a branch inside the cluster
+
+        the copy is done in a single new commit on the destination branch
+        using server side `copy_file`, hence no file content passes through
+        the client. The dataset already present at `path` on the branch is
+        replaced and manifest entries of the copied files are carried over
+
+        :param repo_name:
+            name of the repo
+        :param source_commit:
+            id of the commit or name of the branch to copy from
+        :param branch_name:
+            name of the destination branch
+        :param path:
+            path of the dataset on the pachyderm cluster
+        :param description:
+            (Optional) description of the new commit
+        :return:
+            id of the new commit
+        """
+        source_commit_id = self.inspect_commit(repo_name,
+                                               source_commit).commit.id
+        if not self.walk_files(repo_name, source_commit_id, path):
+            raise PachydermOperationException(
+                f"{path} not found in commit {source_commit_id}")
+        source_manifest = self.get_manifest(repo_name, source_commit_id)
+        manifest = self.get_manifest(repo_name, branch_name)
+        replace_existing = bool(self.walk_files(repo_name, branch_name, path))
+
+        new_commit_id = self.start_commit(repo_name, branch_name, description)
+        try:
+            if replace_existing:
+                self.client.delete_file((repo_name, new_commit_id), path)
+            self.client.copy_file((repo_name, source_commit_id), path,
+                                  (repo_name, new_commit_id), path,
+                                  overwrite=True)
+            manifest.copy_entries(source_manifest, path)
+            self.finish_commit(repo_name, branch_name, new_commit_id, manifest)
+            return new_commit_id
+        except grpc.RpcError as err:
+            self.abort_commit(repo_name, new_commit_id)
+            raise PachydermOperationException(err.details())
+        except BaseException:
+            # the branch keeps its dataset when the copy fails after the
+            # delete, as the new commit is never finished
+            self.abort_commit(repo_name, new_commit_id)
+            raise
+
+    def invalidate_branch(self, repo_name, branch_name):
+        """
+        drops cached metadata that depends on the head of a branch
+
+        :param repo_name:
+            name of the repo
+        :param branch_name:
+            name of the branch
+        """
+        self.metadata_cache.invalidate(repo_name, self.BRANCH_METADATA,
+                                       branch_name)
+        self.metadata_cache.invalidate(repo_name, self.COMMIT_METADATA,
+                                       branch_name)
+
+    def invalidate_commit(self, repo_name, commit_id):
+        """
+        drops cached metadata of a repo after one of its commits changed
+
+        Branch heads and commits referred by branch names might point to
+        the commit, hence all the entries of the repo are dropped
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        """
+        self.metadata_cache.invalidate(repo_name)
+
+    def get_metadata_cache_stats(self):
+        """
+        returns hit and miss counters of the metadata cache
+        """
+        return self.metadata_cache.stats()
@@ -0,0 +1,704 @@
+import queue
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import grpc
+from google.protobuf.json_format import MessageToDict, ParseDict, ParseError
+from grpc._channel import _Rendezvous as PachClientException
+from python_pachyderm.client.pps import pps_pb2
+from python_pachyderm.util import commit_from
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    PachydermOperationException, InvalidConfigException
+from xpresso.ai.core.data.pachyderm_repo_management.channel_pool import ChannelRegistry
+from xpresso.ai.core.data.pachyderm_repo_management.datum_stats import DatumStats
+
+
+class PachydermPipelineClient:
+    """
+    Our own wrapper for pachyderm pipeline (PPS) client
+
+    It shares the gRPC channel of the cluster with the PFS clients, hence
+    waiting on many jobs costs one in-flight request per job on a single
+    connection instead of a polling loop per job
+    """
+    # JobState of pps protos, as reported in the progress of wait_jobs
+    JOB_STARTING = 0
+    JOB_RUNNING = 1
+    JOB_FAILURE = 2
+    JOB_SUCCESS = 3
+    JOB_KILLED = 4
+    PROGRESS_FIELDS = ("data_processed", "data_skipped", "data_failed",
+                       "data_recovered", "data_total")
+    # DatumState of pps protos
+    DATUM_STATES = {
+        0: "failed",
+        1: "success",
+        2: "skipped",
+        3: "starting",
+        4: "recovered"
+    }
+    DEFAULT_DATUM_PAGE_SIZE = 1000
+    # number of datum pages fetched concurrently ahead of the caller
+    DEFAULT_PREFETCH_PAGES = 4
+    DEFAULT_APPLY_WORKERS = 8
+    APPLY_CREATED = "created"
+    APPLY_UPDATED = "updated"
+    APPLY_UNCHANGED = "unchanged"
+    # fields of CreatePipelineRequest which only steer the request itself
+    REQUEST_ONLY_FIELDS = ("update", "reprocess")
+    # spec fields of PipelineInfo which pachd sets on every update
+    SERVER_MANAGED_FIELDS = ("spec_commit",)
+    # dotted paths of the fields which pachd fills with a default when a
+    # spec leaves them out, they are compared only if the desired spec sets
+    # them. Inputs nested in cross, union and join inputs match the
+    # `input.` paths
+    SERVER_DEFAULT_FIELDS = {"salt", "output_branch", "cache_size",
+                             "max_queue_size", "datum_tries",
+                             "parallelism_spec", "resource_requests",
+                             "hashtree_spec", "transform.image",
+                             "input.pfs.name", "input.pfs.branch",
+                             "input.cron.repo", "input.cron.start",
+                             "input.git.name", "input.git.branch"}
+
+    def __init__(self, host, port, auth_token=None):
+        """
+
+        :param host:
+        :param port:
+        :param auth_token:
+        """
+        self.host = host
+        self.port = port
+        self.auth_token = auth_token
+        self.client = self.connect(host, port, auth_token)
+
+    @staticmethod
+    def connect(host, port, auth_token=None):
+        """
+        returns a PpsClient on the channel shared by all the clients of
+        this cluster in the process
+
+        :param host:
+        :param port:
+        :param auth_token:
+        :return:
+        """
+        client = ChannelRegistry().pps_client(host, port, auth_token)
+        return client
+
+    def inspect_job(self, job_id, block_state=None, timeout=None):
+        """
+        returns the JobInfo of a job
+
+        :param job_id:
+            id of the job
+        :param block_state:
+            (Optional) blocks until the job is finished if True
+        :param timeout:
+            (Optional) seconds after which the request is abandoned
+        :return:
+            JobInfo object
+        """
+        request = pps_pb2.InspectJobRequest(job=pps_pb2.Job(id=job_id),
+                                            block_state=block_state)
+        try:
+            return self.client.stub.InspectJob(
+                request, metadata=self.client.metadata, timeout=timeout)
+        except PachClientException as err:
+            raise PachydermOperationException(err.details())
+
+    def list_job(self, pipeline_name=None, input_commit=None,
+                 output_commit=None, history=None):
+        """
+        returns the jobs of a pipeline or of all the pipelines
+
+        :param pipeline_name:
+            (Optional) name of the pipeline
+        :param input_commit:
+            (Optional) list of (repo, commit_id) tuples the jobs read from
+        :param output_commit:
+            (Optional) (repo, commit_id) tuple the job wrote into
+        :param history:
+            (Optional) number of older pipeline versions to be included,
+            -1 for all
+        :return:
+            generator of JobInfo objects
+        """
+        try:
+            yield from self.client.list_job(pipeline_name, input_commit,
+                                            output_commit, history)
+        except PachClientException as err:
+            raise PachydermOperationException(err.details())
+
+    def flush_commits(self, commit_list, pipeline_names=None, timeout=None):
+        """
+        waits for all the jobs which have any of the commits as provenance
+
+        :param commit_list:
+            list of (repo, commit_id) tuples
+        :param pipeline_names:
+            (Optional) only the jobs of these pipelines are waited for
+        :param timeout:
+            (Optional) seconds after which waiting is abandoned
+        :return:
+            generator of JobInfo objects in the order the jobs finish
+        """
+        pipelines = None
+        if pipeline_names is not None:
+            pipelines = [pps_pb2.Pipeline(name=name) for name in pipeline_names]
+        request = pps_pb2.FlushJobRequest(
+            commits=[commit_from(commit) for commit in commit_list],
+            to_pipelines=pipelines)
+        try:
+            yield from self.client.stub.FlushJob(
+                request, metadata=self.client.metadata, timeout=timeout)
+        except PachClientException as err:
+            raise PachydermOperationException(err.details())
+
+    def get_job_logs(self, job_id, follow=None, tail=None):
+        """
+        returns the log stream of a job
+
+        :param job_id:
+            id of the job
+        :param follow:
+            (Optional) keeps the stream open for new logs if True
+        :param tail:
+            (Optional) number of latest lines returned per worker
+        :return:
+            stream of LogMessage objects which can be cancelled
+        """
+        try:
+            return self.client.get_job_logs(job_id, follow=follow, tail=tail)
+        except PachClientException as err:
+            raise PachydermOperationException(err.details())
+
+    def get_pipeline_logs(self, pipeline_name, follow=None, tail=None):
+        """
+        returns the log stream of a pipeline
+
+        :param pipeline_name:
+            name of the pipeline
+        :param follow:
+            (Optional) keeps the stream open for new logs if True
+        :param tail:
+            (Optional) number of latest lines returned per worker
+        :return:
+            stream of LogMessage objects which can be cancelled
+        """
+        try:
+            return self.client.get_pipeline_logs(pipeline_name, follow=follow,
+                                                 tail=tail)
+        except PachClientException as err:
+            raise PachydermOperationException(err.details())
+
+    def list_datum_page(self, job_id, page, page_size=None):
+        """
+        returns a page of the datums of a job
+
+        :param job_id:
+            id of the job
+        :param page:
+            index of the page starting from 0
+        :param page_size:
+            (Optional) number of datums in a page
+        :return:
+            tuple of the list of datum records and the number of pages
+        """
+        page_size = page_size or self.DEFAULT_DATUM_PAGE_SIZE
+        total_pages = 0
+        datum_records = []
+        try:
+            for response in self.client.list_datum(job_id, page_size, page):
+                total_pages = response.total_pages
+                datum_records.append(
+                    self.get_datum_record(response.datum_info))
+        except PachClientException as err:
+            raise PachydermOperationException(err.details())
+        return datum_records, total_pages
+
+    def iter_datums(self, job_id, page_size=None, prefetch_pages=None):
+        """
+        yields compact records of all the datums of a job
+
+        The first page tells the number of pages, after which up to
+        `prefetch_pages` pages are fetched concurrently while the caller
+        consumes the earlier ones. Pages are yielded in order
+
+        :param job_id:
+            id of the job
+        :param page_size:
+            (Optional) number of datums in a page
+        :param prefetch_pages:
+            (Optional) number of pages fetched ahead
+        :return:
+            generator of datum record dicts
+        """
+        prefetch_pages = prefetch_pages or self.DEFAULT_PREFETCH_PAGES
+        datum_records, total_pages = self.list_datum_page(job_id, 0,
+                                                          page_size)
+        with ThreadPoolExecutor(max_workers=prefetch_pages) as executor:
+            next_page = 1
+            page_futures = deque()
+            try:
+                while True:
+                    while next_page < total_pages and \
+                            len(page_futures) < prefetch_pages:
+                        page_futures.append(executor.submit(
+                            self.list_datum_page, job_id, next_page,
+                            page_size))
+                        next_page += 1
+                    yield from datum_records
+                    if not page_futures:
+                        return
+                    datum_records, _ = page_futures.popleft().result()
+            finally:
+                for future in page_futures:
+                    future.cancel()
+
+    def get_datum_stats(self, job_id, slowest_count=None, page_size=None,
+                        prefetch_pages=None):
+        """
+        returns the per state counts and the slowest datums of a job
+
+        :param job_id:
+            id of the job
+        :param slowest_count:
+            (Optional) number of slowest datums to be reported
+        :param page_size:
+            (Optional) number of datums in a page
+        :param prefetch_pages:
+            (Optional) number of pages fetched ahead
+        :return:
+            DatumStats object
+        """
+        datum_stats = DatumStats(slowest_count)
+        return datum_stats.update(
+            self.iter_datums(job_id, page_size, prefetch_pages))
+
+    @classmethod
+    def get_datum_record(cls, datum_info):
+        """
+        converts a DatumInfo into a compact dict
+
+        :param datum_info:
+            DatumInfo object
+        :return:
+            dict of datum id, state, timings in seconds and bytes moved
+        """
+        stats = datum_info.stats
+        download_seconds = cls.to_seconds(stats.download_time)
+        process_seconds = cls.to_seconds(stats.process_time)
+        upload_seconds = cls.to_seconds(stats.upload_time)
+        return {
+            "datum_id": datum_info.datum.id,
+            "state": cls.DATUM_STATES.get(datum_info.state,
+                                          str(datum_info.state)),
+            "download_seconds": download_seconds,
+            "process_seconds": process_seconds,
+            "upload_seconds": upload_seconds,
+            "total_seconds": download_seconds + process_seconds +
+            upload_seconds,
+            "download_bytes": stats.download_bytes,
+            "upload_bytes": stats.upload_bytes
+        }
+
+    @staticmethod
+    def to_seconds(duration):
+        """
+        converts a protobuf Duration into seconds
+        """
+        return duration.seconds + duration.nanos / 1e9
+
+    def get_pipeline_spec(self, pipeline_name):
+        """
+        returns the canonical spec of a pipeline running on the cluster
+
+        :param pipeline_name:
+            name of the pipeline
+        :return:
+            canonical spec dict or None if the pipeline does not exist
+        """
+        try:
+            pipeline_info = self.client.inspect_pipeline(pipeline_name)
+        except grpc.RpcError as err:
+            if err.code() == grpc.StatusCode.NOT_FOUND or \
+                    "not found" in (err.details() or ""):
+                return None
+            raise PachydermOperationException(err.details())
+        # PipelineInfo shares the spec fields with CreatePipelineRequest
+        # and adds the runtime state which is dropped here
+        current_spec = self.canonicalize_spec(
+            MessageToDict(pipeline_info, preserving_proto_field_name=True),
+            ignore_unknown_fields=True)
+        for field in self.SERVER_MANAGED_FIELDS:
+            current_spec.pop(field, None)
+        return current_spec
+
+    @classmethod
+    def canonicalize_spec(cls, pipeline_spec, ignore_unknown_fields=False):
+        """
+        normalizes a pipeline spec so that equal specs compare equal
+
+        The spec is parsed into a CreatePipelineRequest and converted
+        back. Fields with default values and json name aliases disappear in
+        the round trip
+
+        :param pipeline_spec:
+            dict in the pachyderm pipeline spec format
+        :param ignore_unknown_fields:
+            (Optional) drops fields which are not part of a spec instead of
+            rejecting them
+        :return:
+            canonical spec dict
+        """
+        try:
+            request = ParseDict(pipeline_spec,
+                                pps_pb2.CreatePipelineRequest(),
+                                ignore_unknown_fields=ignore_unknown_fields)
+        except ParseError as err:
+            raise InvalidConfigException(f"invalid pipeline spec; {err}")
+        canonical_spec = MessageToDict(request,
+                                       preserving_proto_field_name=True)
+        for field in cls.REQUEST_ONLY_FIELDS:
+            canonical_spec.pop(field, None)
+        return canonical_spec
+
+    @classmethod
+    def diff_pipeline_spec(cls, desired_spec, current_spec, field_path=""):
+        """
+        compares a desired canonical spec with the current one
+
+        :param desired_spec:
+            canonical spec dict to be applied
+        :param current_spec:
+            canonical spec dict running on the cluster
+        :param field_path:
+            (Optional) dotted path of the compared specs, used in recursion
+        :return:
+            sorted list of dotted paths of the changed fields
+        """
+        changed_fields = []
+        for field in set(desired_spec) | set(current_spec):
+            path = f"{field_path}.{field}" if field_path else field
+            if field not in desired_spec and cls.is_server_default(path):
+                continue
+            desired_value = desired_spec.get(field)
+            current_value = current_spec.get(field)
+            if isinstance(desired_value, list) and \
+                    isinstance(current_value, list) and \
+                    len(desired_value) == len(current_value):
+                for index, (desired_item, current_item) in enumerate(
+                        zip(desired_value, current_value)):
+                    item_path = f"{path}[{index}]"
+                    if isinstance(desired_item, dict) and \
+                            isinstance(current_item, dict):
+                        changed_fields.extend(cls.diff_pipeline_spec(
+                            desired_item, current_item, item_path))
+                    elif desired_item != current_item:
+                        changed_fields.append(item_path)
+            elif isinstance(desired_value, dict) and \
+                    isinstance(current_value, dict):
+                changed_fields.extend(cls.diff_pipeline_spec(
+                    desired_value, current_value, path))
+            elif desired_value != current_value:
+                changed_fields.append(path)
+        return sorted(changed_fields)
+
+    @classmethod
+    def is_server_default(cls, field_path):
+        """
+        checks if pachd fills a field with a default when it is left out
+
+        :param field_path:
+            dotted path of the field, list items as `[index]`
+        :return:
+            True if the path is one of SERVER_DEFAULT_FIELDS
+        """
+        field_path = re.sub(r"\[\d+\]", "", field_path)
+        field_path = re.sub(r"^input\.((cross|union|join)\.)+", "input.",
+                            field_path)
+        return field_path in cls.SERVER_DEFAULT_FIELDS
+
+    def apply_pipeline(self, pipeline_spec, reprocess=False, dry_run=False):
+        """
+        creates a pipeline or updates it only if its spec changed
+
+        :param pipeline_spec:
+            dict in the pachyderm pipeline spec format
+        :param reprocess:
+            (Optional) reprocesses all the datums of an updated pipeline
+        :param dry_run:
+            (Optional) only reports what would be done if True
+        :return:
+            dict of pipeline name, action and the changed fields
+        """
+        desired_spec = self.canonicalize_spec(pipeline_spec)
+        pipeline_name = desired_spec.get("pipeline", {}).get("name")
+        if not pipeline_name:
+            raise InvalidConfigException(
+                "invalid pipeline spec; pipeline.name is missing")
+        current_spec = self.get_pipeline_spec(pipeline_name)
+        if current_spec is None:
+            action = self.APPLY_CREATED
+            changed_fields = sorted(desired_spec)
+        else:
+            changed_fields = self.diff_pipeline_spec(desired_spec,
+                                                     current_spec)
+            action = self.APPLY_UPDATED if changed_fields \
+                else self.APPLY_UNCHANGED
+
+        if action != self.APPLY_UNCHANGED and not dry_run:
+            request = ParseDict(desired_spec, pps_pb2.CreatePipelineRequest())
+            request.update = action == self.APPLY_UPDATED
+            request.reprocess = reprocess and request.update
+            try:
+                self.client.stub.CreatePipeline(
+                    request, metadata=self.client.metadata)
+            except grpc.RpcError as err:
+                raise PachydermOperationException(
+                    f"failed to apply pipeline {pipeline_name}; "
+                    f"{err.details()}")
+        return {
+            "pipeline": pipeline_name,
+            "action": action,
+            "changed_fields": changed_fields
+        }
+
+    def apply_pipelines(self, pipeline_spec_list, max_workers=None,
+                        reprocess=False, dry_run=False):
+        """
+        applies many pipeline specs concurrently, skipping the unchanged ones
+
+        A pipeline reading the output of another pipeline of the list is
+        applied after it, so that its input repo exists when it is created.
+        Pipelines without such a dependency between them are applied in
+        parallel
+
+        :param pipeline_spec_list:
+            list of dicts in the pachyderm pipeline spec format
+        :param max_workers:
+            (Optional) number of pipelines applied concurrently
+        :param reprocess:
+            (Optional) reprocesses all the datums of updated pipelines
+        :param dry_run:
+            (Optional) only reports what would be done if True
+        :return:
+            list of dicts of pipeline name, action and the changed fields
+            in the order of the specs
+        """
+        specs = {pipeline_spec["pipeline"]["name"]: pipeline_spec
+                 for pipeline_spec in pipeline_spec_list}
+        dependencies = {
+            pipeline_name: self.get_input_repos(pipeline_spec.get("input", {}))
+            & (set(specs) - {pipeline_name})
+            for pipeline_name, pipeline_spec in specs.items()
+        }
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers or
+                                self.DEFAULT_APPLY_WORKERS) as executor:
+            while len(results) < len(specs):
+                ready = [pipeline_name for pipeline_name in specs
+                         if pipeline_name not in results and
+                         dependencies[pipeline_name] <= set(results)]
+                if not ready:
+                    raise PachydermOperationException(
+                        f"pipelines depend on each other in a cycle; "
+                        f"{sorted(set(specs) - set(results))}")
+                futures = {
+                    pipeline_name: executor.submit(
+                        self.apply_pipeline, specs[pipeline_name],
+                        reprocess, dry_run)
+                    for pipeline_name in ready
+                }
+                for pipeline_name, future in futures.items():
+                    results[pipeline_name] = future.result()
+        return [results[pipeline_name] for pipeline_name in specs]
+
+    @classmethod
+    def get_input_repos(cls, pipeline_input):
+        """
+        returns the names of all the repos a pipeline input reads from
+
+        :param pipeline_input:
+            input dict of a pipeline spec
+        :return:
+            set of repo names
+        """
+        repos = set()
+        for value in pipeline_input.values():
+            if isinstance(value, list):
+                for nested_input in value:
+                    repos |= cls.get_input_repos(nested_input)
+            elif isinstance(value, dict) and "repo" in value:
+                repos.add(value["repo"])
+        return repos
+
+    def get_reading_pipelines(self, repo_name):
+        """
+        returns the pipelines running on the cluster which read a repo
+
+        :param repo_name:
+            name of the repo
+        :return:
+            sorted list of pipeline names
+        """
+        try:
+            pipeline_infos = self.client.list_pipeline().pipeline_info
+        except grpc.RpcError as err:
+            raise PachydermOperationException(err.details())
+        return sorted(
+            pipeline_info.pipeline.name for pipeline_info in pipeline_infos
+            if repo_name in self.get_input_repos(MessageToDict(
+                pipeline_info.input, preserving_proto_field_name=True)))
+
+    def wait_jobs(self, job_ids, timeout=None, on_progress=None,
+                  progress_interval=None):
+        """
+        waits for many jobs at once and yields each of them as it finishes
+
+        A blocking InspectJob request is started for every job without
+        waiting on the others, so all of them are in flight on the shared
+        channel together and the server answers each one when its job
+        reaches a terminal state
+
+        :param job_ids:
+            list of job ids
+        :param timeout:
+            (Optional) seconds to wait for all the jobs
+        :param on_progress:
+            (Optional) callable called with the job id and the dict of
+            datum counters of every job when it finishes
+        :param progress_interval:
+            (Optional) seconds between progress reports of the running
+            jobs to `on_progress`. Every report sends one more InspectJob
+            request per pending job, hence the server load grows with the
+            number of jobs. Running jobs are not polled if it is None
+        :return:
+            generator of JobInfo objects in the order the jobs finish
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        finished_queue = queue.Queue()
+        futures = {}
+        try:
+            for job_id in dict.fromkeys(job_ids):
+                request = pps_pb2.InspectJobRequest(
+                    job=pps_pb2.Job(id=job_id), block_state=True)
+                future = self.client.stub.InspectJob.future(
+                    request, metadata=self.client.metadata, timeout=timeout)
+                future.add_done_callback(
+                    lambda done, job_id=job_id: finished_queue.put(
+                        (job_id, done)))
+                futures[job_id] = future
+
+            pending = set(futures)
+            last_progress = {}
+            while pending:
+                wait_seconds = None
+                if on_progress and progress_interval:
+                    wait_seconds = progress_interval
+                if deadline is not None:
+                    remaining = max(deadline - time.monotonic(), 0)
+                    wait_seconds = min(wait_seconds or remaining, remaining)
+                try:
+                    job_id, future = finished_queue.get(timeout=wait_seconds)
+                except queue.Empty:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise PachydermOperationException(
+                            f"timed out waiting for jobs {sorted(pending)}")
+                    if on_progress and progress_interval:
+                        # a slow report delays neither the deadline nor
+                        # the next report
+                        report_timeout = progress_interval
+                        if deadline is not None:
+                            report_timeout = min(
+                                report_timeout,
+                                max(deadline - time.monotonic(), 0))
+                        self.report_progress(pending, last_progress,
+                                             on_progress, report_timeout)
+                    continue
+                pending.discard(job_id)
+                try:
+                    job_info = future.result()
+                except grpc.RpcError as err:
+                    if err.code() == grpc.StatusCode.DEADLINE_EXCEEDED:
+                        raise PachydermOperationException(
+                            f"timed out waiting for job {job_id}")
+                    raise PachydermOperationException(err.details())
+                if on_progress:
+                    self.notify_progress(job_id, job_info, last_progress,
+                                         on_progress)
+                yield job_info
+        finally:
+            # requests of the jobs not waited for are not left in flight
+            for future in futures.values():
+                future.cancel()
+
+    def report_progress(self, job_ids, last_progress, on_progress,
+                        timeout=None):
+        """
+        inspects the running jobs without blocking and reports the ones
+        whose datum counters changed
+
+        :param job_ids:
+            ids of the running jobs
+        :param last_progress:
+            dict of job id to its last reported progress
+        :param on_progress:
+            callable called with the job id and its progress
+        :param timeout:
+            (Optional) seconds to wait for all the reports. Jobs not
+            inspected in time are skipped and their requests cancelled
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        futures = {
+            job_id: self.client.stub.InspectJob.future(
+                pps_pb2.InspectJobRequest(job=pps_pb2.Job(id=job_id)),
+                metadata=self.client.metadata, timeout=timeout)
+            for job_id in job_ids
+        }
+        try:
+            for job_id, future in futures.items():
+                remaining = None
+                if deadline is not None:
+                    remaining = max(deadline - time.monotonic(), 0)
+                try:
+                    job_info = future.result(timeout=remaining)
+                except (grpc.RpcError, grpc.FutureTimeoutError,
+                        grpc.FutureCancelledError):
+                    # progress is best effort, the blocking request reports
+                    # the failures of the job
+                    continue
+                self.notify_progress(job_id, job_info, last_progress,
+                                     on_progress)
+        finally:
+            for future in futures.values():
+                future.cancel()
+
+    def notify_progress(self, job_id, job_info, last_progress, on_progress):
+        """
+        calls `on_progress` if the datum counters of a job changed since
+        its last report
+        """
+        progress = self.get_job_progress(job_info)
+        if progress != last_progress.get(job_id):
+            last_progress[job_id] = progress
+            on_progress(job_id, progress)
+
+    @classmethod
+    def get_job_progress(cls, job_info):
+        """
+        returns the state and datum counters of a job
+
+        :param job_info:
+            JobInfo object
+        :return:
+            dict of state and counters of processed, skipped, failed,
+            recovered and total datums
+        """
+        progress = {"state": job_info.state}
+        for field in cls.PROGRESS_FIELDS:
+            progress[field] = getattr(job_info, field)
+        return progress
@@ -1,10 +1,18 @@
+import io
 import os
 import datetime
 import re
-import pickle
+import itertools
+
+import pandas as pd
 
 from xpresso.ai.core.data.exception_handling.custom_exception import *
 from xpresso.ai.core.data.pachyderm_repo_management.pachyderm_client import PachydermClient
+from xpresso.ai.core.data.pachyderm_repo_management.dataset_cache import DatasetCache
+from xpresso.ai.core.data.pachyderm_repo_management.commit_transaction import CommitTransaction
+from xpresso.ai.core.data.pachyderm_repo_management.commit_watcher import CommitWatcher
+from xpresso.ai.core.data.pachyderm_repo_management.dataset_unpickler import DatasetUnpickler
+from xpresso.ai.core.data.structured_dataset import StructuredDataset
 from xpresso.ai.core.utils.xpr_config_parser import XprConfigParser
 import xpresso.ai.core.data.dataset
 
@@ -13,10 +21,35 @@ class PachydermRepoManager:
     """
     Manages repos on pachyderm cluster
     """
-    def __init__(self, config_path=XprConfigParser.DEFAULT_CONFIG_PATH):
+    # files compared row by row in diff_commits
+    PICKLE_FILE_EXTENSION = ".pkl"
+    CSV_FILE_EXTENSION = ".csv"
+
+    def __init__(self, config_path=XprConfigParser.DEFAULT_CONFIG_PATH,
+                 cache_dir=None, cache_size_bytes=None, transfer_codec=None):
+        """
+
+        :param config_path:
+            path of the xpresso config file
+        :param cache_dir:
+            (Optional) directory of the local DatasetCache. Pulled files
+            are not cached if it is not provided
+        :param cache_size_bytes:
+            (Optional) maximum size of the local DatasetCache
+        :param transfer_codec:
+            (Optional) name of the codec e.g. zstd or lz4 used to compress
+            pushed files on the wire. Pulls decode them transparently
+        """
         # self.logger = XprLogger()
         # self.config = XprConfigParser(config_path)["pachyderm"]
         self.pachyderm_client = self.connect_to_pachyderm()
+        if transfer_codec:
+            self.pachyderm_client.set_codec(transfer_codec)
+        self.dataset_cache = None
+        if cache_dir:
+            self.dataset_cache = DatasetCache(cache_dir, cache_size_bytes)
+        # TransferStats of the latest pull
+        self.last_transfer_stats = None
 
     def connect_to_pachyderm(self):
         """
@@ -118,37 +151,76 @@ class PachydermRepoManager:
         """
         self.pachyderm_client.delete_branch(repo_name, branch_name)
 
-    def list_commit(self, repo_name, branch_name):
+    def list_commit(self, repo_name, branch_name, count=None, page=None):
         """
-        lists commits in a repo
+        lists commits in a branch, latest first
 
         :param repo_name:
             name of the repo
         :param branch_name:
             name of the branch
+        :param count:
+            (Optional) number of commits to be listed i.e. page size
+        :param page:
+            (Optional) page number starting from 0, used with `count`
         :return:
             list of commits
         """
+        return list(self.iter_commits(repo_name, branch_name, count, page))
+
+    def iter_commits(self, repo_name, branch_name, count=None, page=None):
+        """
+        lazily yields commits in a branch, latest first
+
+        Only the ancestors of the branch head are requested from the
+        cluster and at most the commits needed for the requested page,
+        hence the cost does not grow with the history of other branches
+
+        :param repo_name:
+            name of the repo
+        :param branch_name:
+            name of the branch
+        :param count:
+            (Optional) number of commits to be listed i.e. page size
+        :param page:
+            (Optional) page number starting from 0, used with `count`
+        :return:
+            generator of commit info dicts
+        """
         if not self.name_validity_check(repo_name):
             raise PachydermFieldsNameException("repo name is invalid")
         if not self.name_validity_check(branch_name):
             raise PachydermFieldsNameException("branch name is invalid")
 
-        commit_info = self.pachyderm_client.list_commit(repo_name)
-        commit_list = []
-        for commit_item in commit_info:
-            commit_data = self.filter_commit_info(commit_item)
-            if commit_data['branch'] == branch_name:
-                commit_list.append(commit_data)
-
-        return commit_list
+        skip_count = 0
+        if count and page:
+            skip_count = count * page
+
+        # names are validated when called, commits are requested only once
+        # the generator is iterated
+        def generate_commits():
+            commit_info = self.pachyderm_client.list_commit(
+                repo_name, upper_commit=branch_name,
+                count=skip_count + count if count else None)
+            try:
+                for commit_item in itertools.islice(commit_info, skip_count,
+                                                    None):
+                    yield self.filter_commit_info(commit_item)
+            finally:
+                # stops the stream if the caller is done before it ends
+                commit_info.cancel()
+
+        return generate_commits()
 
     def push_files(self, files_info):
         """
         pushes file/files into a pachyderm cluster
 
         :param files_info:
-            info of files, repo & branch
+            info of files, repo & branch. An optional `incremental` flag
+            uploads only the files changed since the head of the branch and
+            an optional `dedup` flag copies files already present in the
+            repo on the cluster instead of uploading them
         """
         mandatory_fields = ["repo_name", "branch_name", "dataset_name",
                             "path", "description"]
@@ -159,25 +231,105 @@ class PachydermRepoManager:
                 # path can have '/'. Hence excluded from this check
                 raise PachydermFieldsNameException(f"Invalid {field} value")
 
-        if not os.path.exists(files_info["path"]):
-            raise DatasetPathException(f"path {files_info['path']} is invalid")
-        elif os.path.isfile(files_info["path"]):
-            dataset_dir = os.path.dirname(os.path.abspath(files_info["path"]))
-        else:
-            dataset_dir = files_info["path"]
-
-        # fetches the path of all the files inside the dataset directory
-        file_list = self.fetch_file_list(dataset_dir,
-                                         files_info["dataset_name"])
+        file_list = self.fetch_local_file_list(files_info["path"],
+                                               files_info["dataset_name"])
         new_commit_id = self.pachyderm_client.push_dataset(
             files_info["repo_name"],
             files_info["branch_name"],
             file_list,
-            files_info["description"]
+            files_info["description"],
+            incremental=files_info.get("incremental", False),
+            dataset_path=self.get_pachyderm_dataset_path(
+                files_info["dataset_name"]),
+            dedup=files_info.get("dedup", False)
         )
 
         return new_commit_id
 
+    def fetch_local_file_list(self, path, dataset_name):
+        """
+        validates a local dataset path and lists the files to be pushed
+
+        :param path:
+            path of a file or directory of the dataset
+        :param dataset_name:
+            name of the dataset
+        :return:
+            list of (local_path, pachyderm_path) tuples
+        """
+        if not os.path.exists(path):
+            raise DatasetPathException(f"path {path} is invalid")
+        elif os.path.isfile(path):
+            dataset_dir = os.path.dirname(os.path.abspath(path))
+        else:
+            dataset_dir = path
+
+        # fetches the path of all the files inside the dataset directory
+        return self.fetch_file_list(dataset_dir, dataset_name)
+
+    def fetch_dataset_file_list(self, dataset):
+        """
+        saves a dataset locally and lists the files to be pushed
+
+        :param dataset:
+            AbstractDataset object with info on dataset
+        :return:
+            tuple of dataset name and list of (local_path, pachyderm_path)
+        """
+        abstract_dataset = xpresso.ai.core.data.dataset.AbstractDataset
+        if not isinstance(dataset, abstract_dataset):
+            raise DatasetInfoException("Provided dataset is invalid")
+        # First Save the dataset locally
+        pickle_file = dataset.save()
+        dataset_name = dataset.name
+        # pickle_file = dataset.get_latest_pickle_file()
+        # TODO: Add File, Folder Handling Exceptions
+        if not os.path.exists(pickle_file):
+            raise Exception
+        # checks if pickle_file is a valid file
+        if os.path.isfile(pickle_file):
+            # if pickle_file path is provided, its directory is fetched
+            dataset_dir = os.path.dirname(os.path.abspath(pickle_file))
+        else:
+            # else it assumes the directory of pickle_file is returned
+            dataset_dir = pickle_file
+
+        # fetches the path of all the files inside the dataset directory
+        return dataset_name, self.fetch_file_list(dataset_dir, dataset_name)
+
+    def transaction(self, repo_name, branch_name, description=None,
+                    max_workers=None):
+        """
+        groups several pushes into a single commit
+
+        Every dataset, directory or buffer pushed inside the `with` block
+        lands in one commit, which is finished when the block exits and
+        deleted if it raises. Readers never see a partially pushed set
+
+            with manager.transaction(repo, branch, "refresh") as commit:
+                commit.push_dataset(train_dataset)
+                commit.push_files(features_dir, "features")
+                commit.put_buffer("dataset/labels/labels.csv", labels)
+
+        :param repo_name:
+            name of the repo
+        :param branch_name:
+            name of the branch
+        :param description:
+            (Optional) description of the commit
+        :param max_workers:
+            (Optional) number of files uploaded concurrently
+        :return:
+            CommitTransaction object to be used as a context manager
+        """
+        if not repo_name:
+            raise RepoNotProvidedException()
+        if not self.name_validity_check(repo_name) or \
+                not self.name_validity_check(branch_name):
+            raise PachydermFieldsNameException()
+        return CommitTransaction(self, repo_name, branch_name, description,
+                                 max_workers)
+
     def manage_xprctl_dataset(self, method, data_info):
         """
 
@@ -185,6 +337,11 @@ class PachydermRepoManager:
             method to be called
         :param data_info:
             info of the dataset
+            keys - repo_name, branch_name, commit_id, path, pattern, glob
+                pattern(Optional): glob pattern of the files
+                glob(Optional): if True, path is a glob pattern. Paths are
+                                matched literally otherwise, as file names
+                                may contain wildcards e.g. `data[1].csv`
         :return:
             returns appropriate output of list or path
         """
@@ -207,18 +364,26 @@ class PachydermRepoManager:
         if "commit_id" in data_info:
             commit_id = data_info["commit_id"]
 
+        pattern = data_info.get("pattern")
+        if not pattern and data_info.get("glob"):
+            pattern = path
+            path = "/"
+
         if method == "pull":
             return self.pull_dataset(data_info["repo_name"],
                                      branch_name,
                                      path,
-                                     commit_id)
+                                     commit_id,
+                                     pattern=pattern)
         else:
             return self.list_dataset(data_info["repo_name"],
                                      branch_name,
                                      path,
-                                     commit_id)
+                                     commit_id,
+                                     pattern=pattern)
 
-    def push_dataset(self, repo_name, branch_name, dataset, description):
+    def push_dataset(self, repo_name, branch_name, dataset, description,
+                     incremental=False, dedup=False, dedup_sources=None):
         """
         pushes a dataset into pachyderm cluster
 
@@ -230,40 +395,38 @@ class PachydermRepoManager:
             AbstractDataset object with info on dataset
         :param description:
             brief description regarding this push
+        :param incremental:
+            (Optional) uploads only the files changed since the head of
+            the branch
+        :param dedup:
+            (Optional) copies files whose content is already present in the
+            branch or in `dedup_sources` on the cluster instead of uploading
+        :param dedup_sources:
+            (Optional) list of other branch names or commit ids of the repo
+            searched for identical files
         :return:
             returns commit_id if push is successful
         """
-        abstract_dataset = dataset.AbstractDataset
-        if not isinstance(dataset, abstract_dataset):
-            raise DatasetInfoException("Provided dataset is invalid")
-        # First Save the dataset locally
-        pickle_file = dataset.save()
-        dataset_name = dataset.name
-        # pickle_file = dataset.get_latest_pickle_file()
-        # TODO: Add File, Folder Handling Exceptions
-        if not os.path.exists(pickle_file):
-            raise Exception
-        # checks if pickle_file is a valid file
-        if os.path.isfile(pickle_file):
-            # if pickle_file path is provided, its directory is fetched
-            dataset_dir = os.path.dirname(os.path.abspath(pickle_file))
-        else:
-            # else it assumes the directory of pickle_file is returned
-            dataset_dir = pickle_file
-
-        # fetches the path of all the files inside the dataset directory
-        file_list = self.fetch_file_list(dataset_dir, dataset_name)
-        new_commit_id = self.pachyderm_client.push_dataset(repo_name,
-                                                           branch_name,
-                                                           file_list,
-                                                           description)
+        dataset_name, file_list = self.fetch_dataset_file_list(dataset)
+        new_commit_id = self.pachyderm_client.push_dataset(
+            repo_name, branch_name, file_list, description,
+            incremental=incremental,
+            dataset_path=self.get_pachyderm_dataset_path(dataset_name),
+            dedup=dedup, dedup_sources=dedup_sources)
 
         return new_commit_id
 
-    def pull_dataset(self, repo_name, branch_name, path="/", commit_id=None):
+    def pull_dataset(self, repo_name, branch_name, path="/", commit_id=None,
+                     max_workers=None, range_workers=None, target_dir=None,
+                     pattern=None):
         """
         pulls a dataset from pachyderm cluster and load it locally
 
+        Files are streamed to disk concurrently and the throughput of the
+        pull is saved in `last_transfer_stats`. Files left partially
+        downloaded by an earlier pull of the same commit are resumed and
+        files present in the local cache are linked instead of downloaded
+
         :param repo_name:
             name of the repo
         :param branch_name:
@@ -273,31 +436,51 @@ class PachydermRepoManager:
                        path of the dataset
         :param commit_id:
             (Optional) id of the commit
+        :param max_workers:
+            (Optional) number of files downloaded concurrently
+        :param range_workers:
+            (Optional) number of byte ranges of a large file downloaded
+            concurrently
+        :param target_dir:
+            (Optional) directory inside which dataset is saved. Defaults
+            to the current directory
+        :param pattern:
+            (Optional) glob pattern e.g. `dataset/sales/2024-*/*.parquet`.
+            Only the matching files and the contents of matching folders
+            are pulled, `path` is ignored
         :return:
             returns the path of the directory where dataset is saved
         """
-        dataset_list = self.list_dataset(repo_name, branch_name, path, commit_id)
-        current_dir = os.getcwd()
+        dataset_list = self.list_dataset(repo_name, branch_name, path,
+                                         commit_id, pattern=pattern, lazy=True)
+        current_dir = target_dir or os.getcwd()
         new_dir_path = os.path.join(current_dir, dataset_list["commit"]["id"])
-        if len(dataset_list["dataset"]):
-            if not os.path.exists(new_dir_path):
-                os.makedirs(new_dir_path)
 
-        for file_info in dataset_list["dataset"]:
+        commit_id = dataset_list["commit"]["id"]
+        manifest = self.pachyderm_client.get_manifest(repo_name, commit_id)
+        file_info_list = dataset_list["dataset"]
+        if pattern:
+            file_info_list = self.expand_folders(repo_name, commit_id,
+                                                 file_info_list)
+        file_path_list = []
+        for file_info in file_info_list:
             if file_info["type"] == "File":
-                file_in_bytes = self.pachyderm_client.pull_dataset(
-                    repo_name,
-                    dataset_list["commit"]["id"],
-                    file_info["path"]
-                )
                 # This needs to be done because path in file_info contains pachyderm path
                 # It always starts with / . Hence it needs to be excluded exclusively
-                file_info["path"] = file_info["path"].lstrip("/")
-                local_write_path = os.path.join(new_dir_path, file_info["path"])
-                self.write_to_file(path=local_write_path, content=file_in_bytes)
+                local_write_path = os.path.join(new_dir_path,
+                                                file_info["path"].lstrip("/"))
+                file_path_list.append((file_info["path"], local_write_path,
+                                       file_info["size_in_bytes"]))
+        if file_path_list and not os.path.exists(new_dir_path):
+            os.makedirs(new_dir_path)
+
+        self.last_transfer_stats = self.pachyderm_client.download_files(
+            repo_name, commit_id, file_path_list, manifest, max_workers,
+            range_workers=range_workers, cache=self.dataset_cache)
         return new_dir_path
 
-    def list_dataset(self, repo_name, branch_name, path, commit_id=None):
+    def list_dataset(self, repo_name, branch_name, path, commit_id=None,
+                     pattern=None, lazy=False):
         """
         list of dataset as per provided information
 
@@ -310,6 +493,12 @@ class PachydermRepoManager:
                        path of the dataset
         :param commit_id:
             (Optional) id of commit to fetch dataset from
+        :param pattern:
+            (Optional) glob pattern matched on the cluster instead of
+            listing `path`
+        :param lazy:
+            (Optional) `dataset` of the output is a generator which streams
+            the listing from the cluster instead of a list
         :return:
             returns a dict with file and commit info
         """
@@ -317,16 +506,226 @@ class PachydermRepoManager:
         data_info = self.verify_dataset_info(repo_name, branch_name,
                                              path, commit_id)
         list_output = {}
-        dataset_list = self.pachyderm_client.list_dataset(
-            data_info["repo_name"], data_info["commit_id"], data_info["path"]
-        )
-        list_output["dataset"] = dataset_list
+        if pattern:
+            dataset_list = self.pachyderm_client.glob_dataset(
+                data_info["repo_name"], data_info["commit_id"], pattern
+            )
+        else:
+            dataset_list = self.pachyderm_client.iter_dataset(
+                data_info["repo_name"], data_info["commit_id"],
+                data_info["path"]
+            )
+        list_output["dataset"] = dataset_list if lazy else list(dataset_list)
 
         commit = self.pachyderm_client.inspect_commit(
             data_info["repo_name"], data_info["commit_id"])
         list_output["commit"] = self.filter_commit_info(commit)
         return list_output
 
+    def expand_folders(self, repo_name, commit_id, file_info_list):
+        """
+        replaces folders in a listing with all the files inside them
+
+        :param repo_name:
+            name of the repo
+        :param commit_id:
+            id of the commit
+        :param file_info_list:
+            list of file info dicts
+        :return:
+            list of file info dicts without duplicate paths
+        """
+        expanded_list = {}
+        for file_info in file_info_list:
+            if file_info["type"] == "File":
+                expanded_list[file_info["path"]] = file_info
+                continue
+            for child_info in self.pachyderm_client.iter_dataset(
+                    repo_name, commit_id, file_info["path"]):
+                expanded_list[child_info["path"]] = child_info
+        return list(expanded_list.values())
+
+    def diff_commits(self, repo_name, from_commit, to_commit, path="/",
+                     row_diff=False):
+        """
+        compares the dataset of two commits using the file hashes and sizes
+        saved on pachyderm cluster, without downloading the files
+
+        :param repo_name:
+            name of the repo
+        :param from_commit:
+            id of the older commit or name of a branch
+        :param to_commit:
+            id of the newer commit or name of a branch
+        :param path:
+            (Optional) path of the dataset to be compared
+        :param row_diff:
+            (Optional) if True, both versions of every modified pickled
+            dataset or csv file are fetched and compared row by row
+        :return:
+            dict with lists of added, removed and modified paths and
+            row_diff of modified datasets if requested
+        """
+        if not repo_name:
+            raise RepoNotProvidedException("Repo name is required")
+        if not from_commit or not to_commit:
+            raise DatasetInfoException("Both the commits are required")
+        # resolves branch names to commit ids
+        from_commit_id = self.pachyderm_client.inspect_commit(
+            repo_name, from_commit).commit.id
+        to_commit_id = self.pachyderm_client.inspect_commit(
+            repo_name, to_commit).commit.id
+
+        old_files = self.pachyderm_client.get_file_hashes(
+            repo_name, from_commit_id, path or "/")
+        new_files = self.pachyderm_client.get_file_hashes(
+            repo_name, to_commit_id, path or "/")
+        diff_output = {
+            "from_commit": from_commit_id,
+            "to_commit": to_commit_id,
+            "added": sorted(set(new_files) - set(old_files)),
+            "removed": sorted(set(old_files) - set(new_files)),
+            "modified": sorted(file_path for file_path in
+                               set(new_files) & set(old_files)
+                               if new_files[file_path] != old_files[file_path])
+        }
+        if row_diff:
+            diff_output["row_diff"] = {
+                file_path: self.diff_dataset_rows(
+                    repo_name, from_commit_id, to_commit_id, file_path)
+                for file_path in diff_output["modified"]
+                if os.path.splitext(file_path)[1] in
+                (self.PICKLE_FILE_EXTENSION, self.CSV_FILE_EXTENSION)
+            }
+        return diff_output
+
+    def diff_dataset_rows(self, repo_name, from_commit_id, to_commit_id,
+                          path):
+        """
+        fetches both versions of a pickled dataset or a csv file and
+        compares its metadata and rows
+
+        Pickled datasets are loaded with DatasetUnpickler, which refuses
+        anything but the dataset classes and the data they hold
+
+        :param repo_name:
+            name of the repo
+        :param from_commit_id:
+            id of the older commit
+        :param to_commit_id:
+            id of the newer commit
+        :param path:
+            path of the dataset on pachyderm cluster
+        :return:
+            dict with metadata and data differences, None if the dataset
+            does not support row level comparison
+        """
+        old_content = self.pachyderm_client.pull_dataset(
+            repo_name, from_commit_id, path)
+        new_content = self.pachyderm_client.pull_dataset(
+            repo_name, to_commit_id, path)
+        if os.path.splitext(path)[1] == self.CSV_FILE_EXTENSION:
+            return self.diff_csv_rows(old_content, new_content)
+        old_dataset = DatasetUnpickler.loads(old_content)
+        new_dataset = DatasetUnpickler.loads(new_content)
+        if not hasattr(new_dataset, "compare_data"):
+            return None
+        return {
+            "metadata": new_dataset.compare_metadata(
+                new_dataset.info.attributeInfo,
+                old_dataset.info.attributeInfo),
+            "data": new_dataset.compare_data(new_dataset.data,
+                                             old_dataset.data)
+        }
+
+    @staticmethod
+    def diff_csv_rows(old_content, new_content):
+        """
+        compares the columns and rows of two versions of a csv file
+
+        :param old_content:
+            content of the older version
+        :param new_content:
+            content of the newer version
+        :return:
+            dict with the changed columns as (name, change) tuples in the
+            format of StructuredDataset.compare_metadata and the row
+            differences
+        """
+        old_data = pd.read_csv(io.BytesIO(old_content))
+        new_data = pd.read_csv(io.BytesIO(new_content))
+        metadata_diff = [(column, "removed") for column in old_data.columns
+                         if column not in new_data.columns]
+        for column in new_data.columns:
+            if column not in old_data.columns:
+                metadata_diff.append((column, "added"))
+            elif new_data[column].dtype != old_data[column].dtype:
+                metadata_diff.append((column, "updated"))
+        return {
+            "metadata": metadata_diff,
+            "data": StructuredDataset.compare_data(new_data, old_data)
+        }
+
+    def promote_dataset(self, repo_name, source_branch, target_branch, path,
+                        description=None):
+        """
+        promotes a dataset from one branch to another without pulling it
+
+        :param repo_name:
+            name of the repo
+        :param source_branch:
+            name of the branch dataset is promoted from
+        :param target_branch:
+            name of the branch dataset is promoted to
+        :param path:
+            path of the dataset on pachyderm cluster
+        :param description:
+            (Optional) description of the promotion commit
+        :return:
+            id of the new commit on target branch
+        """
+        if not repo_name:
+            raise RepoNotProvidedException("Repo name is required")
+        if not source_branch or not target_branch:
+            raise BranchInfoException("Source & target branch are required")
+        if source_branch == target_branch:
+            raise BranchInfoException("Source & target branch are same")
+        if not path:
+            raise DatasetPathException("Path of the dataset is required")
+        if not description:
+            description = f"promoted {path} from {source_branch}"
+        return self.pachyderm_client.copy_dataset(
+            repo_name, source_branch, target_branch, path, description)
+
+    def watch_branch(self, repo_name, branch_name, local_dir, path="/",
+                     from_commit_id=None, on_sync=None):
+        """
+        starts keeping a local directory in sync with a branch
+
+        :param repo_name:
+            name of the repo
+        :param branch_name:
+            name of the branch
+        :param local_dir:
+            directory where the mirror is kept
+        :param path:
+            (Optional) path on pachyderm cluster to be mirrored
+        :param from_commit_id:
+            (Optional) commit the directory is already in sync with
+        :param on_sync:
+            (Optional) callable called with commit id and changed paths
+            after every sync
+        :return:
+            started CommitWatcher, stopped with its `stop` method
+        """
+        if not self.name_validity_check(repo_name) or \
+                not self.name_validity_check(branch_name):
+            raise PachydermFieldsNameException()
+        watcher = CommitWatcher(self.pachyderm_client, repo_name, branch_name,
+                                local_dir, path, from_commit_id,
+                                cache=self.dataset_cache, on_sync=on_sync)
+        return watcher.start()
+
     def delete_dataset(self, repo_name, commit_id, path="/"):
         """
         deletes a dataset from the pachyderm cluster
@@ -407,7 +806,8 @@ class PachydermRepoManager:
             returns a list of file paths inside the dataset directory
         """
         file_list = []
-        pachyderm_destination_path = f"dataset/{dataset_name}"
+        pachyderm_destination_path = \
+            PachydermRepoManager.get_pachyderm_dataset_path(dataset_name)
         for dir_path, dirs, files in os.walk(dataset_dir):
             for file in files:
                 file_path = os.path.join(dir_path, file)
@@ -416,6 +816,18 @@ class PachydermRepoManager:
 
         return file_list
 
+    @staticmethod
+    def get_pachyderm_dataset_path(dataset_name):
+        """
+        returns the directory on pachyderm cluster in which a dataset is saved
+
+        :param dataset_name:
+            name of the dataset
+        :return:
+            path of the dataset directory
+        """
+        return f"dataset/{dataset_name}"
+
     @staticmethod
     def filter_commit_info(commit_info_object):
         """
@@ -486,34 +898,6 @@ class PachydermRepoManager:
             branch_list.append(branch.name)
         return branch_list
 
-    @staticmethod
-    def write_to_file(path, content):
-        """
-        writes the contents of dataset to a local file
-
-        :param path:
-            local path of the file
-        :param content:
-            file content
-        """
-        if os.path.isfile(os.path.dirname(path)):
-            # TODO: Remove files that are added already to local system
-            raise LocalFilePathException(f"file exists at this path; {path}")
-
-        file_extension = os.path.splitext(path)[1]
-        if not os.path.exists(path) and \
-                not os.path.isdir(os.path.dirname(path)):
-            os.makedirs(os.path.dirname(path))
-
-        with open(path, "wb") as out_file:
-            if file_extension == ".pkl":
-                # if it is pickle file we use pickle to dump it onto file
-                dataset_object = pickle.loads(content)
-                pickle.dump(dataset_object, out_file, pickle.HIGHEST_PROTOCOL)
-            else:
-                out_file.write(content)
-        return
-
     @staticmethod
     def name_validity_check(name):
         """
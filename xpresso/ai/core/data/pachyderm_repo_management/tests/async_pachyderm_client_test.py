@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import os
+
+import grpc
+import pytest
+from google.protobuf import wrappers_pb2
+
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    PachydermOperationException
+from xpresso.ai.core.data.pachyderm_repo_management import \
+    async_pachyderm_client
+from xpresso.ai.core.data.pachyderm_repo_management.async_pachyderm_client import \
+    AsyncPachydermClient
+from xpresso.ai.core.data.pachyderm_repo_management.dataset_manifest import \
+    DatasetManifest
+
+
+def create_rpc_error(status_code):
+    return grpc.aio.AioRpcError(status_code, grpc.aio.Metadata(),
+                                grpc.aio.Metadata(), f"{status_code.name}")
+
+
+class FakeAsyncStub:
+    """
+    PFS stub of grpc.aio serving `files`. A request for a path in
+    `failures` fails with the next status code listed for it, after the
+    first chunk when the file is read. Requests for `blocked_paths` never
+    end
+    """
+    CHUNK_SIZE = 1000
+
+    def __init__(self, files):
+        self.files = files
+        self.failures = {}
+        self.blocked_paths = set()
+        self.get_requests = []
+        self.put_files = {}
+        self.cancelled_paths = []
+
+    async def block(self, path):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled_paths.append(path)
+            raise
+
+    def fail(self, path):
+        if self.failures.get(path):
+            raise create_rpc_error(self.failures[path].pop(0))
+
+    def GetFile(self, request, metadata=None):
+        self.get_requests.append((request.file.path, request.offset_bytes,
+                                  request.size_bytes))
+        return self.iter_file(request)
+
+    async def iter_file(self, request):
+        path = request.file.path
+        if path in self.blocked_paths:
+            await self.block(path)
+        content = self.files[path][request.offset_bytes:]
+        if request.size_bytes:
+            content = content[:request.size_bytes]
+        for offset in range(0, len(content), self.CHUNK_SIZE):
+            if offset:
+                self.fail(path)
+            yield wrappers_pb2.BytesValue(
+                value=content[offset:offset + self.CHUNK_SIZE])
+
+    async def PutFile(self, request_iterator, metadata=None):
+        requests = [request async for request in request_iterator]
+        path = requests[0].file.path
+        if path in self.blocked_paths:
+            await self.block(path)
+        self.fail(path)
+        self.put_files[path] = b"".join(request.value for request in requests)
+
+
+def create_client(monkeypatch, files):
+    stub = FakeAsyncStub(files)
+    monkeypatch.setattr(AsyncPachydermClient, "connect",
+                        staticmethod(lambda *args: None))
+    monkeypatch.setattr(async_pachyderm_client.pfs_pb2_grpc, "APIStub",
+                        lambda channel: stub)
+    monkeypatch.setattr(AsyncPachydermClient, "RETRY_BACKOFF_SECONDS", 0)
+    return AsyncPachydermClient("localhost", 30650), stub
+
+
+def sha256(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def test_pull_resumes_partial_file_and_retries(tmp_path, monkeypatch):
+    content = os.urandom(5000)
+    client, stub = create_client(monkeypatch, {"/sales/2024.csv": content})
+    stub.failures["/sales/2024.csv"] = [grpc.StatusCode.UNAVAILABLE]
+    local_path = str(tmp_path / "2024.csv")
+    with open(local_path + client.PARTIAL_FILE_SUFFIX, "wb") as partial_file:
+        partial_file.write(content[:2000])
+
+    asyncio.run(client.pull_file("sales", "c1", "/sales/2024.csv",
+                                 local_path, sha256(content), retries=1,
+                                 size_bytes=len(content)))
+    # the retry continues after the chunk received before the failure
+    assert stub.get_requests == [("/sales/2024.csv", 2000, 3000),
+                                 ("/sales/2024.csv", 3000, 2000)]
+    with open(local_path, "rb") as local_file:
+        assert local_file.read() == content
+    assert os.listdir(tmp_path) == ["2024.csv"]
+
+
+def test_pull_does_not_retry_permanent_errors(tmp_path, monkeypatch):
+    client, stub = create_client(monkeypatch,
+                                 {"/sales/2024.csv": os.urandom(5000)})
+    stub.failures["/sales/2024.csv"] = [grpc.StatusCode.PERMISSION_DENIED]
+    with pytest.raises(PachydermOperationException, match="2024.csv"):
+        asyncio.run(client.pull_file("sales", "c1", "/sales/2024.csv",
+                                     str(tmp_path / "2024.csv"), retries=2))
+    assert len(stub.get_requests) == 1
+
+
+def test_failed_download_cancels_the_other_pulls(tmp_path, monkeypatch):
+    client, stub = create_client(monkeypatch, {
+        "/sales/2023.csv": os.urandom(3000),
+        "/sales/2024.csv": os.urandom(3000),
+        "/sales/2025.csv": os.urandom(3000)})
+    stub.blocked_paths = {"/sales/2023.csv", "/sales/2025.csv"}
+    stub.failures["/sales/2024.csv"] = [grpc.StatusCode.NOT_FOUND]
+    file_path_list = [(f"/sales/{year}.csv", str(tmp_path / f"{year}.csv"),
+                       3000) for year in (2023, 2024, 2025)]
+
+    with pytest.raises(PachydermOperationException, match="2024.csv"):
+        asyncio.run(client.download_files("sales", "c1", file_path_list))
+    assert sorted(stub.cancelled_paths) == ["/sales/2023.csv",
+                                            "/sales/2025.csv"]
+
+
+def test_upload_is_retried_from_the_start(tmp_path, monkeypatch):
+    client, stub = create_client(monkeypatch, {})
+    content = os.urandom(5000)
+    local_path = str(tmp_path / "2024.csv")
+    with open(local_path, "wb") as local_file:
+        local_file.write(content)
+    stub.failures["/sales/2024.csv"] = [grpc.StatusCode.UNAVAILABLE]
+
+    uploaded = asyncio.run(client.upload_file("sales", "c1", local_path,
+                                              "/sales/2024.csv", retries=1))
+    assert uploaded[1:3] == (sha256(content), len(content))
+    assert stub.put_files["/sales/2024.csv"] == content
+
+
+def test_failed_push_cancels_the_other_uploads(tmp_path, monkeypatch):
+    client, stub = create_client(monkeypatch, {})
+    deleted_commits = []
+
+    async def get_manifest(repo_name, commit_id):
+        return DatasetManifest()
+
+    async def start_commit(*args):
+        return "c1"
+
+    async def delete_commit(repo_name, commit_id):
+        deleted_commits.append(commit_id)
+
+    monkeypatch.setattr(client, "get_manifest", get_manifest)
+    monkeypatch.setattr(client, "start_commit", start_commit)
+    monkeypatch.setattr(client, "delete_commit", delete_commit)
+    file_path_list = []
+    for year in (2023, 2024, 2025):
+        local_path = str(tmp_path / f"{year}.csv")
+        with open(local_path, "wb") as local_file:
+            local_file.write(b"a" * 10)
+        file_path_list.append((local_path, f"/sales/{year}.csv"))
+    stub.blocked_paths = {"/sales/2023.csv", "/sales/2025.csv"}
+    stub.failures["/sales/2024.csv"] = [grpc.StatusCode.INVALID_ARGUMENT]
+
+    with pytest.raises(PachydermOperationException, match="2024.csv"):
+        asyncio.run(client.push_dataset("sales", "master", file_path_list))
+    assert sorted(stub.cancelled_paths) == ["/sales/2023.csv",
+                                            "/sales/2025.csv"]
+    assert deleted_commits == ["c1"]
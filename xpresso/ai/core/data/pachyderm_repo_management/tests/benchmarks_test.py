@@ -0,0 +1,22 @@
+import sys
+
+from xpresso.ai.core.data.pachyderm_repo_management.benchmarks import \
+    codec_benchmark, push_benchmark
+
+
+def test_push_benchmark_runs(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", [
+        "push_benchmark", "--files", "4", "--file-size", "1024",
+        "--latency", "0", "--workers", "1", "2"])
+    push_benchmark.main()
+    output = capsys.readouterr().out
+    assert "workers=1" in output and "workers=2" in output
+
+
+def test_codec_benchmark_runs(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", [
+        "codec_benchmark", "--files", "2", "--rows", "100",
+        "--latency", "0", "--bandwidth", str(2 ** 30)])
+    codec_benchmark.main()
+    output = capsys.readouterr().out
+    assert "none" in output and "zlib" in output
@@ -0,0 +1,96 @@
+import os
+
+import pytest
+import python_pachyderm as pachyderm
+
+from xpresso.ai.core.data.pachyderm_repo_management.channel_pool import \
+    ChannelRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # a fresh registry, the process wide one is left untouched
+    monkeypatch.setattr(ChannelRegistry, "_instance", None)
+    registry = ChannelRegistry()
+    yield registry
+    registry.close()
+
+
+def test_channel_is_shared_per_cluster_and_identity(registry):
+    channel = registry.get_channel("localhost", 30650)
+    assert registry.get_channel("localhost", 30650) is channel
+    assert registry.get_channel("localhost", 30651) is not channel
+    assert registry.get_channel("localhost", 30650,
+                                auth_token="token-a") is not channel
+    assert registry.get_channel("localhost", 30650, auth_token="token-a") is \
+        registry.get_channel("localhost", 30650, auth_token="token-a")
+    assert registry.get_channel("localhost", 30650, auth_token="token-a") is \
+        not registry.get_channel("localhost", 30650, auth_token="token-b")
+
+
+def test_clients_of_different_users_do_not_share_channels(registry):
+    client_a = registry.pfs_client("localhost", 30650, auth_token="token-a")
+    client_b = registry.pps_client("localhost", 30650, auth_token="token-b")
+    assert client_a.channel is not client_b.channel
+    assert client_a.metadata == [("authn-token", "token-a")]
+    assert client_b.metadata == [("authn-token", "token-b")]
+    assert registry.pps_client("localhost", 30650,
+                               auth_token="token-a").channel is \
+        client_a.channel
+
+
+@pytest.mark.parametrize("client_class, build", [
+    (pachyderm.PfsClient, ChannelRegistry.pfs_client),
+    (pachyderm.PpsClient, ChannelRegistry.pps_client)])
+def test_clients_match_the_ones_built_by_init(registry, client_class, build):
+    # clients skip __init__, hence they have to set every attribute it sets
+    init_client = client_class("localhost", 30650, auth_token="token-a")
+    client = build(registry, "localhost", 30650, auth_token="token-a")
+    try:
+        assert type(client) is client_class
+        assert sorted(vars(client)) == sorted(vars(init_client)) == \
+            sorted(ChannelRegistry.CLIENT_ATTRIBUTES)
+        assert client.metadata == init_client.metadata
+        assert type(client.stub) is type(init_client.stub)
+    finally:
+        init_client.channel.close()
+
+
+def test_forked_child_drops_the_parent_channels(registry):
+    channel = registry.get_channel("localhost", 30650)
+    parent_lock = registry.lock
+    registry.reset_after_fork()
+    assert registry.channels == {}
+    assert registry.lock is not parent_lock
+    assert registry.get_channel("localhost", 30650) is not channel
+    channel.close()
+
+
+def test_pid_change_resets_without_fork_hook(registry, monkeypatch):
+    channel = registry.get_channel("localhost", 30650)
+    child_pid = os.getpid() + 1
+    monkeypatch.setattr(os, "getpid", lambda: child_pid)
+    child_channel = registry.get_channel("localhost", 30650)
+    assert child_channel is not channel
+    assert registry.pid == child_pid
+    assert registry.get_channel("localhost", 30650) is child_channel
+    channel.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="os.fork is required")
+def test_fork_hook_resets_the_child(registry):
+    registry.get_channel("localhost", 30650)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # the child reports what the fork hook left and exits at once
+        os.close(read_fd)
+        child_state = (len(registry.channels), registry.pid == os.getpid())
+        os.write(write_fd, repr(child_state).encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as reader:
+        child_state = reader.read()
+    os.waitpid(pid, 0)
+    assert child_state == "(0, True)"
+    assert len(registry.channels) == 1
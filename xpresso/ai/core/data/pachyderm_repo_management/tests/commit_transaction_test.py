@@ -0,0 +1,86 @@
+import pytest
+
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    DatasetPathException, PachydermOperationException
+from xpresso.ai.core.data.pachyderm_repo_management.commit_transaction import \
+    CommitTransaction
+from xpresso.ai.core.data.pachyderm_repo_management.tests.fake_pfs_client import \
+    FakePachydermClient, FakePfsClient
+
+
+class FakeRepoManager:
+    def __init__(self):
+        self.fake_pfs_client = FakePfsClient(latency=0)
+        self.pachyderm_client = FakePachydermClient(self.fake_pfs_client)
+
+
+def failing_abort_commit(repo_name, commit_id):
+    raise PachydermOperationException("cluster unavailable")
+
+
+def test_clean_exit_finishes_the_commit():
+    repo_manager = FakeRepoManager()
+    with CommitTransaction(repo_manager, "sales", "master") as transaction:
+        transaction.put_buffer("/sales/2024.csv", b"a" * 10)
+        transaction.put_buffer("/sales/2025.csv", b"b" * 10)
+        transaction.delete_path("/sales/2025.csv")
+
+    fake_pfs_client = repo_manager.fake_pfs_client
+    assert fake_pfs_client.branches[("sales", "master")] == \
+        transaction.commit_id
+    assert list(fake_pfs_client.commits[
+        ("sales", transaction.commit_id)]) == ["/sales/2024.csv"]
+    manifest = repo_manager.pachyderm_client.get_manifest("sales", "master")
+    assert list(manifest.files) == ["/sales/2024.csv"]
+
+
+def test_raising_block_deletes_the_commit():
+    repo_manager = FakeRepoManager()
+    with pytest.raises(ValueError):
+        with CommitTransaction(repo_manager, "sales", "master") as transaction:
+            transaction.put_buffer("/sales/2024.csv", b"a" * 10)
+            raise ValueError("bad row")
+
+    assert repo_manager.fake_pfs_client.commits == {}
+    assert repo_manager.fake_pfs_client.branches == {}
+    with pytest.raises(PachydermOperationException):
+        transaction.put_buffer("/sales/2025.csv", b"b")
+
+
+def test_error_of_the_block_is_raised_when_abort_fails(monkeypatch):
+    repo_manager = FakeRepoManager()
+    monkeypatch.setattr(repo_manager.pachyderm_client, "abort_commit",
+                        failing_abort_commit)
+    with pytest.raises(ValueError), \
+            pytest.warns(UserWarning, match="cluster unavailable"):
+        with CommitTransaction(repo_manager, "sales", "master"):
+            raise ValueError("bad row")
+
+
+def test_error_of_finish_is_raised_when_abort_fails(monkeypatch):
+    repo_manager = FakeRepoManager()
+    pachyderm_client = repo_manager.pachyderm_client
+
+    def failing_finish_commit(*args):
+        raise PachydermOperationException("commit could not be finished")
+
+    monkeypatch.setattr(pachyderm_client, "finish_commit",
+                        failing_finish_commit)
+    monkeypatch.setattr(pachyderm_client, "abort_commit",
+                        failing_abort_commit)
+    with pytest.raises(PachydermOperationException, match="finished"), \
+            pytest.warns(UserWarning, match="cluster unavailable"):
+        with CommitTransaction(repo_manager, "sales", "master"):
+            pass
+
+
+def test_root_can_not_be_deleted():
+    repo_manager = FakeRepoManager()
+    with CommitTransaction(repo_manager, "sales", "master") as transaction:
+        transaction.put_buffer("/sales/2024.csv", b"a")
+        for path in ["/", ""]:
+            with pytest.raises(DatasetPathException):
+                transaction.delete_path(path)
+
+    assert list(repo_manager.fake_pfs_client.commits[
+        ("sales", transaction.commit_id)]) == ["/sales/2024.csv"]
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    PachydermOperationException
+from xpresso.ai.core.data.pachyderm_repo_management.commit_watcher import \
+    CommitWatcher
+from xpresso.ai.core.data.pachyderm_repo_management.tests.fake_pfs_client import \
+    FakePachydermClient, FakePfsClient
+
+
+def create_watcher(tmp_path, **kwargs):
+    fake_pfs_client = FakePfsClient(latency=0)
+    fake_pfs_client.commits[("sales", "c1")] = {"/sales/2024.csv": b"a" * 10}
+    fake_pfs_client.commits[("sales", "c2")] = {"/sales/2024.csv": b"b" * 10,
+                                                "/sales/2025.csv": b"c"}
+    watcher = CommitWatcher(FakePachydermClient(fake_pfs_client), "sales",
+                            "master", str(tmp_path / "mirror"), **kwargs)
+    watcher.POLL_INTERVAL_SECONDS = 0.01
+    return watcher
+
+
+def run_applier(watcher, until, timeout=5):
+    """
+    runs the applier thread until `until` returns True
+    """
+    thread = threading.Thread(target=watcher.apply, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while not until() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    watcher.stop_event.set()
+    thread.join()
+
+
+def read_mirror(watcher):
+    mirror = {}
+    for (dir_path, _, file_names) in os.walk(watcher.local_dir):
+        for file_name in file_names:
+            local_path = os.path.join(dir_path, file_name)
+            with open(local_path, "rb") as local_file:
+                mirror[os.path.relpath(local_path, watcher.local_dir)] = \
+                    local_file.read()
+    return mirror
+
+
+def test_full_sync_removes_stale_local_files(tmp_path):
+    watcher = create_watcher(tmp_path)
+    stale_path = watcher.local_path("/sales/2023.csv")
+    os.makedirs(os.path.dirname(stale_path))
+    with open(stale_path, "wb") as stale_file:
+        stale_file.write(b"old")
+
+    changes = watcher.sync("c1")
+    assert changes["removed"] == ["/sales/2023.csv"]
+    assert read_mirror(watcher) == {"sales/2024.csv": b"a" * 10}
+
+    # later syncs compare commits and leave unknown local files alone
+    with open(stale_path, "wb") as stale_file:
+        stale_file.write(b"old")
+    changes = watcher.sync("c2")
+    assert changes == {"added": ["/sales/2025.csv"],
+                       "modified": ["/sales/2024.csv"], "removed": []}
+    assert read_mirror(watcher) == {"sales/2023.csv": b"old",
+                                    "sales/2024.csv": b"b" * 10,
+                                    "sales/2025.csv": b"c"}
+
+
+def test_burst_of_commits_is_synced_once(tmp_path):
+    watcher = create_watcher(tmp_path)
+    synced_commits = []
+    watcher.sync = synced_commits.append
+    for commit_id in ["c1", "c2", "c3"]:
+        watcher.commit_queue.put(commit_id)
+
+    run_applier(watcher, lambda: synced_commits)
+    assert synced_commits == ["c3"]
+    assert watcher.coalesced_count == 2
+
+
+def test_failed_sync_is_retried_with_backoff(tmp_path):
+    watcher = create_watcher(tmp_path)
+    watcher.RETRY_BACKOFF_SECONDS = 0.05
+    get_file_hashes = watcher.pachyderm_client.get_file_hashes
+    attempts = []
+
+    def flaky_get_file_hashes(*args):
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise PachydermOperationException("cluster unavailable")
+        return get_file_hashes(*args)
+
+    watcher.pachyderm_client.get_file_hashes = flaky_get_file_hashes
+    watcher.commit_queue.put("c1")
+    run_applier(watcher, lambda: watcher.last_commit_id == "c1")
+
+    assert len(attempts) == 3
+    # second retry waits twice as long as the first
+    assert attempts[1] - attempts[0] >= 0.05
+    assert attempts[2] - attempts[1] >= 0.1
+    assert watcher.failure_count == 0 and watcher.failed_commit_id is None
+    assert isinstance(watcher.last_error, PachydermOperationException)
+    assert read_mirror(watcher) == {"sales/2024.csv": b"a" * 10}
+
+
+def test_retry_delay_is_capped():
+    watcher = CommitWatcher(None, "sales", "master", "mirror")
+    delays = []
+    for failure_count in [1, 2, 3, 20]:
+        watcher.failure_count = failure_count
+        delays.append(watcher.get_retry_delay())
+    assert delays == [2, 4, 8, CommitWatcher.MAX_RETRY_BACKOFF_SECONDS]
+
+
+def test_full_queue_blocks_the_subscriber(tmp_path):
+    watcher = create_watcher(tmp_path, queue_size=1)
+    assert watcher.enqueue("c1")
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(watcher.enqueue("c2")), daemon=True)
+    thread.start()
+    time.sleep(0.05)
+    assert thread.is_alive() and results == []
+
+    assert watcher.commit_queue.get() == "c1"
+    thread.join(1)
+    assert results == [True]
+    assert watcher.commit_queue.get() == "c2"
+
+    # a stopped watcher gives up waiting for space
+    watcher.enqueue("c3")
+    thread = threading.Thread(
+        target=lambda: results.append(watcher.enqueue("c4")), daemon=True)
+    thread.start()
+    watcher.stop_event.set()
+    thread.join(1)
+    assert results == [True, False]
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import stat
+
+from xpresso.ai.core.data.pachyderm_repo_management.dataset_cache import \
+    DatasetCache
+
+
+def create_cache(tmp_path, **kwargs):
+    kwargs.setdefault("link_type", DatasetCache.LINK_TYPE_COPY)
+    return DatasetCache(str(tmp_path / "cache"), **kwargs)
+
+
+def pull(tmp_path, name, content):
+    local_path = str(tmp_path / name)
+    with open(local_path, "wb") as local_file:
+        local_file.write(content)
+    return local_path, hashlib.sha256(content).hexdigest()
+
+
+def test_hit_materializes_cached_content(tmp_path):
+    cache = create_cache(tmp_path)
+    local_path, sha256 = pull(tmp_path, "2024.csv", b"a" * 100)
+    cache.add("sales", "c1", "/sales/2024.csv", local_path, sha256)
+
+    assert cache.lookup("sales", "c1", "/sales/2024.csv") == sha256
+    target_path = str(tmp_path / "copy.csv")
+    assert cache.materialize(sha256, target_path)
+    with open(target_path, "rb") as target_file:
+        assert target_file.read() == b"a" * 100
+    assert cache.size_bytes() == 100
+
+
+def test_miss(tmp_path):
+    cache = create_cache(tmp_path)
+    assert cache.lookup("sales", "c1", "/sales/2024.csv") is None
+    assert not cache.materialize("a" * 64, str(tmp_path / "2024.csv"))
+    assert not os.path.exists(tmp_path / "2024.csv")
+
+
+def test_least_recently_used_objects_are_evicted(tmp_path):
+    cache = create_cache(tmp_path, max_size_bytes=250)
+    hashes = []
+    for index in range(3):
+        local_path, sha256 = pull(tmp_path, f"{index}.csv",
+                                  bytes([index]) * 100)
+        cache.add("sales", "c1", f"/sales/{index}.csv", local_path, sha256)
+        hashes.append(sha256)
+        if index == 1:
+            # first object is used again, hence the second one is older
+            assert cache.materialize(hashes[0], str(tmp_path / "reuse.csv"))
+
+    assert cache.size_bytes() == 200
+    assert cache.lookup("sales", "c1", "/sales/1.csv") is None
+    assert not os.path.exists(cache.object_path(hashes[1]))
+    assert cache.lookup("sales", "c1", "/sales/0.csv") == hashes[0]
+    assert cache.lookup("sales", "c1", "/sales/2.csv") == hashes[2]
+
+
+def test_object_changed_in_place_is_dropped(tmp_path):
+    cache = create_cache(tmp_path)
+    local_path, sha256 = pull(tmp_path, "2024.csv", b"a" * 100)
+    cache.add("sales", "c1", "/sales/2024.csv", local_path, sha256)
+
+    object_path = cache.object_path(sha256)
+    os.chmod(object_path, stat.S_IRUSR | stat.S_IWUSR)
+    with open(object_path, "ab") as object_file:
+        object_file.write(b"tampered")
+
+    assert not cache.materialize(sha256, str(tmp_path / "copy.csv"))
+    assert not os.path.exists(object_path)
+    assert cache.lookup("sales", "c1", "/sales/2024.csv") is None
+    assert cache.size_bytes() == 0
+
+
+def test_hardlinked_files_are_read_only(tmp_path):
+    cache = create_cache(tmp_path, link_type=DatasetCache.LINK_TYPE_HARDLINK)
+    local_path, sha256 = pull(tmp_path, "2024.csv", b"a" * 100)
+    cache.add("sales", "c1", "/sales/2024.csv", local_path, sha256)
+    target_path = str(tmp_path / "copy.csv")
+    assert cache.materialize(sha256, target_path)
+
+    object_stat = os.stat(cache.object_path(sha256))
+    assert os.stat(target_path).st_ino == object_stat.st_ino
+    assert os.stat(local_path).st_ino == object_stat.st_ino
+    assert not object_stat.st_mode & (stat.S_IWUSR | stat.S_IWGRP |
+                                      stat.S_IWOTH)
@@ -0,0 +1,45 @@
+from xpresso.ai.core.data.pachyderm_repo_management.dataset_manifest import \
+    DatasetManifest
+
+
+def create_manifest():
+    manifest = DatasetManifest()
+    manifest.add("sales/2024.csv", "a" * 64, 100)
+    manifest.add("/sales/2025.csv", "b" * 64, 200, codec="zstd",
+                 stored_size_bytes=80)
+    return manifest
+
+
+def test_get_verified_matches_stored_size():
+    manifest = create_manifest()
+    assert manifest.get_verified("/sales/2024.csv", 100)[
+        DatasetManifest.SHA256] == "a" * 64
+    # encoded files are checked against the size of the stored content
+    assert manifest.get_verified("sales/2025.csv", 80)[
+        DatasetManifest.CODEC] == "zstd"
+    assert manifest.get_verified("sales/2025.csv", 200) is None
+
+
+def test_get_verified_ignores_stale_and_missing_entries():
+    manifest = create_manifest()
+    # file was rewritten outside of the client after the manifest was saved
+    assert manifest.get_verified("/sales/2024.csv", 101) is None
+    assert manifest.get_verified("/sales/2024.csv", None) is None
+    assert manifest.get_verified("/sales/2026.csv", 100) is None
+
+
+def test_verify_keeps_only_matching_entries():
+    manifest = create_manifest()
+    verified = manifest.verify({"/sales/2024.csv": 100,
+                                "/sales/2025.csv": 200})
+    assert list(verified.files) == ["/sales/2024.csv"]
+    assert DatasetManifest.STORED_SIZE not in verified.get("/sales/2024.csv")
+    assert list(manifest.verify({"/sales/2025.csv": 80}).files) == \
+        ["/sales/2025.csv"]
+    assert manifest.verify({}).files == {}
+
+
+def test_round_trip_keeps_stored_size():
+    manifest = DatasetManifest.from_bytes(create_manifest().to_bytes())
+    assert manifest.get("/sales/2025.csv")[DatasetManifest.STORED_SIZE] == 80
+    assert manifest.get_verified("/sales/2025.csv", 80) is not None
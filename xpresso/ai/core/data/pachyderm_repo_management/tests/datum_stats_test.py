@@ -0,0 +1,50 @@
+import random
+
+from xpresso.ai.core.data.pachyderm_repo_management.datum_stats import \
+    DatumStats
+
+
+def create_records(count):
+    randomizer = random.Random(0)
+    return [{"datum_id": f"datum-{index:04d}",
+             "state": ["success", "failed", "skipped"][index % 3],
+             "total_seconds": round(randomizer.uniform(0, 100), 3)}
+            for index in range(count)]
+
+
+def test_aggregates_states_and_seconds():
+    records = create_records(300)
+    stats = DatumStats().update(records)
+    summary = stats.to_dict()
+    assert summary["datums"] == 300
+    assert summary["states"] == {"success": 100, "failed": 100,
+                                 "skipped": 100}
+    assert summary["seconds"] == \
+        round(sum(record["total_seconds"] for record in records), 3)
+    assert str(stats).startswith(
+        "300 datums (100 failed, 100 skipped, 100 success) in ")
+
+
+def test_keeps_slowest_datums_slowest_first():
+    records = create_records(1000)
+    stats = DatumStats(slowest_count=5).update(records)
+    expected = sorted(records, key=lambda record: (record["total_seconds"],
+                                                   record["datum_id"]),
+                      reverse=True)[:5]
+    assert stats.slowest_datums == expected
+    assert len(stats.slowest_heap) == 5
+
+
+def test_ties_are_broken_by_datum_id():
+    records = [{"datum_id": datum_id, "state": "success",
+                "total_seconds": 1.0} for datum_id in "acbed"]
+    stats = DatumStats(slowest_count=2).update(records)
+    assert [record["datum_id"] for record in stats.slowest_datums] == \
+        ["e", "d"]
+
+
+def test_fewer_datums_than_slowest_count():
+    stats = DatumStats().update(create_records(3))
+    assert len(stats.slowest_datums) == 3
+    assert DatumStats().to_dict() == {"datums": 0, "states": {},
+                                      "seconds": 0.0, "slowest": []}
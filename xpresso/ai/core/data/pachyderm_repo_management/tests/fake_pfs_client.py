@@ -0,0 +1,337 @@
+import collections.abc
+import fnmatch
+import hashlib
+import itertools
+import threading
+import time
+import uuid
+
+import grpc
+from grpc._channel import _RPCState
+from grpc._channel import _Rendezvous as PachClientException
+from python_pachyderm.client.pfs import pfs_pb2
+
+from xpresso.ai.core.data.pachyderm_repo_management.pachyderm_client import \
+    PachydermClient
+
+
+class FakeRpcError(PachClientException):
+    """
+    gRPC error raised by the fake client
+
+    The base class is initialised with a terminated RPC state, so its
+    cleanup behaves as for a failed call
+    """
+    def __init__(self, status_code, details):
+        state = _RPCState((), None, None, status_code, details)
+        super().__init__(state, None, None, None)
+        self.status_code = status_code
+        self.error_details = details
+
+    def code(self):
+        return self.status_code
+
+    def details(self):
+        return self.error_details
+
+
+class FakePfsClient:
+    """
+    In-memory PFS stub used to test and benchmark PachydermClient without
+    a cluster
+
+    Every request sleeps for `latency` seconds to simulate a gRPC round trip
+    and data is "transferred" at `bandwidth` bytes per second
+    """
+    CHUNK_SIZE = 3 * 1024 * 1024
+
+    def __init__(self, latency=0.02, bandwidth=None):
+        """
+
+        :param latency:
+            seconds spent on every request
+        :param bandwidth:
+            (Optional) bytes per second per request stream
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.commits = {}
+        self.branches = {}
+        self.commit_branches = {}
+        self.parents = {}
+        self.descriptions = {}
+        self.finished = set()
+        self.request_count = 0
+        self.wire_bytes = 0
+        self.lock = threading.Lock()
+
+    def simulate_transfer(self, size):
+        """
+        sleeps for the time taken to send `size` bytes
+        """
+        if self.bandwidth:
+            time.sleep(size / self.bandwidth)
+        with self.lock:
+            self.wire_bytes += size
+
+    def simulate_request(self):
+        """
+        sleeps for a round trip and counts the request
+        """
+        time.sleep(self.latency)
+        with self.lock:
+            self.request_count += 1
+
+    def resolve(self, commit):
+        """
+        maps a (repo, branch) tuple to the (repo, commit_id) of its head
+        """
+        repo_name, commit_id = commit
+        commit_id = self.branches.get((repo_name, commit_id), commit_id)
+        if (repo_name, commit_id) not in self.commits:
+            raise FakeRpcError(grpc.StatusCode.NOT_FOUND,
+                               f"commit {repo_name}@{commit_id} not found")
+        return repo_name, commit_id
+
+    @staticmethod
+    def is_under(path, root):
+        """
+        true if `path` is `root` itself or lies in the directory `root`
+        """
+        root = "/" + root.strip("/")
+        return root == "/" or path == root or path.startswith(root + "/")
+
+    def start_commit(self, repo_name, branch=None, parent=None,
+                     description=None, provenance=None):
+        time.sleep(self.latency)
+        commit = pfs_pb2.Commit(id=uuid.uuid4().hex)
+        with self.lock:
+            self.request_count += 1
+            # a new commit starts as a copy of the head of its branch
+            head = self.branches.get((repo_name, branch))
+            self.commits[(repo_name, commit.id)] = \
+                dict(self.commits.get((repo_name, head), {}))
+            self.commit_branches[(repo_name, commit.id)] = branch
+            self.parents[(repo_name, commit.id)] = head
+            self.descriptions[(repo_name, commit.id)] = description or ""
+        return commit
+
+    def finish_commit(self, commit, *args, **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            self.request_count += 1
+            commit = tuple(commit)
+            self.finished.add(commit)
+            branch = self.commit_branches.get(commit)
+            if branch:
+                self.branches[(commit[0], branch)] = commit[1]
+
+    def delete_commit(self, commit):
+        time.sleep(self.latency)
+        with self.lock:
+            self.request_count += 1
+            self.commits.pop(tuple(commit), None)
+
+    def inspect_commit(self, commit, block_state=None):
+        self.simulate_request()
+        repo_name, commit_id = self.resolve(commit)
+        commit_info = pfs_pb2.CommitInfo(
+            commit=pfs_pb2.Commit(repo=pfs_pb2.Repo(name=repo_name),
+                                  id=commit_id),
+            branch=pfs_pb2.Branch(
+                name=self.commit_branches.get((repo_name, commit_id)) or ""),
+            description=self.descriptions.get((repo_name, commit_id), ""))
+        parent = self.parents.get((repo_name, commit_id))
+        if parent:
+            commit_info.parent_commit.id = parent
+        if (repo_name, commit_id) in self.finished:
+            commit_info.finished.seconds = 1
+        return commit_info
+
+    def inspect_branch(self, repo_name, branch_name):
+        self.simulate_request()
+        if (repo_name, branch_name) not in self.branches:
+            raise FakeRpcError(grpc.StatusCode.NOT_FOUND,
+                               f"branch {branch_name} not found in repo "
+                               f"{repo_name}")
+        return pfs_pb2.BranchInfo(
+            name=branch_name,
+            head=pfs_pb2.Commit(repo=pfs_pb2.Repo(name=repo_name),
+                                id=self.branches[(repo_name, branch_name)]))
+
+    def list_branch(self, repo_name):
+        self.simulate_request()
+        return [pfs_pb2.BranchInfo(
+                    name=branch_name,
+                    head=pfs_pb2.Commit(repo=pfs_pb2.Repo(name=repo_name),
+                                        id=head))
+                for ((branch_repo, branch_name), head)
+                in sorted(self.branches.items()) if branch_repo == repo_name]
+
+    def put_file_bytes(self, commit, path, value, delimiter=None,
+                       target_file_datums=None, target_file_bytes=None,
+                       overwrite_index=None):
+        if tuple(commit) not in self.commits:
+            # writing to a branch creates and finishes a commit on it
+            new_commit = self.start_commit(commit[0], commit[1])
+            self.put_file_bytes((commit[0], new_commit.id), path, value,
+                                overwrite_index=overwrite_index)
+            self.finish_commit((commit[0], new_commit.id))
+            return
+        time.sleep(self.latency)
+        if hasattr(value, "read"):
+            chunks = iter(lambda: value.read(self.CHUNK_SIZE), b"")
+        elif isinstance(value, collections.abc.Iterable) and \
+                not isinstance(value, (str, bytes)):
+            chunks = value
+        else:
+            chunks = (value[i:i + self.CHUNK_SIZE]
+                      for i in range(0, len(value), self.CHUNK_SIZE))
+
+        content = bytearray()
+        for chunk in chunks:
+            self.simulate_transfer(len(chunk))
+            content += chunk
+        with self.lock:
+            self.request_count += 1
+            files = self.commits[tuple(commit)]
+            path = "/" + path.lstrip("/")
+            if overwrite_index is not None:
+                files[path] = b""
+            files[path] = files.get(path, b"") + bytes(content)
+
+    def get_file(self, commit, path, offset_bytes=None, size_bytes=None):
+        time.sleep(self.latency)
+        with self.lock:
+            self.request_count += 1
+            files = self.commits[self.resolve(commit)]
+            path = "/" + path.lstrip("/")
+            if path not in files:
+                raise FakeRpcError(grpc.StatusCode.NOT_FOUND,
+                                   f"file {path} not found")
+            content = files[path]
+        start = offset_bytes or 0
+        end = start + size_bytes if size_bytes else len(content)
+        content = content[start:end]
+        for i in itertools.count(0, self.CHUNK_SIZE):
+            if i >= len(content):
+                return
+            chunk = content[i:i + self.CHUNK_SIZE]
+            self.simulate_transfer(len(chunk))
+            yield chunk
+
+    def walk_file(self, commit, path):
+        """
+        yields FileInfo of `path` and all its descendants, directories
+        included, in lexical order
+        """
+        self.simulate_request()
+        files = self.commits[self.resolve(commit)]
+        root = "/" + path.strip("/")
+        file_infos = self.get_file_infos(files, root)
+        if not file_infos:
+            raise FakeRpcError(grpc.StatusCode.NOT_FOUND,
+                               f"file {root} not found")
+        yield from file_infos
+
+    def glob_file(self, commit, pattern):
+        """
+        yields FileInfo of the files and directories matching `pattern`,
+        whose wildcards do not match `/`
+        """
+        self.simulate_request()
+        files = self.commits[self.resolve(commit)]
+        pattern_parts = pattern.strip("/").split("/")
+        for file_info in self.get_file_infos(files, "/"):
+            path_parts = file_info.file.path.strip("/").split("/")
+            if len(path_parts) == len(pattern_parts) and \
+                    all(fnmatch.fnmatchcase(path_part, pattern_part)
+                        for (path_part, pattern_part)
+                        in zip(path_parts, pattern_parts)):
+                yield file_info
+
+    def get_file_infos(self, files, root):
+        """
+        returns FileInfo of `root` and all its descendants in `files`
+        sorted by path, an empty list if there is none
+        """
+        file_paths = sorted(file_path for file_path in files
+                            if self.is_under(file_path, root))
+        if not file_paths:
+            return []
+
+        directories = set()
+        for file_path in file_paths:
+            parent = file_path.rsplit("/", 1)[0] or "/"
+            while self.is_under(parent, root) and parent not in directories:
+                directories.add(parent)
+                parent = parent.rsplit("/", 1)[0] or "/"
+        file_infos = [pfs_pb2.FileInfo(file=pfs_pb2.File(path=directory),
+                                       file_type=pfs_pb2.DIR)
+                      for directory in directories]
+        file_infos.extend(
+            pfs_pb2.FileInfo(file=pfs_pb2.File(path=file_path),
+                             file_type=pfs_pb2.FILE,
+                             size_bytes=len(files[file_path]),
+                             hash=hashlib.sha256(files[file_path]).digest())
+            for file_path in file_paths)
+        return sorted(file_infos, key=lambda info: info.file.path)
+
+    def copy_file(self, source_commit, source_path, dest_commit, dest_path,
+                  overwrite=False):
+        self.simulate_request()
+        with self.lock:
+            source_files = self.commits[self.resolve(source_commit)]
+            dest_files = self.commits[tuple(dest_commit)]
+            source_root = "/" + source_path.strip("/")
+            dest_root = "/" + dest_path.strip("/")
+            copied_paths = [path for path in source_files
+                            if self.is_under(path, source_root)]
+            if not copied_paths:
+                raise FakeRpcError(grpc.StatusCode.NOT_FOUND,
+                                   f"file {source_root} not found")
+            for path in copied_paths:
+                target_path = dest_root + path[len(source_root):]
+                if overwrite:
+                    dest_files[target_path] = source_files[path]
+                else:
+                    dest_files[target_path] = \
+                        dest_files.get(target_path, b"") + source_files[path]
+
+    def delete_file(self, commit, path):
+        self.simulate_request()
+        with self.lock:
+            files = self.commits[tuple(commit)]
+            for file_path in [file_path for file_path in files
+                              if self.is_under(file_path, path)]:
+                del files[file_path]
+
+
+class FakePipelineClient:
+    """
+    Stand-in for PachydermPipelineClient of a cluster running pipelines
+    which read the repos in `reading_pipelines`
+    """
+    def __init__(self, reading_pipelines=None):
+        """
+
+        :param reading_pipelines:
+            (Optional) dict of repo name to names of pipelines reading it
+        """
+        self.reading_pipelines = reading_pipelines or {}
+
+    def get_reading_pipelines(self, repo_name):
+        return sorted(self.reading_pipelines.get(repo_name, []))
+
+
+class FakePachydermClient(PachydermClient):
+    """
+    PachydermClient connected to an in-memory FakePfsClient
+    """
+    def __init__(self, fake_pfs_client, reading_pipelines=None):
+        self.fake_pfs_client = fake_pfs_client
+        super().__init__("localhost", 30650)
+        self.pipeline_client = FakePipelineClient(reading_pipelines)
+
+    def connect(self, host, port, auth_token=None):
+        return self.fake_pfs_client
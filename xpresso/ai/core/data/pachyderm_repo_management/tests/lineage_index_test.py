@@ -0,0 +1,115 @@
+from google.protobuf.json_format import ParseDict
+from python_pachyderm.client.pps import pps_pb2
+
+from xpresso.ai.core.data.pachyderm_repo_management.lineage_index import \
+    LineageIndex
+
+
+def create_job_info(job_id, pipeline, output_commit, job_input, started):
+    job_info = {
+        "job": {"id": job_id},
+        "pipeline": {"name": pipeline},
+        "output_commit": {"repo": {"name": pipeline}, "id": output_commit},
+        "input": job_input,
+        "state": "JOB_SUCCESS" if started else "JOB_STARTING"
+    }
+    if started:
+        job_info["started"] = started
+    return ParseDict(job_info, pps_pb2.JobInfo())
+
+
+def pfs_input(repo, commit):
+    return {"pfs": {"repo": repo, "commit": commit, "glob": "/*"}}
+
+
+# newest job first, as pachd lists them
+JOB_INFOS = [
+    create_job_info("job-3", "montage", "m1",
+                    {"cross": [pfs_input("edges", "e1"),
+                               pfs_input("labels", "l1")]},
+                    "2024-01-01T00:04:00Z"),
+    create_job_info("job-2", "edges", "e2", pfs_input("images", "i2"),
+                    "2024-01-01T00:02:00Z"),
+    create_job_info("job-1", "edges", "e1", pfs_input("images", "i1"),
+                    "2024-01-01T00:00:00Z"),
+]
+
+
+class FakePipelineClient:
+    def __init__(self, job_infos):
+        self.job_infos = job_infos
+        self.listed_count = 0
+
+    def list_job(self, pipeline_name=None, history=None):
+        for job_info in self.job_infos:
+            if pipeline_name is None or job_info.pipeline.name == pipeline_name:
+                self.listed_count += 1
+                yield job_info
+
+
+def create_index(job_infos=JOB_INFOS):
+    pipeline_client = FakePipelineClient(job_infos)
+    lineage_index = LineageIndex(pipeline_client, ":memory:")
+    return lineage_index, pipeline_client
+
+
+def test_upstream_is_followed_through_pipelines():
+    lineage_index, _ = create_index()
+    assert lineage_index.refresh() == 3
+    assert lineage_index.get_upstream("montage", "m1") == \
+        [("edges", "e1"), ("images", "i1"), ("labels", "l1")]
+    assert lineage_index.get_upstream("edges", "e2") == [("images", "i2")]
+    assert lineage_index.get_upstream("images", "i1") == []
+
+
+def test_downstream_is_followed_through_pipelines():
+    lineage_index, _ = create_index()
+    lineage_index.refresh()
+    assert lineage_index.get_downstream("images", "i1") == \
+        [("edges", "e1"), ("montage", "m1")]
+    assert lineage_index.get_downstream("labels", "l1") == [("montage", "m1")]
+    assert lineage_index.get_downstream("images", "i2") == [("edges", "e2")]
+
+
+def test_get_job_of_output_commit():
+    lineage_index, _ = create_index()
+    lineage_index.refresh()
+    job = lineage_index.get_job("montage", "m1")
+    assert (job["job_id"], job["pipeline"]) == ("job-3", "montage")
+    assert lineage_index.get_job("images", "i1") is None
+
+
+def test_refresh_stops_at_the_watermark():
+    old_job = create_job_info("job-0", "edges", "e0", pfs_input("images", "i0"),
+                              "2023-12-31T00:00:00Z")
+    lineage_index, pipeline_client = create_index(JOB_INFOS + [old_job])
+    assert lineage_index.refresh() == 4
+    assert lineage_index.watermark == \
+        LineageIndex.to_seconds(JOB_INFOS[0].started)
+
+    pipeline_client.listed_count = 0
+    # jobs within the overlap are read again, older ones are not
+    assert lineage_index.refresh() == 3
+    assert pipeline_client.listed_count == 4
+    assert lineage_index.refresh(full=True) == 4
+
+
+def test_pipeline_refresh_keeps_the_watermark():
+    lineage_index, _ = create_index()
+    lineage_index.refresh(pipeline_name="edges")
+    assert lineage_index.watermark is None
+    assert lineage_index.get_downstream("images", "i1") == [("edges", "e1")]
+
+
+def test_refresh_reads_past_queued_jobs():
+    queued_job = create_job_info("job-4", "montage", "m2",
+                                 pfs_input("edges", "e2"), None)
+    lineage_index, _ = create_index(JOB_INFOS)
+    lineage_index.refresh()
+    lineage_index.pipeline_client.job_infos = [queued_job] + JOB_INFOS
+    assert lineage_index.refresh() == 4
+    assert lineage_index.watermark == \
+        LineageIndex.to_seconds(JOB_INFOS[0].started)
+    assert lineage_index.get_job("montage", "m2")["started"] is None
+    assert lineage_index.get_downstream("images", "i2") == \
+        [("edges", "e2"), ("montage", "m2")]
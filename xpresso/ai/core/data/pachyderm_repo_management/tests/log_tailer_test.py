@@ -0,0 +1,107 @@
+import threading
+import time
+
+from python_pachyderm.client.pps import pps_pb2
+
+from xpresso.ai.core.data.pachyderm_repo_management.log_tailer import \
+    LogTailer
+
+
+class FakeLogStream:
+    """
+    log stream of a job which sends `log_messages` after `delay` seconds
+    and, when followed, stays open until it is cancelled
+    """
+    def __init__(self, log_messages, delay=0, follow=False):
+        self.log_messages = log_messages
+        self.delay = delay
+        self.follow = follow
+        self.cancelled = threading.Event()
+
+    def __iter__(self):
+        if self.cancelled.wait(self.delay):
+            return
+        for log_message in self.log_messages:
+            if self.cancelled.is_set():
+                return
+            yield log_message
+        if self.follow:
+            self.cancelled.wait()
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class FakePipelineClient:
+    def __init__(self, streams):
+        self.streams = streams
+
+    def get_job_logs(self, job_id, follow=False, tail=None):
+        return self.streams[job_id]
+
+
+def create_message(job_id, seconds, message=""):
+    log_message = pps_pb2.LogMessage(job_id=job_id, worker_id="worker-1",
+                                     message=message or f"{job_id} {seconds}")
+    log_message.ts.seconds = seconds
+    return log_message
+
+
+def create_tailer(monkeypatch, streams, **kwargs):
+    monkeypatch.setattr(LogTailer, "POLL_INTERVAL_SECONDS", 0.01)
+    return LogTailer(FakePipelineClient(streams), **kwargs)
+
+
+def test_merge_orders_late_messages_within_the_window(monkeypatch):
+    tailer = create_tailer(monkeypatch, {
+        "j1": FakeLogStream([create_message("j1", seconds)
+                             for seconds in (1, 3, 5)]),
+        # arrives after all the messages of j1
+        "j2": FakeLogStream([create_message("j2", seconds)
+                             for seconds in (2, 4)], delay=0.1)
+    }, reorder_seconds=1)
+    merged = list(tailer.merge_jobs(["j1", "j2"]))
+    assert [log_message.ts.seconds for log_message in merged] == \
+        [1, 2, 3, 4, 5]
+
+
+def test_merge_emits_messages_later_than_the_window(monkeypatch):
+    tailer = create_tailer(monkeypatch, {
+        "j1": FakeLogStream([create_message("j1", 2)], follow=True),
+        "j2": FakeLogStream([create_message("j2", 1)], delay=0.3)
+    }, reorder_seconds=0.05)
+    merged = tailer.merge_jobs(["j1", "j2"], follow=True)
+    # j1 is released once held for the window, before j2 arrives
+    assert [next(merged).job_id, next(merged).job_id] == ["j1", "j2"]
+    merged.close()
+
+
+def test_merge_releases_messages_beyond_the_buffer(monkeypatch):
+    stream = FakeLogStream([create_message("j1", seconds)
+                            for seconds in (5, 4, 3, 2, 1)], follow=True)
+    tailer = create_tailer(monkeypatch, {"j1": stream}, buffer_size=2,
+                           reorder_seconds=100)
+    merged = tailer.merge_jobs(["j1"], follow=True)
+    start_time = time.monotonic()
+    # the window is not waited for once more than buffer_size are held,
+    # the oldest held message is released for every one arriving
+    released = [next(merged).ts.seconds for _ in range(3)]
+    assert time.monotonic() - start_time < 5
+    assert released == [3, 2, 1]
+    merged.close()
+    assert stream.cancelled.is_set()
+    assert tailer.streams == []
+
+
+def test_recent_messages_keep_the_latest_ones(monkeypatch):
+    tailer = create_tailer(monkeypatch, {
+        "j1": FakeLogStream([create_message("j1", seconds)
+                             for seconds in range(10)])
+    }, buffer_size=3, pattern=r"j1 [^5]")
+    tailed = [log_message.ts.seconds for log_message in tailer.tail_job("j1")]
+    assert tailed == [0, 1, 2, 3, 4, 6, 7, 8, 9]
+    assert [log_message.ts.seconds for log_message
+            in tailer.get_recent_messages()] == [7, 8, 9]
+    assert [log_message.ts.seconds for log_message
+            in tailer.get_recent_messages(2)] == [8, 9]
+    assert tailer.get_recent_messages(0) == []
@@ -0,0 +1,59 @@
+import time
+
+from xpresso.ai.core.data.pachyderm_repo_management.metadata_cache import \
+    MetadataCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    cache = MetadataCache()
+    cache.put(("sales", "branch", "master"), "head-1", ttl_seconds=5)
+    cache.put(("sales", "commit", "abc"), "finished")
+
+    clock.now += 4.9
+    assert cache.get(("sales", "branch", "master")) == "head-1"
+    clock.now += 0.1
+    assert cache.get(("sales", "branch", "master")) is None
+    # entries without ttl never expire
+    clock.now += 10 ** 6
+    assert cache.get(("sales", "commit", "abc")) == "finished"
+    assert cache.stats() == {"hits": 2, "misses": 1, "entries": 1}
+
+
+def test_invalidate_by_repo_kind_and_name():
+    cache = MetadataCache()
+    for key in [("sales", "branch", "master"), ("sales", "branch", "dev"),
+                ("sales", "commit", "abc"), ("stores", "branch", "master")]:
+        cache.put(key, key)
+
+    cache.invalidate("sales", "branch", "master")
+    assert cache.get(("sales", "branch", "master")) is None
+    assert cache.get(("sales", "branch", "dev")) is not None
+
+    cache.invalidate("sales", "branch")
+    assert cache.get(("sales", "branch", "dev")) is None
+    assert cache.get(("sales", "commit", "abc")) is not None
+
+    cache.invalidate("sales")
+    assert cache.get(("sales", "commit", "abc")) is None
+    assert cache.get(("stores", "branch", "master")) is not None
+
+
+def test_counters_track_hits_and_misses():
+    cache = MetadataCache()
+    assert cache.get(("sales", "commit", "abc")) is None
+    cache.put(("sales", "commit", "abc"), "info")
+    assert cache.get(("sales", "commit", "abc")) == "info"
+    assert cache.get(("sales", "commit", "abc")) == "info"
+    assert cache.stats() == {"hits": 2, "misses": 1, "entries": 1}
+    cache.clear()
+    assert cache.stats() == {"hits": 2, "misses": 1, "entries": 0}
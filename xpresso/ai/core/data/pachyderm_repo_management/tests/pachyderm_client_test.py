@@ -0,0 +1,360 @@
+import hashlib
+import os
+
+import grpc
+import pytest
+
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    PachydermOperationException
+from xpresso.ai.core.data.pachyderm_repo_management.dataset_cache import \
+    DatasetCache
+from xpresso.ai.core.data.pachyderm_repo_management.dataset_manifest import \
+    DatasetManifest
+from xpresso.ai.core.data.pachyderm_repo_management.tests.fake_pfs_client import \
+    FakePachydermClient, FakePfsClient, FakeRpcError
+
+
+def create_client():
+    fake_pfs_client = FakePfsClient(latency=0)
+    return FakePachydermClient(fake_pfs_client), fake_pfs_client
+
+
+def write_file(path, content, mtime=1700000000.0):
+    with open(path, "wb") as local_file:
+        local_file.write(content)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def sha256(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def test_find_changed_files(tmp_path, monkeypatch):
+    client, _ = create_client()
+    files = {
+        "same_mtime.csv": b"a" * 10,
+        "same_content.csv": b"b" * 10,
+        "edited.csv": b"c" * 10,
+        "resized.csv": b"d" * 12,
+        "new.csv": b"e" * 10,
+        "deleted_on_cluster.csv": b"f" * 10,
+        "rewritten_on_cluster.csv": b"g" * 10,
+    }
+    file_path_list = [
+        (write_file(str(tmp_path / name), content), f"/sales/{name}")
+        for (name, content) in files.items()
+    ]
+    manifest = DatasetManifest()
+    # the recorded hash is wrong, matching size and mtime skip hashing
+    manifest.add("/sales/same_mtime.csv", sha256(b"x"), 10, 1700000000.0)
+    manifest.add("/sales/same_content.csv", sha256(b"b" * 10), 10, 1.0)
+    manifest.add("/sales/edited.csv", sha256(b"x" * 10), 10, 1.0)
+    manifest.add("/sales/resized.csv", sha256(b"d" * 10), 10, 1700000000.0)
+    manifest.add("/sales/deleted_on_cluster.csv", sha256(b"f" * 10), 10,
+                 1700000000.0)
+    manifest.add("/sales/rewritten_on_cluster.csv", sha256(b"g" * 10), 10,
+                 1700000000.0)
+    manifest.add("/sales/removed_locally.csv", sha256(b"h"), 1)
+    remote_sizes = {
+        "/sales/same_mtime.csv": 10,
+        "/sales/same_content.csv": 10,
+        "/sales/edited.csv": 10,
+        "/sales/resized.csv": 10,
+        "/sales/rewritten_on_cluster.csv": 11,
+        "/sales/removed_locally.csv": 1,
+    }
+    monkeypatch.setattr(client, "get_file_hashes", lambda *args: {
+        path: (None, size_bytes) for (path, size_bytes) in remote_sizes.items()
+    })
+
+    changed_files, removed_paths = client.find_changed_files(
+        "sales", "master", file_path_list, manifest, "/sales")
+    assert sorted(os.path.basename(local_path)
+                  for (local_path, _) in changed_files) == \
+        ["deleted_on_cluster.csv", "edited.csv", "new.csv", "resized.csv",
+         "rewritten_on_cluster.csv"]
+    assert removed_paths == ["/sales/removed_locally.csv"]
+
+    # without a dataset path nothing is reported as removed
+    assert client.find_changed_files(
+        "sales", "master", file_path_list, manifest)[1] == []
+
+
+def test_pull_resumes_partial_file(tmp_path):
+    client, fake_pfs_client = create_client()
+    content = os.urandom(10000)
+    fake_pfs_client.commits[("sales", "c1")] = {"/sales/2024.csv": content}
+    local_path = str(tmp_path / "2024.csv")
+    write_file(local_path + client.PARTIAL_FILE_SUFFIX, content[:4000])
+
+    requests = []
+    get_file = fake_pfs_client.get_file
+
+    def recording_get_file(commit, path, offset_bytes=None, size_bytes=None):
+        requests.append((offset_bytes, size_bytes))
+        return get_file(commit, path, offset_bytes, size_bytes)
+
+    fake_pfs_client.get_file = recording_get_file
+    client.pull_file("sales", "c1", "/sales/2024.csv", local_path,
+                     sha256(content), size_bytes=len(content))
+    assert requests == [(4000, 6000)]
+    with open(local_path, "rb") as local_file:
+        assert local_file.read() == content
+    assert os.listdir(tmp_path) == ["2024.csv"]
+
+
+def test_pull_restarts_partial_file_of_other_content(tmp_path):
+    client, fake_pfs_client = create_client()
+    content = os.urandom(1000)
+    fake_pfs_client.commits[("sales", "c1")] = {"/sales/2024.csv": content}
+    local_path = str(tmp_path / "2024.csv")
+    # longer than the file, hence it can not be a prefix of it
+    write_file(local_path + client.PARTIAL_FILE_SUFFIX, os.urandom(2000))
+
+    client.pull_file("sales", "c1", "/sales/2024.csv", local_path,
+                     sha256(content), size_bytes=len(content))
+    with open(local_path, "rb") as local_file:
+        assert local_file.read() == content
+
+
+def test_range_pull_resumes_each_range(tmp_path, monkeypatch):
+    client, fake_pfs_client = create_client()
+    monkeypatch.setattr(client, "RANGE_DOWNLOAD_THRESHOLD", 1)
+    content = os.urandom(9000)
+    fake_pfs_client.commits[("sales", "c1")] = {"/sales/2024.csv": content}
+    local_path = str(tmp_path / "2024.csv")
+    partial_path = local_path + client.PARTIAL_FILE_SUFFIX
+    # first range complete, second half done and third not started
+    write_file(partial_path, content[:4500] + bytes(4500))
+    client.save_range_state(partial_path + client.RANGE_STATE_SUFFIX, 9000,
+                            {0: 3000, 3000: 1500, 6000: 0})
+
+    requests = []
+    get_file = fake_pfs_client.get_file
+
+    def recording_get_file(commit, path, offset_bytes=None, size_bytes=None):
+        requests.append((offset_bytes, size_bytes))
+        return get_file(commit, path, offset_bytes, size_bytes)
+
+    fake_pfs_client.get_file = recording_get_file
+    client.pull_file("sales", "c1", "/sales/2024.csv", local_path,
+                     sha256(content), size_bytes=len(content),
+                     range_workers=3)
+    assert sorted(requests) == [(4500, 1500), (6000, 3000)]
+    with open(local_path, "rb") as local_file:
+        assert local_file.read() == content
+    assert os.listdir(tmp_path) == ["2024.csv"]
+
+
+def test_push_deletes_commit_on_any_error(tmp_path, monkeypatch):
+    client, fake_pfs_client = create_client()
+    local_path = write_file(str(tmp_path / "2024.csv"), b"a" * 10)
+
+    def interrupted_upload(*args, **kwargs):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(client, "upload_files", interrupted_upload)
+    with pytest.raises(KeyboardInterrupt):
+        client.push_dataset("sales", "master",
+                            [(local_path, "/sales/2024.csv")])
+    assert fake_pfs_client.commits == {}
+    assert fake_pfs_client.branches == {}
+
+
+def test_manifest_is_kept_out_of_the_data_tree(tmp_path):
+    client, fake_pfs_client = create_client()
+    content = b"a" * 10
+    local_path = write_file(str(tmp_path / "2024.csv"), content)
+    commit_id = client.push_dataset("sales", "master",
+                                    [(local_path, "/sales/2024.csv")])
+
+    assert list(fake_pfs_client.commits[("sales", commit_id)]) == \
+        ["/sales/2024.csv"]
+    assert client.get_manifest("sales", "master").get_hash(
+        "/sales/2024.csv") == sha256(content)
+    assert [branch.name for branch in client.get_branch("sales")] == \
+        ["master"]
+
+
+def test_manifest_of_closest_ancestor_is_used(tmp_path):
+    client, fake_pfs_client = create_client()
+    local_path = write_file(str(tmp_path / "2024.csv"), b"a" * 10)
+    client.push_dataset("sales", "master", [(local_path, "/sales/2024.csv")])
+    # a commit written by pachctl has no manifest of its own
+    commit = fake_pfs_client.start_commit("sales", "master")
+    fake_pfs_client.put_file_bytes(("sales", commit.id), "/sales/2025.csv",
+                                   b"b")
+    fake_pfs_client.finish_commit(("sales", commit.id))
+
+    manifest = client.get_manifest("sales", commit.id)
+    assert list(manifest.files) == ["/sales/2024.csv"]
+    assert client.get_manifest("stores", "master").files == {}
+
+
+def test_legacy_manifest_in_data_tree_is_read():
+    client, fake_pfs_client = create_client()
+    legacy_manifest = DatasetManifest()
+    legacy_manifest.add("/sales/2024.csv", sha256(b"a"), 1)
+    fake_pfs_client.commits[("sales", "c1")] = {
+        "/sales/2024.csv": b"a",
+        DatasetManifest.LEGACY_MANIFEST_PATH: legacy_manifest.to_bytes()}
+
+    assert client.get_manifest("sales", "c1").files == legacy_manifest.files
+    assert [file_info["path"] for file_info
+            in client.list_dataset("sales", "c1")] == \
+        ["/sales", "/sales/2024.csv"]
+
+
+def test_pull_succeeds_when_cache_add_fails(tmp_path, monkeypatch):
+    client, fake_pfs_client = create_client()
+    content = b"a" * 10
+    fake_pfs_client.commits[("sales", "c1")] = {"/sales/2024.csv": content}
+    cache = DatasetCache(str(tmp_path / "cache"),
+                         link_type=DatasetCache.LINK_TYPE_COPY)
+
+    def failing_link_file(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(cache, "link_file", failing_link_file)
+    local_path = str(tmp_path / "2024.csv")
+    with pytest.warns(UserWarning, match="disk full"):
+        client.pull_file("sales", "c1", "/sales/2024.csv", local_path,
+                         sha256(content), cache=cache)
+    with open(local_path, "rb") as local_file:
+        assert local_file.read() == content
+    assert cache.lookup("sales", "c1", "/sales/2024.csv") is None
+
+
+def test_codec_is_recorded_on_the_commit(tmp_path):
+    client, fake_pfs_client = create_client()
+    client.set_codec("zlib")
+    local_path = write_file(str(tmp_path / "2024.csv"), b"a" * 10)
+    commit_id = client.push_dataset("sales", "master",
+                                    [(local_path, "/sales/2024.csv")],
+                                    "daily sales")
+
+    assert client.get_commit_codec("sales", commit_id) == "zlib"
+    assert fake_pfs_client.descriptions[("sales", commit_id)] == \
+        "daily sales\nxpresso-codec: zlib"
+    client.set_codec(None)
+    commit_id = client.push_dataset("sales", "master",
+                                    [(local_path, "/sales/2024.csv")])
+    assert client.get_commit_codec("sales", commit_id) is None
+
+
+def test_encoded_push_to_pipeline_input_is_refused(tmp_path):
+    fake_pfs_client = FakePfsClient(latency=0)
+    client = FakePachydermClient(fake_pfs_client, {"sales": ["forecast"]})
+    client.set_codec("zlib")
+    local_path = write_file(str(tmp_path / "2024.csv"), b"a" * 10)
+    with pytest.raises(PachydermOperationException, match="forecast"):
+        client.push_dataset("sales", "master",
+                            [(local_path, "/sales/2024.csv")])
+    assert fake_pfs_client.commits == {}
+
+
+def test_list_dataset_returns_a_list():
+    client, fake_pfs_client = create_client()
+    fake_pfs_client.commits[("sales", "c1")] = {"/sales/2024.csv": b"a"}
+    listing = client.list_dataset("sales", "c1", "/sales")
+    assert listing == list(client.iter_dataset("sales", "c1", "/sales"))
+    assert [file_info["path"] for file_info in listing] == ["/sales/2024.csv"]
+    with pytest.warns(DeprecationWarning):
+        assert client.list_dataset("sales", "c1", "/sales",
+                                   include_contents=True) == listing
+
+
+def push_files(client, tmp_path, branch_name, files):
+    file_path_list = [
+        (write_file(str(tmp_path / pachyderm_path.replace("/", "_")),
+                    content), pachyderm_path)
+        for (pachyderm_path, content) in files.items()]
+    return client.push_dataset("sales", branch_name, file_path_list)
+
+
+def test_copy_dataset_replaces_the_target(tmp_path):
+    client, fake_pfs_client = create_client()
+    push_files(client, tmp_path, "master", {"/sales/2023.csv": b"old",
+                                            "/sales/2024.csv": b"old",
+                                            "/stores/all.csv": b"stores"})
+    source_commit_id = push_files(client, tmp_path, "staging",
+                                  {"/sales/2024.csv": b"new 2024",
+                                   "/sales/2025.csv": b"new 2025"})
+
+    commit_id = client.copy_dataset("sales", "staging", "master", "/sales",
+                                    "promoted /sales")
+    # the stale 2023.csv is gone, files outside the dataset are kept
+    assert fake_pfs_client.commits[("sales", commit_id)] == {
+        "/sales/2024.csv": b"new 2024", "/sales/2025.csv": b"new 2025",
+        "/stores/all.csv": b"stores"}
+    assert fake_pfs_client.branches[("sales", "master")] == commit_id
+    manifest = client.get_manifest("sales", "master")
+    assert sorted(manifest.files) == ["/sales/2024.csv", "/sales/2025.csv",
+                                      "/stores/all.csv"]
+    assert manifest.get_hash("/sales/2025.csv") == \
+        client.get_manifest("sales", source_commit_id).get_hash(
+            "/sales/2025.csv")
+
+
+def test_copy_dataset_failing_after_the_delete_keeps_the_target(tmp_path):
+    client, fake_pfs_client = create_client()
+    head_id = push_files(client, tmp_path, "master",
+                         {"/sales/2023.csv": b"old"})
+    push_files(client, tmp_path, "staging", {"/sales/2024.csv": b"new"})
+    deleted_paths = []
+    delete_file = fake_pfs_client.delete_file
+
+    def recording_delete_file(commit, path):
+        deleted_paths.append(path)
+        delete_file(commit, path)
+
+    def failing_copy_file(*args, **kwargs):
+        raise FakeRpcError(grpc.StatusCode.UNAVAILABLE, "connection reset")
+
+    fake_pfs_client.delete_file = recording_delete_file
+    fake_pfs_client.copy_file = failing_copy_file
+    commit_count = len(fake_pfs_client.commits)
+
+    with pytest.raises(PachydermOperationException, match="connection reset"):
+        client.copy_dataset("sales", "staging", "master", "/sales")
+    assert deleted_paths == ["/sales"]
+    # the new commit is deleted and the branch still points at its head
+    assert len(fake_pfs_client.commits) == commit_count
+    assert fake_pfs_client.branches[("sales", "master")] == head_id
+    assert [file_info["path"] for file_info
+            in client.list_dataset("sales", "master", "/sales")] == \
+        ["/sales/2023.csv"]
+
+
+def test_duplicates_fall_back_to_file_info_hashes(tmp_path):
+    client, fake_pfs_client = create_client()
+    push_files(client, tmp_path, "master", {"/sales/2024.csv": b"a" * 10})
+    # pachctl copies the file, the new head has no manifest of its own
+    commit = fake_pfs_client.start_commit("sales", "master")
+    fake_pfs_client.copy_file(("sales", "master"), "/sales/2024.csv",
+                              ("sales", commit.id), "/archive/2024.csv")
+    fake_pfs_client.finish_commit(("sales", commit.id))
+    local_path = write_file(str(tmp_path / "archive.csv"), b"a" * 10)
+    other_path = write_file(str(tmp_path / "other.csv"), b"b" * 10)
+
+    upload_files, duplicate_files = client.find_duplicate_files(
+        "sales", "master", [(local_path, "/archive/2024.csv"),
+                            (other_path, "/archive/2025.csv")])
+    assert upload_files == [(other_path, "/archive/2025.csv")]
+    # the file is unchanged in the head, hence it is neither uploaded
+    # nor copied
+    assert [(source_commit_id, pachyderm_path, sha256_hash)
+            for (source_commit_id, _, pachyderm_path, sha256_hash, *_)
+            in duplicate_files] == \
+        [(None, "/archive/2024.csv", sha256(b"a" * 10))]
+
+
+def test_all_files_are_uploaded_without_any_manifest(tmp_path):
+    client, fake_pfs_client = create_client()
+    fake_pfs_client.put_file_bytes(("sales", "master"), "/sales/2024.csv",
+                                   b"a" * 10)
+    local_path = write_file(str(tmp_path / "2024.csv"), b"a" * 10)
+    file_path_list = [(local_path, "/sales/2024.csv")]
+    assert client.find_duplicate_files("sales", "master", file_path_list) == \
+        (file_path_list, [])
@@ -0,0 +1,240 @@
+import concurrent.futures
+import threading
+import time
+
+import grpc
+import pytest
+from google.protobuf.json_format import ParseDict
+from python_pachyderm.client.pps import pps_pb2
+
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    InvalidConfigException, PachydermOperationException
+from xpresso.ai.core.data.pachyderm_repo_management.pachyderm_pipeline_client import \
+    PachydermPipelineClient
+
+
+PIPELINE_SPEC = {
+    "pipeline": {"name": "edges"},
+    "transform": {"cmd": ["python3", "/edges.py"]},
+    "input": {
+        "cross": [
+            {"pfs": {"repo": "images", "glob": "/*"}},
+            {"cron": {"name": "tick", "spec": "@every 1h"}}
+        ]
+    }
+}
+
+# the same pipeline as pachd reports it after creating it from PIPELINE_SPEC
+PIPELINE_INFO = {
+    "pipeline": {"name": "edges"},
+    "version": "3",
+    "state": "PIPELINE_RUNNING",
+    "spec_commit": {"repo": {"name": "__spec__"}, "id": "4af40d34a0384f23"},
+    "salt": "d6b6e8a1d43e4b6f",
+    "output_branch": "master",
+    "cache_size": "64M",
+    "max_queue_size": "1",
+    "transform": {"image": "ubuntu:16.04", "cmd": ["python3", "/edges.py"]},
+    "input": {
+        "cross": [
+            {"pfs": {"name": "images", "repo": "images", "branch": "master",
+                     "glob": "/*"}},
+            {"cron": {"name": "tick", "spec": "@every 1h", "repo": "edges_tick",
+                      "start": "2024-01-01T00:00:00Z"}}
+        ]
+    }
+}
+
+
+class FakeFuture(concurrent.futures.Future):
+    """
+    future of a gRPC call, raising the errors of grpc futures
+    """
+    def result(self, timeout=None):
+        try:
+            return super().result(timeout)
+        except concurrent.futures.TimeoutError:
+            raise grpc.FutureTimeoutError()
+        except concurrent.futures.CancelledError:
+            raise grpc.FutureCancelledError()
+
+
+class FakeInspectJob:
+    """
+    InspectJob of the stub. Blocking requests finish when the test calls
+    `finish_job`, others report `running_jobs` and never answer for
+    the jobs missing there
+    """
+    def __init__(self):
+        self.blocking_futures = {}
+        self.progress_futures = []
+        self.running_jobs = {}
+
+    def future(self, request, metadata=None, timeout=None):
+        future = FakeFuture()
+        if request.block_state:
+            self.blocking_futures[request.job.id] = future
+        else:
+            self.progress_futures.append(future)
+            if request.job.id in self.running_jobs:
+                future.set_result(self.running_jobs[request.job.id])
+        return future
+
+    def finish_job(self, job_id, state=PachydermPipelineClient.JOB_SUCCESS):
+        self.blocking_futures[job_id].set_result(create_job_info(
+            job_id, state, data_processed=10, data_total=10))
+
+
+class FakeStub:
+    def __init__(self):
+        self.create_requests = []
+        self.InspectJob = FakeInspectJob()
+
+    def CreatePipeline(self, request, metadata=None):
+        self.create_requests.append(request)
+
+
+class FakePpsClient:
+    def __init__(self, pipeline_infos):
+        self.pipeline_infos = pipeline_infos
+        self.stub = FakeStub()
+        self.metadata = []
+
+    def inspect_pipeline(self, pipeline_name):
+        return ParseDict(self.pipeline_infos[pipeline_name],
+                         pps_pb2.PipelineInfo())
+
+    def list_pipeline(self, history=None):
+        return pps_pb2.PipelineInfos(pipeline_info=[
+            self.inspect_pipeline(pipeline_name)
+            for pipeline_name in self.pipeline_infos])
+
+
+def create_job_info(job_id, state, **counters):
+    return pps_pb2.JobInfo(job=pps_pb2.Job(id=job_id), state=state,
+                           **counters)
+
+
+def setup_client(monkeypatch, pipeline_infos):
+    fake_client = FakePpsClient(pipeline_infos)
+    monkeypatch.setattr(PachydermPipelineClient, "connect",
+                        staticmethod(lambda *args: fake_client))
+    return PachydermPipelineClient("localhost", 30650), fake_client
+
+
+def test_apply_unchanged_spec(monkeypatch):
+    client, fake_client = setup_client(monkeypatch, {"edges": PIPELINE_INFO})
+    result = client.apply_pipeline(PIPELINE_SPEC)
+    assert result["action"] == PachydermPipelineClient.APPLY_UNCHANGED
+    assert result["changed_fields"] == []
+    assert fake_client.stub.create_requests == []
+
+
+def test_apply_changed_spec(monkeypatch):
+    client, fake_client = setup_client(monkeypatch, {"edges": PIPELINE_INFO})
+    pipeline_spec = dict(PIPELINE_SPEC,
+                         transform={"image": "python:3.7",
+                                    "cmd": ["python3", "/edges.py"]})
+    result = client.apply_pipeline(pipeline_spec)
+    assert result["action"] == PachydermPipelineClient.APPLY_UPDATED
+    assert result["changed_fields"] == ["transform.image"]
+    assert len(fake_client.stub.create_requests) == 1
+    assert fake_client.stub.create_requests[0].update
+
+
+def test_apply_spec_overriding_server_defaults(monkeypatch):
+    client, fake_client = setup_client(monkeypatch, {"edges": PIPELINE_INFO})
+    # a field pachd defaults is compared once the spec sets it
+    pipeline_spec = dict(PIPELINE_SPEC, cache_size="1G", datum_tries=5)
+    pipeline_spec["input"] = {"cross": [
+        {"pfs": {"repo": "images", "glob": "/*", "branch": "staging"}},
+        PIPELINE_SPEC["input"]["cross"][1]]}
+    result = client.apply_pipeline(pipeline_spec)
+    assert result["action"] == PachydermPipelineClient.APPLY_UPDATED
+    assert result["changed_fields"] == ["cache_size", "datum_tries",
+                                        "input.cross[0].pfs.branch"]
+    assert fake_client.stub.create_requests[0].cache_size == "1G"
+
+    # set to the value pachd defaulted it to, it is unchanged
+    pipeline_spec = dict(PIPELINE_SPEC, cache_size="64M")
+    assert client.apply_pipeline(pipeline_spec)["action"] == \
+        PachydermPipelineClient.APPLY_UNCHANGED
+
+
+def test_apply_spec_without_pipeline_name(monkeypatch):
+    client, fake_client = setup_client(monkeypatch, {})
+    pipeline_spec = dict(PIPELINE_SPEC, pipeline={})
+    with pytest.raises(InvalidConfigException, match="pipeline.name"):
+        client.apply_pipeline(pipeline_spec)
+    with pytest.raises(InvalidConfigException, match="pipeline.name"):
+        client.apply_pipeline({"transform": PIPELINE_SPEC["transform"]})
+    assert fake_client.stub.create_requests == []
+
+
+def test_server_defaults_match_full_paths():
+    assert PachydermPipelineClient.is_server_default("input.pfs.branch")
+    assert PachydermPipelineClient.is_server_default(
+        "input.cross[1].union[0].pfs.name")
+    assert not PachydermPipelineClient.is_server_default("pipeline.name")
+    assert PachydermPipelineClient.diff_pipeline_spec(
+        {"pipeline": {"name": "edges"}},
+        {"pipeline": {"name": "montage"}}) == ["pipeline.name"]
+
+
+def test_get_reading_pipelines(monkeypatch):
+    client, _ = setup_client(monkeypatch, {"edges": PIPELINE_INFO})
+    assert client.get_reading_pipelines("images") == ["edges"]
+    assert client.get_reading_pipelines("edges") == []
+
+
+def test_wait_jobs_yields_jobs_as_they_finish(monkeypatch):
+    client, fake_client = setup_client(monkeypatch, {})
+    inspect_job = fake_client.stub.InspectJob
+    jobs = client.wait_jobs(["j1", "j2", "j1"])
+    # requests are sent when the generator is first advanced
+    threading.Timer(0.05, lambda: (inspect_job.finish_job("j2"),
+                                   inspect_job.finish_job("j1"))).start()
+    assert [job_info.job.id for job_info in jobs] == ["j2", "j1"]
+    assert sorted(inspect_job.blocking_futures) == ["j1", "j2"]
+
+
+def test_wait_jobs_times_out_and_cancels_requests(monkeypatch):
+    client, fake_client = setup_client(monkeypatch, {})
+    with pytest.raises(PachydermOperationException, match="timed out"):
+        list(client.wait_jobs(["j1", "j2"], timeout=0.05))
+    assert all(future.cancelled() for future in
+               fake_client.stub.InspectJob.blocking_futures.values())
+
+
+def test_wait_jobs_reports_progress(monkeypatch):
+    client, fake_client = setup_client(monkeypatch, {})
+    inspect_job = fake_client.stub.InspectJob
+    inspect_job.running_jobs["j1"] = create_job_info(
+        "j1", PachydermPipelineClient.JOB_RUNNING, data_processed=4,
+        data_total=10)
+    reports = []
+    threading.Timer(0.1, inspect_job.finish_job, ["j1"]).start()
+    list(client.wait_jobs(["j1"], on_progress=lambda *report:
+                          reports.append(report), progress_interval=0.02))
+
+    assert [(job_id, progress["state"], progress["data_processed"])
+            for (job_id, progress) in reports] == \
+        [("j1", PachydermPipelineClient.JOB_RUNNING, 4),
+         ("j1", PachydermPipelineClient.JOB_SUCCESS, 10)]
+
+
+def test_report_progress_gives_up_on_slow_jobs(monkeypatch):
+    client, fake_client = setup_client(monkeypatch, {})
+    inspect_job = fake_client.stub.InspectJob
+    # j1 is never answered, j2 is
+    inspect_job.running_jobs["j2"] = create_job_info(
+        "j2", PachydermPipelineClient.JOB_RUNNING, data_processed=1)
+    reports = []
+    start_time = time.monotonic()
+    client.report_progress(["j1", "j2"], {},
+                           lambda *report: reports.append(report),
+                           timeout=0.05)
+
+    assert time.monotonic() - start_time < 1
+    assert [job_id for (job_id, _) in reports] == ["j2"]
+    assert inspect_job.progress_futures[0].cancelled()
@@ -0,0 +1,254 @@
+import os
+import pickle
+import types
+
+import pandas as pd
+import pytest
+from python_pachyderm.client.pfs import pfs_pb2
+
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    PachydermFieldsNameException, SerializationFailedException
+from xpresso.ai.core.data.pachyderm_repo_management.pachyderm_repo_manager import \
+    PachydermRepoManager
+from xpresso.ai.core.data.pachyderm_repo_management.tests import \
+    fake_pfs_client
+from xpresso.ai.core.data.structured_dataset import StructuredDataset
+
+
+class FakeCommitStream:
+    def __init__(self, commit_infos):
+        self.commit_infos = iter(commit_infos)
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.commit_infos)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakePachydermClient:
+    def __init__(self, commit_count):
+        # latest commit first, as pachyderm lists them
+        self.commit_infos = [
+            pfs_pb2.CommitInfo(
+                commit=pfs_pb2.Commit(repo=pfs_pb2.Repo(name="sales"),
+                                      id=f"commit-{index}"),
+                branch=pfs_pb2.Branch(name="master"))
+            for index in reversed(range(commit_count))
+        ]
+        self.requests = []
+        self.streams = []
+
+    def list_commit(self, repo_name, upper_commit=None, lower_commit=None,
+                    count=None):
+        self.requests.append((repo_name, upper_commit, count))
+        stream = FakeCommitStream(self.commit_infos[:count])
+        self.streams.append(stream)
+        return stream
+
+
+def setup_manager(monkeypatch, commit_count=10):
+    fake_client = FakePachydermClient(commit_count)
+    monkeypatch.setattr(PachydermRepoManager, "connect_to_pachyderm",
+                        lambda self: fake_client)
+    return PachydermRepoManager(), fake_client
+
+
+def setup_cluster_manager(monkeypatch, files):
+    """
+    creates a manager connected to a fake cluster whose master branch
+    holds `files`
+    """
+    fake_client = fake_pfs_client.FakePfsClient(latency=0)
+    commit = fake_client.start_commit("sales", "master")
+    fake_client.commits[("sales", commit.id)] = files
+    fake_client.finish_commit(("sales", commit.id))
+    client = fake_pfs_client.FakePachydermClient(fake_client)
+    monkeypatch.setattr(PachydermRepoManager, "connect_to_pachyderm",
+                        lambda self: client)
+    return PachydermRepoManager(), commit.id
+
+
+def add_commit(manager, files):
+    """
+    adds a commit on the master branch of the fake cluster, starting from
+    the files of its head
+    """
+    fake_client = manager.pachyderm_client.fake_pfs_client
+    commit = fake_client.start_commit("sales", "master")
+    fake_client.commits[("sales", commit.id)].update(files)
+    fake_client.finish_commit(("sales", commit.id))
+    return commit.id
+
+
+def create_dataset(data):
+    dataset = StructuredDataset()
+    dataset.data = pd.DataFrame(data)
+    return pickle.dumps(dataset, pickle.HIGHEST_PROTOCOL)
+
+
+class Payload:
+    def __reduce__(self):
+        return os.system, ("true",)
+
+
+def test_iter_commits_validates_names_when_called(monkeypatch):
+    manager, fake_client = setup_manager(monkeypatch)
+    with pytest.raises(PachydermFieldsNameException):
+        manager.iter_commits("sales repo/", "master")
+    with pytest.raises(PachydermFieldsNameException):
+        manager.iter_commits("sales", "master/")
+    assert fake_client.requests == []
+
+
+def test_iter_commits_is_lazy(monkeypatch):
+    manager, fake_client = setup_manager(monkeypatch)
+    commits = manager.iter_commits("sales", "master")
+    assert fake_client.requests == []
+    assert next(commits)["id"] == "commit-9"
+    commits.close()
+    assert fake_client.streams[0].cancelled
+
+
+def test_iter_commits_requests_only_the_needed_page(monkeypatch):
+    manager, fake_client = setup_manager(monkeypatch)
+    commits = list(manager.iter_commits("sales", "master", count=3, page=2))
+    assert [commit["id"] for commit in commits] == \
+        ["commit-3", "commit-2", "commit-1"]
+    assert fake_client.requests == [("sales", "master", 9)]
+
+
+def test_list_commit_returns_every_commit(monkeypatch):
+    manager, fake_client = setup_manager(monkeypatch, commit_count=4)
+    commits = manager.list_commit("sales", "master")
+    assert [commit["id"] for commit in commits] == \
+        ["commit-3", "commit-2", "commit-1", "commit-0"]
+    assert commits[0] == {"id": "commit-3", "repo": "sales",
+                          "branch": "master", "description": ""}
+    assert fake_client.requests == [("sales", "master", None)]
+
+
+def test_list_dataset_streams_when_lazy(monkeypatch):
+    manager, commit_id = setup_cluster_manager(monkeypatch, {
+        "/sales/2024.csv": b"a", "/sales/2025/01.csv": b"bb"})
+    listing = manager.list_dataset("sales", "master", "/sales", lazy=True)
+    assert isinstance(listing["dataset"], types.GeneratorType)
+    assert listing["commit"]["id"] == commit_id
+    assert list(listing["dataset"]) == \
+        manager.list_dataset("sales", "master", "/sales")["dataset"]
+
+
+def test_pull_dataset_writes_every_file(monkeypatch, tmp_path):
+    manager, commit_id = setup_cluster_manager(monkeypatch, {
+        "/sales/2024.csv": b"a", "/sales/2025/01.csv": b"bb"})
+    pull_dir = manager.pull_dataset("sales", "master", "/sales",
+                                    target_dir=str(tmp_path))
+    assert pull_dir == str(tmp_path / commit_id)
+    with open(tmp_path / commit_id / "sales" / "2025" / "01.csv",
+              "rb") as pulled_file:
+        assert pulled_file.read() == b"bb"
+    assert manager.last_transfer_stats.to_dict()["files"] == 2
+
+
+def test_diff_commits_compares_file_hashes(monkeypatch):
+    manager, from_commit = setup_cluster_manager(monkeypatch, {
+        "/sales/2023.csv": b"a", "/sales/2024.csv": b"b",
+        "/stores/all.csv": b"c"})
+    to_commit = add_commit(manager, {"/sales/2024.csv": b"bb",
+                                     "/sales/2025.csv": b"d"})
+    del manager.pachyderm_client.fake_pfs_client.commits[
+        ("sales", to_commit)]["/sales/2023.csv"]
+
+    diff_output = manager.diff_commits("sales", from_commit, "master",
+                                       "/sales")
+    assert diff_output == {"from_commit": from_commit,
+                           "to_commit": to_commit,
+                           "added": ["/sales/2025.csv"],
+                           "removed": ["/sales/2023.csv"],
+                           "modified": ["/sales/2024.csv"]}
+
+
+def test_diff_commits_compares_rows(monkeypatch):
+    manager, from_commit = setup_cluster_manager(monkeypatch, {
+        "/sales/2024.csv": b"store,amount\n1,10\n2,20\n",
+        "/sales/2024.pkl": create_dataset({"amount": [10, 20]}),
+        "/sales/2024.json": b"{}"})
+    to_commit = add_commit(manager, {
+        "/sales/2024.csv": b"store,amount,region\n1,10,n\n3,30,s\n",
+        "/sales/2024.pkl": create_dataset({"amount": [10, 30]}),
+        "/sales/2024.json": b"[]"})
+
+    row_diff = manager.diff_commits("sales", from_commit, to_commit,
+                                    row_diff=True)["row_diff"]
+    assert sorted(row_diff) == ["/sales/2024.csv", "/sales/2024.pkl"]
+    assert row_diff["/sales/2024.csv"]["metadata"] == [("region", "added")]
+    csv_rows = row_diff["/sales/2024.csv"]["data"]
+    assert [record["store"] for record in csv_rows["removed"]] == [1, 2]
+    assert [record["store"] for record in csv_rows["added"]] == [1, 3]
+    pickle_rows = row_diff["/sales/2024.pkl"]["data"]
+    assert [record["amount"] for record in pickle_rows["removed"]] == [20]
+    assert [record["amount"] for record in pickle_rows["added"]] == [30]
+
+
+def test_row_diff_refuses_pickles_running_code(monkeypatch):
+    manager, from_commit = setup_cluster_manager(monkeypatch, {
+        "/sales/2024.pkl": create_dataset({"amount": [10]})})
+    add_commit(manager, {"/sales/2024.pkl": pickle.dumps(Payload())})
+    monkeypatch.setattr(os, "system", lambda command: pytest.fail(command))
+    with pytest.raises(SerializationFailedException, match="posix.system"):
+        manager.diff_commits("sales", from_commit, "master", row_diff=True)
+
+
+def test_paths_with_wildcards_are_matched_literally(monkeypatch, tmp_path):
+    manager, commit_id = setup_cluster_manager(monkeypatch, {
+        "/sales/data[1].csv": b"a", "/sales/data1.csv": b"b"})
+    listing = manager.manage_xprctl_dataset(
+        "list", {"repo_name": "sales", "branch_name": "master",
+                 "path": "/sales/data[1].csv"})
+    assert [file_info["path"] for file_info in listing["dataset"]] == \
+        ["/sales/data[1].csv"]
+
+    # pulls from xprctl are saved in the current directory
+    monkeypatch.chdir(tmp_path)
+    pull_dir = manager.manage_xprctl_dataset(
+        "pull", {"repo_name": "sales", "branch_name": "master",
+                 "path": "/sales/data[1].csv"})
+    assert os.listdir(os.path.join(pull_dir, "sales")) == ["data[1].csv"]
+
+
+def test_glob_flag_matches_the_path_as_a_pattern(monkeypatch):
+    manager, _ = setup_cluster_manager(monkeypatch, {
+        "/sales/data[1].csv": b"a", "/sales/data1.csv": b"b",
+        "/sales/2024/01.csv": b"c"})
+    listing = manager.manage_xprctl_dataset(
+        "list", {"repo_name": "sales", "branch_name": "master",
+                 "path": "/sales/data[1].csv", "glob": True})
+    assert [file_info["path"] for file_info in listing["dataset"]] == \
+        ["/sales/data1.csv"]
+    listing = manager.manage_xprctl_dataset(
+        "list", {"repo_name": "sales", "branch_name": "master",
+                 "pattern": "/sales/*"})
+    assert [file_info["path"] for file_info in listing["dataset"]] == \
+        ["/sales/2024", "/sales/data1.csv", "/sales/data[1].csv"]
+
+
+def test_expand_folders_lists_files_once(monkeypatch):
+    manager, commit_id = setup_cluster_manager(monkeypatch, {
+        "/sales/2024/01.csv": b"a", "/sales/2024/02/03.csv": b"b",
+        "/sales/2025.csv": b"c"})
+    file_info_list = manager.list_dataset("sales", "master", "/",
+                                          pattern="/sales/*")["dataset"]
+    file_info_list += manager.list_dataset("sales", "master", "/",
+                                           pattern="/sales/2024/*")["dataset"]
+
+    expanded_list = manager.expand_folders("sales", commit_id,
+                                           file_info_list)
+    assert sorted(file_info["path"] for file_info in expanded_list
+                  if file_info["type"] == "File") == \
+        ["/sales/2024/01.csv", "/sales/2024/02/03.csv", "/sales/2025.csv"]
+    assert len({file_info["path"] for file_info in expanded_list}) == \
+        len(expanded_list)
@@ -0,0 +1,97 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    InvalidConfigException, DatasetIntegrityException
+from xpresso.ai.core.data.pachyderm_repo_management.dataset_manifest import \
+    ContentDigest
+from xpresso.ai.core.data.pachyderm_repo_management.transfer_codec import \
+    TransferCodec, zstandard, lz4
+
+
+AVAILABLE_CODECS = ["zlib"] + \
+    (["zstd"] if zstandard is not None else []) + \
+    (["lz4"] if lz4 is not None else [])
+
+
+def encode(codec, chunks):
+    return codec.encode_header() + \
+        b"".join(codec.encode_chunk(chunk) for chunk in chunks)
+
+
+@pytest.mark.parametrize("codec_name", AVAILABLE_CODECS)
+def test_shared_codec_round_trip_across_threads(codec_name):
+    codec = TransferCodec.get(codec_name)
+    contents = [os.urandom(1024) * 256 + bytes([index]) * index
+                for index in range(32)]
+
+    def round_trip(content):
+        chunks = [content[offset:offset + 64 * 1024]
+                  for offset in range(0, len(content), 64 * 1024)]
+        encoded = encode(codec, chunks)
+        return b"".join(codec.iter_decoded(io.BytesIO(encoded)))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(round_trip, contents)) == contents
+
+
+@pytest.mark.parametrize("codec_name", AVAILABLE_CODECS)
+def test_frames_round_trip(codec_name):
+    codec = TransferCodec.get(codec_name)
+    chunks = [b"date,store_id,sku\n" * 1000, b"", b"2024-01-01,7,SKU1\n"]
+    encoded = encode(codec, chunks)
+    assert TransferCodec.detect(io.BytesIO(encoded)) == codec_name
+    assert list(codec.iter_decoded(io.BytesIO(encoded))) == chunks
+
+
+def test_stored_chunks_of_empty_content():
+    codec = TransferCodec.get("zlib")
+    assert list(TransferCodec.iter_stored_chunks([])) == [b""]
+    assert list(TransferCodec.iter_stored_chunks([], codec)) == \
+        [codec.encode_header()]
+    assert list(codec.iter_decoded(io.BytesIO(codec.encode_header()))) == []
+
+
+def test_stored_chunks_update_digest():
+    codec = TransferCodec.get("zlib")
+    digest = ContentDigest()
+    stored_chunks = list(TransferCodec.iter_stored_chunks(
+        [b"a" * 1000, b"b" * 1000], codec, digest))
+    assert len(stored_chunks) == 2
+    assert stored_chunks[0].startswith(codec.encode_header())
+    assert digest.size_bytes == 2000
+    assert digest.stored_size_bytes == sum(map(len, stored_chunks))
+    assert digest.hexdigest() == \
+        hashlib.sha256(b"a" * 1000 + b"b" * 1000).hexdigest()
+
+
+def test_truncated_frames_are_rejected():
+    codec = TransferCodec.get("zlib")
+    encoded = encode(codec, [b"x" * 1000])
+    header_size = len(codec.encode_header())
+    for size in (header_size + 2, len(encoded) - 1):
+        with pytest.raises(DatasetIntegrityException):
+            list(codec.iter_decoded(io.BytesIO(encoded[:size])))
+    with pytest.raises(DatasetIntegrityException):
+        TransferCodec.detect(io.BytesIO(encoded[:len(TransferCodec.FILE_MAGIC)]))
+
+
+def test_detect_leaves_position_and_plain_content():
+    plain_file = io.BytesIO(b"date,store_id\n")
+    assert TransferCodec.detect(plain_file) is None
+    assert plain_file.tell() == 0
+    encoded = io.BytesIO(encode(TransferCodec.get("zlib"), [b"x"]))
+    with pytest.raises(DatasetIntegrityException):
+        list(TransferCodec.get("zlib").iter_decoded(io.BytesIO(b"plain")))
+    encoded.seek(3)
+    assert TransferCodec.detect(encoded) is None
+    assert encoded.tell() == 3
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(InvalidConfigException):
+        TransferCodec.get("brotli")
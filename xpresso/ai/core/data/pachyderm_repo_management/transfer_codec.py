@@ -0,0 +1,295 @@
+import os
+import struct
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+from xpresso.ai.core.data.exception_handling.custom_exception import \
+    InvalidConfigException, DatasetIntegrityException
+from xpresso.ai.core.data.pachyderm_repo_management.dataset_manifest import \
+    ContentDigest
+
+
+class TransferCodec:
+    """
+    Compression applied to file content on the wire
+
+    Every upload chunk is compressed on its own and sent as a frame
+    prefixed with its length, hence a file is encoded while it is streamed
+    and decoded frame by frame without holding it in memory. An encoded
+    file starts with `FILE_MAGIC` and the name of its codec, so pulls
+    recognise and decode it even when the manifest entry is stale.
+
+    Files are stored encoded on the cluster, hence pipelines and pachctl
+    read the frames and not the original content. Codecs must not be used
+    for repos which are inputs of pipelines
+    """
+    NAME = None
+    # first bytes of every encoded file, followed by the codec name
+    FILE_MAGIC = b"\x89XPRC\r\n\x1a\n"
+    CODEC_NAME_HEADER = struct.Struct(">B")
+    # big endian length of the compressed payload of a frame
+    FRAME_HEADER = struct.Struct(">I")
+
+    @staticmethod
+    def get(name):
+        """
+        returns the codec registered under a name
+
+        :param name:
+            name of the codec e.g. zstd, lz4 or zlib
+        :return:
+            TransferCodec object
+        """
+        codec_class = CODECS.get(name)
+        if codec_class is None:
+            raise InvalidConfigException(
+                f"unknown transfer codec {name}; use one of {sorted(CODECS)}")
+        return codec_class()
+
+    @staticmethod
+    def iter_stored_chunks(chunks, codec=None, digest=None):
+        """
+        yields chunks of raw content as they are stored on the cluster
+
+        With a codec, the first chunk carries the file header and every
+        chunk is encoded into a frame. An empty content still yields one
+        chunk, as a file needs one request to be created on the cluster
+        and an encoded one needs its header
+
+        :param chunks:
+            iterable of raw content chunks
+        :param codec:
+            (Optional) TransferCodec the content is encoded with
+        :param digest:
+            (Optional) ContentDigest updated with the raw and stored sizes
+            and the hash of the raw content
+        :return:
+            generator of bytes
+        """
+        stored_prefix = codec.encode_header() if codec else b""
+        is_empty = True
+        for chunk in chunks:
+            is_empty = False
+            if codec:
+                stored_chunk = stored_prefix + codec.encode_chunk(chunk)
+                stored_prefix = b""
+            else:
+                stored_chunk = chunk
+            if digest:
+                digest.update(chunk)
+                digest.add_stored(len(stored_chunk))
+            yield stored_chunk
+        if is_empty:
+            if digest:
+                digest.add_stored(len(stored_prefix))
+            yield stored_prefix
+
+    def compress(self, data):
+        raise NotImplementedError
+
+    def decompress(self, data):
+        raise NotImplementedError
+
+    def encode_header(self):
+        """
+        returns the header written before the first frame of a file
+        """
+        codec_name = self.NAME.encode("ascii")
+        return self.FILE_MAGIC + \
+            self.CODEC_NAME_HEADER.pack(len(codec_name)) + codec_name
+
+    @classmethod
+    def read_header(cls, encoded_file):
+        """
+        reads the header of an encoded file
+
+        :param encoded_file:
+            binary file object positioned at the start of the file
+        :return:
+            name of the codec or None if the content is not encoded
+        """
+        if encoded_file.read(len(cls.FILE_MAGIC)) != cls.FILE_MAGIC:
+            return None
+        name_header = encoded_file.read(cls.CODEC_NAME_HEADER.size)
+        if len(name_header) < cls.CODEC_NAME_HEADER.size:
+            raise DatasetIntegrityException("truncated codec header")
+        (name_size,) = cls.CODEC_NAME_HEADER.unpack(name_header)
+        codec_name = encoded_file.read(name_size)
+        if len(codec_name) < name_size:
+            raise DatasetIntegrityException("truncated codec header")
+        return codec_name.decode("ascii", "replace")
+
+    @classmethod
+    def detect(cls, encoded_file):
+        """
+        returns the name of the codec a file is encoded with or None,
+        leaving the file at its current position
+        """
+        position = encoded_file.tell()
+        try:
+            return cls.read_header(encoded_file)
+        finally:
+            encoded_file.seek(position)
+
+    @classmethod
+    def detect_file(cls, local_path):
+        """
+        returns the name of the codec a local file is encoded with or None
+        """
+        with open(local_path, "rb") as encoded_file:
+            return cls.detect(encoded_file)
+
+    def encode_chunk(self, chunk):
+        """
+        compresses a chunk into a length prefixed frame
+        """
+        payload = self.compress(chunk)
+        return self.FRAME_HEADER.pack(len(payload)) + payload
+
+    def iter_decoded(self, encoded_file):
+        """
+        yields the decoded content of an encoded file frame by frame
+
+        :param encoded_file:
+            binary file object positioned at the start of the file
+        :return:
+            generator of bytes
+        """
+        if self.read_header(encoded_file) != self.NAME:
+            raise DatasetIntegrityException(
+                f"content is not encoded with {self.NAME}")
+        while True:
+            header = encoded_file.read(self.FRAME_HEADER.size)
+            if not header:
+                return
+            if len(header) < self.FRAME_HEADER.size:
+                raise DatasetIntegrityException("truncated frame header")
+            (payload_size,) = self.FRAME_HEADER.unpack(header)
+            payload = encoded_file.read(payload_size)
+            if len(payload) < payload_size:
+                raise DatasetIntegrityException("truncated frame")
+            try:
+                yield self.decompress(payload)
+            except Exception as err:
+                raise DatasetIntegrityException(
+                    f"{self.NAME} frame can not be decoded: {err}")
+
+    def decode_file(self, encoded_path, decoded_path):
+        """
+        decodes a downloaded file and removes the encoded copy
+
+        :param encoded_path:
+            local path of the encoded file
+        :param decoded_path:
+            local path into which decoded content is written
+        :return:
+            ContentDigest of the decoded content
+        """
+        digest = ContentDigest()
+        try:
+            with open(encoded_path, "rb") as encoded_file, \
+                    open(decoded_path, "wb") as decoded_file:
+                for chunk in self.iter_decoded(encoded_file):
+                    digest.update(chunk)
+                    decoded_file.write(chunk)
+        except DatasetIntegrityException:
+            os.remove(decoded_path)
+            raise
+        finally:
+            # a damaged download must not be resumed
+            os.remove(encoded_path)
+        return digest
+
+
+class ZstdCodec(TransferCodec):
+    """
+    zstd codec, needs the `zstandard` package
+
+    A zstandard compressor or decompressor must not be used by several
+    threads at once, hence every thread using the codec gets its own
+    """
+    NAME = "zstd"
+    DEFAULT_LEVEL = 3
+
+    def __init__(self, level=DEFAULT_LEVEL):
+        if zstandard is None:
+            raise InvalidConfigException(
+                "zstandard package is required for zstd transfer codec")
+        self.level = level
+        self.thread_state = threading.local()
+
+    def get_compressor(self):
+        """
+        returns the compressor of the calling thread
+        """
+        if not hasattr(self.thread_state, "compressor"):
+            self.thread_state.compressor = \
+                zstandard.ZstdCompressor(level=self.level)
+        return self.thread_state.compressor
+
+    def get_decompressor(self):
+        """
+        returns the decompressor of the calling thread
+        """
+        if not hasattr(self.thread_state, "decompressor"):
+            self.thread_state.decompressor = zstandard.ZstdDecompressor()
+        return self.thread_state.decompressor
+
+    def compress(self, data):
+        return self.get_compressor().compress(data)
+
+    def decompress(self, data):
+        return self.get_decompressor().decompress(data)
+
+
+class Lz4Codec(TransferCodec):
+    """
+    lz4 codec, needs the `lz4` package
+    """
+    NAME = "lz4"
+
+    def __init__(self):
+        if lz4 is None:
+            raise InvalidConfigException(
+                "lz4 package is required for lz4 transfer codec")
+
+    def compress(self, data):
+        return lz4.frame.compress(data)
+
+    def decompress(self, data):
+        return lz4.frame.decompress(data)
+
+
+class ZlibCodec(TransferCodec):
+    """
+    zlib codec from the standard library, slower than zstd and lz4 but
+    always available
+    """
+    NAME = "zlib"
+    DEFAULT_LEVEL = 6
+
+    def __init__(self, level=DEFAULT_LEVEL):
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+CODECS = {
+    ZstdCodec.NAME: ZstdCodec,
+    Lz4Codec.NAME: Lz4Codec,
+    ZlibCodec.NAME: ZlibCodec
+}
@@ -0,0 +1,66 @@
+import threading
+import time
+
+
+class TransferStats:
+    """
+    Thread safe counters of a push or pull between local system and
+    pachyderm cluster
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.file_count = 0
+        self.bytes_transferred = 0
+        self.start_time = time.perf_counter()
+        self.end_time = None
+
+    def add_file(self):
+        """
+        records a completely transferred file
+        """
+        with self.lock:
+            self.file_count += 1
+
+    def add_bytes(self, size_bytes):
+        """
+        records bytes moved over the wire
+
+        :param size_bytes:
+            number of bytes
+        """
+        with self.lock:
+            self.bytes_transferred += size_bytes
+
+    def stop(self):
+        """
+        marks the end of the transfer
+        """
+        self.end_time = time.perf_counter()
+
+    @property
+    def elapsed_seconds(self):
+        end_time = self.end_time or time.perf_counter()
+        return end_time - self.start_time
+
+    @property
+    def bytes_per_second(self):
+        elapsed_seconds = self.elapsed_seconds
+        if not elapsed_seconds:
+            return 0.0
+        return self.bytes_transferred / elapsed_seconds
+
+    def to_dict(self):
+        """
+        returns the counters as a user friendly dict
+        """
+        return {
+            "files": self.file_count,
+            "bytes": self.bytes_transferred,
+            "seconds": round(self.elapsed_seconds, 3),
+            "bytes_per_second": round(self.bytes_per_second, 1)
+        }
+
+    def __str__(self):
+        return (f"{self.file_count} files, {self.bytes_transferred} bytes in "
+                f"{self.elapsed_seconds:.2f}s "
+                f"({self.bytes_per_second / 2 ** 20:.2f} MiB/s)")